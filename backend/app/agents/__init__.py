@@ -14,6 +14,7 @@ from app.agents.risk_agent import RiskAgent
 from app.agents.export_agent import ExportAgent
 from app.agents.crud_agent import CRUDAgent
 from app.llm import BaseLLMProvider
+from app.llm.cache import plan_cache
 
 
 # Registry of all available agents
@@ -49,6 +50,16 @@ def get_agent(name: str, db: Session, llm: BaseLLMProvider) -> BaseAgent:
     return AGENT_REGISTRY[name](db, llm)
 
 
+def register_agent(name: str, agent_class: Type[BaseAgent]) -> None:
+    """
+    Add or replace an agent in the registry.
+
+    Cached plans were produced for the old agent set, so they are dropped.
+    """
+    AGENT_REGISTRY[name] = agent_class
+    plan_cache.clear()
+
+
 def get_available_agents() -> list[dict]:
     """Get list of available agents with descriptions."""
     return [
@@ -69,5 +80,6 @@ __all__ = [
     "CRUDAgent",
     "AGENT_REGISTRY",
     "get_agent",
+    "register_agent",
     "get_available_agents",
 ]
@@ -3,8 +3,9 @@ Analytics Agent for FinBank AI.
 Handles financial aggregations, reports, and statistics.
 """
 
-from sqlalchemy import text
 from app.agents.base import BaseAgent, AgentResult
+from app.deadline import Deadline
+from app.sql_guard import UnsafeSqlError
 
 
 class AnalyticsAgent(BaseAgent):
@@ -12,50 +13,28 @@ class AnalyticsAgent(BaseAgent):
 
     name = "analytics"
     description = "Generates financial aggregations, reports, and statistics"
+    accepts_planned_sql = True
 
-    async def execute(self, task: str) -> AgentResult:
+    async def execute(self, task: str, deadline: Deadline | None = None) -> AgentResult:
         """Execute an analytics task."""
+        self.deadline = deadline
         try:
-            # Generate SQL with aggregations
-            system_prompt = f"""You are a SQL query generator for analytics. Generate ONLY valid SQLite SELECT queries with aggregations.
-{self.get_analytics_schema()}
+            # Use the fused planner's SQL when available, otherwise generate it
+            sql = self.use_planned_sql() or await self._generate_task_sql(task)
 
-Rules:
-- Return ONLY the SQL query, nothing else
-- Use SQLite syntax (not T-SQL)
-- Use SUM(), COUNT(), AVG() for aggregations
-- Use strftime() for date operations
-- Use || for string concatenation
-"""
-
-            response = await self.llm.generate(
-                prompt=f"Generate an analytics SELECT query for: {task}",
-                system_prompt=system_prompt,
-                temperature=0.1,
-                max_tokens=500
-            )
-
-            sql = response.content.strip()
-            # Remove markdown code blocks if present
-            if "```sql" in sql:
-                sql = sql.split("```sql")[1].split("```")[0].strip()
-            elif "```" in sql:
-                sql = sql.split("```")[1].split("```")[0].strip()
-
-            # Validate it's a read-only query with aggregations
-            sql_upper = sql.strip().upper()
-            if not sql_upper.startswith("SELECT"):
+            # Reject unsafe statements and cap the rows returned
+            try:
+                guarded = self.check_sql(sql)
+            except UnsafeSqlError as e:
                 return AgentResult(
                     success=False,
                     data=None,
-                    message="Analytics agent can only execute SELECT queries",
+                    message=f"Analytics agent can only execute a single, safe SELECT query: {e}",
                     sql=sql,
                 )
 
             # Execute the query
-            result = self.db.execute(text(sql))
-            columns = result.keys()
-            rows = [dict(zip(columns, row)) for row in result.fetchall()]
+            rows = await self.run_query(guarded.sql, max_rows=guarded.max_rows)
 
             # Format numeric values
             for row in rows:
@@ -67,7 +46,8 @@ Rules:
                 success=True,
                 data=rows,
                 message=f"Generated analytics with {len(rows)} rows",
-                sql=sql,
+                sql=guarded.sql,
+                sql_rewrites=guarded.rewrites,
             )
 
         except Exception as e:
@@ -77,10 +57,30 @@ Rules:
                 message=f"Analytics failed: {str(e)}",
             )
 
-    def get_analytics_schema(self) -> str:
-        """Get schema optimized for analytics queries."""
-        return self.get_schema() + """
+    async def _generate_task_sql(self, task: str) -> str:
+        """Generate the SQL for a task with the LLM."""
+        # Generate SQL with aggregations
+        system_prompt = f"""You are a SQL query generator for analytics. Generate ONLY valid SQLite SELECT queries with aggregations.
 
+Rules:
+- Return ONLY the SQL query, nothing else
+- Use SQLite syntax (not T-SQL)
+- Use SUM(), COUNT(), AVG() for aggregations
+- Use strftime() for date operations
+- Use || for string concatenation
+{self.get_analytics_schema(task)}"""
+
+        return await self.llm.complete_sql(
+            prompt=f"Generate an analytics SELECT query for: {task}",
+            system_prompt=system_prompt,
+            temperature=0.1,
+            max_tokens=500,
+            deadline=self.deadline,
+        )
+
+    def get_analytics_schema(self, task: str | None = None) -> str:
+        """Get schema optimized for analytics queries."""
+        return """
 Common analytics patterns (SQLite):
 - Total balance: SUM(balance)
 - Transaction count: COUNT(*)
@@ -90,4 +90,5 @@ Common analytics patterns (SQLite):
 - Group by customer tier: GROUP BY ct.name
 - Recent 30 days: WHERE created_at >= date('now', '-30 days')
 - This month: WHERE strftime('%Y-%m', created_at) = strftime('%Y-%m', 'now')
-"""
+
+Database Schema:""" + self.get_schema(task)
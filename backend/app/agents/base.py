@@ -3,12 +3,43 @@ Base agent class for FinBank AI.
 All agents inherit from this class.
 """
 
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, Callable, TypeVar
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
+from app.config import get_settings
+from app.deadline import Deadline
 from app.llm import BaseLLMProvider
+from app.schema import pruned_schema
+from app.sql_guard import GuardedSql, guard_sql
+from app.tracing import tracer
+
+T = TypeVar("T")
+
+DATABASE_SCHEMA = """
+Tables:
+- customer_tiers (id, name, min_balance, benefits)
+- branches (id, name, address, city, manager_name)
+- customers (id, first_name, last_name, email, phone, address, city, tier_id, branch_id, created_at)
+- account_types (id, name, interest_rate, min_balance)
+- accounts (id, account_number, customer_id, type_id, balance, status, opened_at)
+- transactions (id, transaction_id, account_id, type, amount, description, recipient_account_id, created_at)
+- loans (id, loan_number, customer_id, type, principal, interest_rate, term_months, monthly_payment, remaining_balance, status, created_at)
+- cards (id, card_number, account_id, type, credit_limit, expiry_date, status)
+
+Relationships:
+- customers.tier_id -> customer_tiers.id
+- customers.branch_id -> branches.id
+- accounts.customer_id -> customers.id
+- accounts.type_id -> account_types.id
+- transactions.account_id -> accounts.id
+- transactions.recipient_account_id -> accounts.id (nullable, for transfers)
+- loans.customer_id -> customers.id
+- cards.account_id -> accounts.id
+"""
 
 
 class AgentResult(BaseModel):
@@ -17,6 +48,8 @@ class AgentResult(BaseModel):
     data: Any
     message: str | None = None
     sql: str | None = None
+    # How the SQL guard rewrote the generated statement, e.g. "added LIMIT 1000"
+    sql_rewrites: list[str] = []
 
 
 class BaseAgent(ABC):
@@ -24,21 +57,29 @@ class BaseAgent(ABC):
 
     name: str = "base"
     description: str = "Base agent"
+    # Agents that write to the database must not run concurrently with other tasks
+    read_only: bool = True
+    # Agents that can execute SQL produced by the fused planner instead of generating their own
+    accepts_planned_sql: bool = False
 
     def __init__(self, db: Session, llm: BaseLLMProvider):
         self.db = db
         self.llm = llm
+        # Deadline of the request this agent is serving, set by execute()
+        self.deadline: Deadline | None = None
+        # SELECT statement from the fused planner, see accepts_planned_sql
+        self.planned_sql: str | None = None
+        # Whether self.db belongs to this agent alone, set by the orchestrator
+        self.owns_session = False
 
     @abstractmethod
-    async def execute(self, task: str) -> AgentResult:
-        """Execute the agent's task."""
+    async def execute(self, task: str, deadline: Deadline | None = None) -> AgentResult:
+        """Execute the agent's task within the request deadline."""
         pass
 
     async def generate_sql(self, task: str, schema: str, query_type: str = "SELECT") -> str:
         """Helper method to generate SQL using the LLM."""
         system_prompt = f"""You are a SQL query generator. Generate ONLY valid SQLite {query_type} queries.
-Database Schema:
-{schema}
 
 Rules:
 - Return ONLY the SQL query, nothing else
@@ -47,44 +88,72 @@ Rules:
 - Use LIMIT and OFFSET for pagination
 - For dates, use strftime()
 - For INSERT/UPDATE, use standard SQL syntax
+
+Database Schema:
+{schema}
 """
 
-        response = await self.llm.generate(
+        return await self.llm.complete_sql(
             prompt=f"Generate a {query_type} query for: {task}",
             system_prompt=system_prompt,
             temperature=0.1,
-            max_tokens=500
+            max_tokens=500,
+            deadline=self.deadline,
         )
 
-        sql = response.content.strip()
-        # Remove markdown code blocks if present
-        if "```sql" in sql:
-            sql = sql.split("```sql")[1].split("```")[0].strip()
-        elif "```" in sql:
-            sql = sql.split("```")[1].split("```")[0].strip()
-
-        return sql
-
-    def get_schema(self) -> str:
-        """Get the database schema for SQL generation."""
-        return """
-Tables:
-- customer_tiers (id, name, min_balance, benefits)
-- branches (id, name, address, city, manager_name)
-- customers (id, first_name, last_name, email, phone, address, city, tier_id, branch_id, created_at)
-- account_types (id, name, interest_rate, min_balance)
-- accounts (id, account_number, customer_id, type_id, balance, status, opened_at)
-- transactions (id, transaction_id, account_id, type, amount, description, recipient_account_id, created_at)
-- loans (id, loan_number, customer_id, type, principal, interest_rate, term_months, monthly_payment, remaining_balance, status, created_at)
-- cards (id, card_number, account_id, type, credit_limit, expiry_date, status)
-
-Relationships:
-- customers.tier_id -> customer_tiers.id
-- customers.branch_id -> branches.id
-- accounts.customer_id -> customers.id
-- accounts.type_id -> account_types.id
-- transactions.account_id -> accounts.id
-- transactions.recipient_account_id -> accounts.id (nullable, for transfers)
-- loans.customer_id -> customers.id
-- cards.account_id -> accounts.id
-"""
+    def use_planned_sql(self) -> str | None:
+        """Return the planner's SQL if it is a usable SELECT statement."""
+        if self.accepts_planned_sql and self.planned_sql:
+            sql = self.planned_sql.strip()
+            if sql.upper().startswith("SELECT"):
+                return sql
+        return None
+
+    def check_sql(self, sql: str) -> GuardedSql:
+        """
+        Run generated SQL through the guard (see app.sql_guard) for this database.
+        Raises UnsafeSqlError if the statement must not run.
+        """
+        return guard_sql(sql, get_settings().sql_max_rows, self.db.get_bind().dialect.name)
+
+    async def run_db(self, work: Callable[[], T]) -> T:
+        """
+        Run blocking database work. On a session of its own it runs in a
+        worker thread, so concurrent tasks don't block each other or the
+        event loop.
+        """
+        if self.deadline:
+            self.deadline.check()
+        if self.owns_session:
+            return await asyncio.to_thread(work)
+        return work()
+
+    async def run_query(self, sql: str, params: dict | None = None, max_rows: int | None = None) -> list[dict]:
+        """Execute a read query and return the rows as dicts, at most max_rows of them."""
+        def fetch() -> list[dict]:
+            result = self.db.execute(text(sql), params or {})
+            columns = result.keys()
+            fetched = result.fetchmany(max_rows) if max_rows else result.fetchall()
+            return [dict(zip(columns, row)) for row in fetched]
+
+        with tracer.span("db") as span:
+            rows = await self.run_db(fetch)
+            span.rows = len(rows)
+        return rows
+
+    # Tables always included in this agent's pruned schema
+    schema_tables: tuple[str, ...] = ()
+
+    def get_schema(self, task: str | None = None) -> str:
+        """
+        Get the database schema for SQL generation.
+
+        With a task, only the tables it needs are included (see app.schema),
+        unless the provider caches prompt prefixes. SQL system prompts are
+        fixed instructions followed by this schema, with the task in the
+        user message, so with the full schema the whole system prompt is
+        the same on every call and is served from the provider's cache.
+        """
+        if task is None or self.llm.caches_prompt_prefix():
+            return DATABASE_SCHEMA
+        return pruned_schema(task, DATABASE_SCHEMA, self.schema_tables)
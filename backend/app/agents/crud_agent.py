@@ -3,33 +3,27 @@ CRUD Agent for FinBank AI.
 Handles Create, Update, and Delete operations for database records.
 """
 
+from typing import Optional
+from pydantic import BaseModel
 from sqlalchemy import text
 from app.agents.base import BaseAgent, AgentResult
+from app.deadline import Deadline
+from app.llm.structured import StructuredOutputError
 import re
 import json
 
 
-def extract_json_from_llm_response(content: str) -> dict:
-    """
-    Extract JSON from LLM response.
-    Handles cases where LLM returns extra text, code blocks, or explanations.
-    """
-    # Try to find JSON in code blocks first
-    if "```json" in content:
-        json_str = content.split("```json")[1].split("```")[0].strip()
-    elif "```" in content:
-        json_str = content.split("```")[1].split("```")[0].strip()
-    else:
-        json_str = content.strip()
-
-    # If json_str still contains text before the JSON, try to extract just the JSON object
-    # Look for the first { and last }
-    if "{" in json_str and "}" in json_str:
-        start_idx = json_str.find("{")
-        end_idx = json_str.rfind("}") + 1
-        json_str = json_str[start_idx:end_idx]
-
-    return json.loads(json_str)
+class CustomerDetails(BaseModel):
+    """Customer fields extracted from a create request."""
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    address: Optional[str] = None
+    city: Optional[str] = None
+    tier: Optional[str] = None
+    branch: Optional[str] = None
+    missing: Optional[list[str]] = None
 
 
 class CRUDAgent(BaseAgent):
@@ -37,9 +31,11 @@ class CRUDAgent(BaseAgent):
 
     name = "crud"
     description = "Creates, updates, or deletes customer, account, and transaction records"
+    read_only = False
 
-    async def execute(self, task: str) -> AgentResult:
+    async def execute(self, task: str, deadline: Deadline | None = None) -> AgentResult:
         """Execute a CRUD task."""
+        self.deadline = deadline
         try:
             # DEBUG: Print received task
             print(f"\n{'='*60}")
@@ -123,23 +119,21 @@ If any REQUIRED field (first_name, last_name, email) is missing, return:
 }}
 """
 
-        response = await self.llm.generate(
-            prompt=extraction_prompt,
-            system_prompt="You are a data extraction assistant. Return ONLY valid JSON, nothing else.",
-            temperature=0.1,
-            max_tokens=300
-        )
-
-        # DEBUG: Print LLM response
-        print(f"CRUD AGENT: LLM extraction response: {response.content}")
-
         # Parse the response
         try:
-            data = extract_json_from_llm_response(response.content)
+            details = await self.llm.generate_json(
+                prompt=extraction_prompt,
+                schema=CustomerDetails,
+                system_prompt="You are a data extraction assistant.",
+                temperature=0.1,
+                max_tokens=300,
+                deadline=self.deadline,
+            )
+            data = details.model_dump(exclude_none=True)
             print(f"CRUD AGENT: Parsed data: {data}")
 
             # Check if there are missing fields
-            if "missing" in data:
+            if data.get("missing"):
                 missing_fields = ", ".join(data["missing"])
                 return AgentResult(
                     success=False,
@@ -208,7 +202,7 @@ If any REQUIRED field (first_name, last_name, email) is missing, return:
                 message=f"✅ Successfully created customer: {data['first_name']} {data['last_name']} (ID: {new_id})",
             )
 
-        except json.JSONDecodeError:
+        except StructuredOutputError:
             return AgentResult(
                 success=False,
                 data=None,
@@ -8,6 +8,8 @@ import io
 from datetime import datetime
 from sqlalchemy import text
 from app.agents.base import BaseAgent, AgentResult
+from app.deadline import Deadline
+from app.tracing import tracer
 
 
 class ExportAgent(BaseAgent):
@@ -16,8 +18,9 @@ class ExportAgent(BaseAgent):
     name = "export"
     description = "Generates account statements, CSV exports, and formatted reports"
 
-    async def execute(self, task: str) -> AgentResult:
+    async def execute(self, task: str, deadline: Deadline | None = None) -> AgentResult:
         """Execute an export task."""
+        self.deadline = deadline
         try:
             # Determine export type from task
             export_type = await self._determine_export_type(task)
@@ -49,16 +52,14 @@ class ExportAgent(BaseAgent):
     async def _generate_statement(self, task: str) -> AgentResult:
         """Generate an account statement."""
         # Parse account from task
-        sql = await self.llm.generate_sql(
+        request = (
             f"Get transactions for the account mentioned in: {task}. "
             "Include transaction_id, type, amount, description, created_at. "
-            "Also get account balance and customer name.",
-            self.get_schema()
+            "Also get account balance and customer name."
         )
+        sql = await self.llm.generate_sql(request, self.get_schema(request), deadline=self.deadline)
 
-        result = self.db.execute(text(sql))
-        columns = result.keys()
-        rows = [dict(zip(columns, row)) for row in result.fetchall()]
+        rows = await self.run_query(sql)
 
         # Format as statement
         statement = {
@@ -78,11 +79,15 @@ class ExportAgent(BaseAgent):
     async def _generate_csv(self, task: str) -> AgentResult:
         """Generate CSV export."""
         # Generate SQL for the requested data
-        sql = await self.llm.generate_sql(task, self.get_schema())
+        sql = await self.llm.generate_sql(task, self.get_schema(task), deadline=self.deadline)
 
-        result = self.db.execute(text(sql))
-        columns = list(result.keys())
-        rows = result.fetchall()
+        def fetch() -> tuple[list[str], list]:
+            result = self.db.execute(text(sql))
+            return list(result.keys()), result.fetchall()
+
+        with tracer.span("db") as span:
+            columns, rows = await self.run_db(fetch)
+            span.rows = len(rows)
 
         # Convert to CSV
         output = io.StringIO()
@@ -106,11 +111,10 @@ class ExportAgent(BaseAgent):
     async def _generate_report(self, task: str) -> AgentResult:
         """Generate a formatted report."""
         # Generate SQL for the report
-        sql = await self.llm.generate_sql(task, self.get_schema())
+        sql = await self.llm.generate_sql(task, self.get_schema(task), deadline=self.deadline)
 
-        result = self.db.execute(text(sql))
-        columns = list(result.keys())
-        rows = [dict(zip(columns, row)) for row in result.fetchall()]
+        rows = await self.run_query(sql)
+        columns = list(rows[0].keys()) if rows else []
 
         # Format as report
         report = {
@@ -3,8 +3,11 @@ Query Agent for FinBank AI.
 Handles SELECT queries for customer, account, and transaction data.
 """
 
-from sqlalchemy import text
 from app.agents.base import BaseAgent, AgentResult
+from app.config import get_settings
+from app.deadline import Deadline, DeadlineExceeded
+from app.sql_guard import UnsafeSqlError
+from app.sql_templates import render, sql_template_cache
 
 
 class QueryAgent(BaseAgent):
@@ -12,58 +15,43 @@ class QueryAgent(BaseAgent):
 
     name = "query"
     description = "Handles SELECT queries for customer, account, transaction, and loan data"
+    accepts_planned_sql = True
 
-    async def execute(self, task: str) -> AgentResult:
+    async def execute(self, task: str, deadline: Deadline | None = None) -> AgentResult:
         """Execute a query task."""
+        self.deadline = deadline
+        use_templates = get_settings().sql_template_cache_enabled
         try:
-            # Generate SQL from the task description
-            system_prompt = f"""You are a SQL query generator. Generate ONLY valid SQLite SELECT queries.
-Database Schema:
-{self.get_schema()}
-
-Rules:
-- Return ONLY the SQL query, nothing else
-- Use SQLite syntax
-- Use || for string concatenation
-- Use LIMIT and OFFSET for pagination
-- For dates, use strftime()
-"""
-
-            response = await self.llm.generate(
-                prompt=f"Generate a SELECT query for: {task}",
-                system_prompt=system_prompt,
-                temperature=0.1,
-                max_tokens=500
-            )
+            # Use the fused planner's SQL when available, then a cached
+            # template for the task's shape, otherwise generate it
+            sql = self.use_planned_sql()
+            template = sql_template_cache.lookup(self.name, task) if sql is None and use_templates else None
+            if template is not None:
+                try:
+                    return await self._run_sql(*template)
+                except DeadlineExceeded:
+                    raise
+                except Exception:
+                    # A template that no longer runs is dropped and the SQL regenerated
+                    self.db.rollback()
+                    sql_template_cache.discard(self.name, task)
+            if sql is None:
+                sql = await self._generate_task_sql(task)
 
-            sql = response.content.strip()
-            # Remove markdown code blocks if present
-            if "```sql" in sql:
-                sql = sql.split("```sql")[1].split("```")[0].strip()
-            elif "```" in sql:
-                sql = sql.split("```")[1].split("```")[0].strip()
-
-            # Validate it's a SELECT query
-            sql_upper = sql.strip().upper()
-            if not sql_upper.startswith("SELECT"):
+            try:
+                result = await self._run_sql(sql)
+            except UnsafeSqlError as e:
                 return AgentResult(
                     success=False,
                     data=None,
-                    message="Query agent can only execute SELECT queries",
+                    message=f"Query agent can only execute a single, safe SELECT query: {e}",
                     sql=sql,
                 )
 
-            # Execute the query
-            result = self.db.execute(text(sql))
-            columns = result.keys()
-            rows = [dict(zip(columns, row)) for row in result.fetchall()]
-
-            return AgentResult(
-                success=True,
-                data=rows,
-                message=f"Found {len(rows)} records",
-                sql=sql,
-            )
+            # Templates keep the SQL as generated; the guard runs on every use
+            if use_templates:
+                sql_template_cache.store(self.name, task, sql)
+            return result
 
         except Exception as e:
             return AgentResult(
@@ -71,3 +59,40 @@ Rules:
                 data=None,
                 message=f"Query failed: {str(e)}",
             )
+
+    async def _run_sql(self, sql: str, params: dict | None = None) -> AgentResult:
+        """Guard and run a statement; raises UnsafeSqlError or the database error."""
+        # Reject unsafe statements and cap the rows returned
+        guarded = self.check_sql(sql)
+        rows = await self.run_query(guarded.sql, params, max_rows=guarded.max_rows)
+        return AgentResult(
+            success=True,
+            data=rows,
+            message=f"Found {len(rows)} records",
+            sql=render(guarded.sql, params) if params else guarded.sql,
+            sql_rewrites=guarded.rewrites,
+        )
+
+    async def _generate_task_sql(self, task: str) -> str:
+        """Generate the SQL for a task with the LLM."""
+        # Generate SQL from the task description
+        system_prompt = f"""You are a SQL query generator. Generate ONLY valid SQLite SELECT queries.
+
+Rules:
+- Return ONLY the SQL query, nothing else
+- Use SQLite syntax
+- Use || for string concatenation
+- Use LIMIT and OFFSET for pagination
+- For dates, use strftime()
+
+Database Schema:
+{self.get_schema(task)}
+"""
+
+        return await self.llm.complete_sql(
+            prompt=f"Generate a SELECT query for: {task}",
+            system_prompt=system_prompt,
+            temperature=0.1,
+            max_tokens=500,
+            deadline=self.deadline,
+        )
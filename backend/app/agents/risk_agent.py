@@ -3,8 +3,9 @@ Risk Agent for FinBank AI.
 Handles fraud detection and suspicious transaction analysis.
 """
 
-from sqlalchemy import text
 from app.agents.base import BaseAgent, AgentResult
+from app.deadline import Deadline
+from app.sql_guard import UnsafeSqlError
 
 
 class RiskAgent(BaseAgent):
@@ -12,27 +13,29 @@ class RiskAgent(BaseAgent):
 
     name = "risk"
     description = "Detects suspicious transactions, anomalies, and potential fraud"
+    # Results always include customer name and account number
+    schema_tables = ("customers", "accounts", "transactions")
 
-    async def execute(self, task: str) -> AgentResult:
+    async def execute(self, task: str, deadline: Deadline | None = None) -> AgentResult:
         """Execute a risk analysis task."""
+        self.deadline = deadline
         try:
             # Generate SQL for risk analysis
-            sql = await self.llm.generate_sql(task, self.get_risk_schema())
+            sql = await self.llm.generate_sql(task, self.get_risk_schema(task), deadline=self.deadline)
 
-            # Validate it's a SELECT query
-            sql_upper = sql.strip().upper()
-            if not sql_upper.startswith("SELECT"):
+            # Reject unsafe statements and cap the rows returned
+            try:
+                guarded = self.check_sql(sql)
+            except UnsafeSqlError as e:
                 return AgentResult(
                     success=False,
                     data=None,
-                    message="Risk agent can only execute SELECT queries",
+                    message=f"Risk agent can only execute a single, safe SELECT query: {e}",
                     sql=sql,
                 )
 
             # Execute the query
-            result = self.db.execute(text(sql))
-            columns = result.keys()
-            rows = [dict(zip(columns, row)) for row in result.fetchall()]
+            rows = await self.run_query(guarded.sql, max_rows=guarded.max_rows)
 
             # Add risk assessment
             flagged = []
@@ -51,7 +54,8 @@ class RiskAgent(BaseAgent):
                     "total_count": len(rows),
                 },
                 message=f"Analyzed {len(rows)} transactions, {len(flagged)} flagged for review",
-                sql=sql,
+                sql=guarded.sql,
+                sql_rewrites=guarded.rewrites,
             )
 
         except Exception as e:
@@ -74,10 +78,9 @@ class RiskAgent(BaseAgent):
         else:
             return "LOW"
 
-    def get_risk_schema(self) -> str:
+    def get_risk_schema(self, task: str | None = None) -> str:
         """Get schema optimized for risk queries."""
-        return self.get_schema() + """
-
+        return """
 Risk detection patterns:
 - Large transactions: WHERE amount > 10000
 - Recent large transactions: WHERE amount > 10000 AND created_at >= DATEADD(day, -7, GETDATE())
@@ -88,4 +91,5 @@ Risk detection patterns:
 
 Sort results by amount DESC to show largest first.
 Include customer name and account number in results.
-"""
+
+Database Schema:""" + self.get_schema(task)
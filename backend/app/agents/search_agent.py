@@ -3,8 +3,9 @@ Search Agent for FinBank AI.
 Handles full-text and partial match searches for customers and accounts.
 """
 
-from sqlalchemy import text
 from app.agents.base import BaseAgent, AgentResult
+from app.deadline import Deadline
+from app.sql_guard import UnsafeSqlError
 
 
 class SearchAgent(BaseAgent):
@@ -12,55 +13,35 @@ class SearchAgent(BaseAgent):
 
     name = "search"
     description = "Searches for customers, accounts by name, account number, or partial match"
+    accepts_planned_sql = True
 
-    async def execute(self, task: str) -> AgentResult:
+    async def execute(self, task: str, deadline: Deadline | None = None) -> AgentResult:
         """Execute a search task."""
+        self.deadline = deadline
         try:
-            # Generate SQL with LIKE patterns
-            system_prompt = f"""You are a SQL query generator for search operations. Generate ONLY valid SQLite SELECT queries.
-{self.get_search_schema()}
+            # Use the fused planner's SQL when available, otherwise generate it
+            sql = self.use_planned_sql() or await self._generate_task_sql(task)
 
-Rules:
-- Return ONLY the SQL query, nothing else
-- Use LIKE with % wildcards for partial matches
-- Use LOWER() for case-insensitive searches
-- Use SQLite syntax
-"""
-
-            response = await self.llm.generate(
-                prompt=f"Generate a search SELECT query for: {task}",
-                system_prompt=system_prompt,
-                temperature=0.1,
-                max_tokens=500
-            )
-
-            sql = response.content.strip()
-            # Remove markdown code blocks if present
-            if "```sql" in sql:
-                sql = sql.split("```sql")[1].split("```")[0].strip()
-            elif "```" in sql:
-                sql = sql.split("```")[1].split("```")[0].strip()
-
-            # Validate it's a SELECT query
-            sql_upper = sql.strip().upper()
-            if not sql_upper.startswith("SELECT"):
+            # Reject unsafe statements and cap the rows returned
+            try:
+                guarded = self.check_sql(sql)
+            except UnsafeSqlError as e:
                 return AgentResult(
                     success=False,
                     data=None,
-                    message="Search agent can only execute SELECT queries",
+                    message=f"Search agent can only execute a single, safe SELECT query: {e}",
                     sql=sql,
                 )
 
             # Execute the query
-            result = self.db.execute(text(sql))
-            columns = result.keys()
-            rows = [dict(zip(columns, row)) for row in result.fetchall()]
+            rows = await self.run_query(guarded.sql, max_rows=guarded.max_rows)
 
             return AgentResult(
                 success=True,
                 data=rows,
                 message=f"Found {len(rows)} matching records",
-                sql=sql,
+                sql=guarded.sql,
+                sql_rewrites=guarded.rewrites,
             )
 
         except Exception as e:
@@ -70,10 +51,29 @@ Rules:
                 message=f"Search failed: {str(e)}",
             )
 
-    def get_search_schema(self) -> str:
-        """Get schema optimized for search queries."""
-        return self.get_schema() + """
+    async def _generate_task_sql(self, task: str) -> str:
+        """Generate the SQL for a task with the LLM."""
+        # Generate SQL with LIKE patterns
+        system_prompt = f"""You are a SQL query generator for search operations. Generate ONLY valid SQLite SELECT queries.
 
+Rules:
+- Return ONLY the SQL query, nothing else
+- Use LIKE with % wildcards for partial matches
+- Use LOWER() for case-insensitive searches
+- Use SQLite syntax
+{self.get_search_schema(task)}"""
+
+        return await self.llm.complete_sql(
+            prompt=f"Generate a search SELECT query for: {task}",
+            system_prompt=system_prompt,
+            temperature=0.1,
+            max_tokens=500,
+            deadline=self.deadline,
+        )
+
+    def get_search_schema(self, task: str | None = None) -> str:
+        """Get schema optimized for search queries."""
+        return """
 Search patterns:
 - Partial name match: WHERE first_name LIKE '%john%' OR last_name LIKE '%john%'
 - Account number search: WHERE account_number LIKE 'CHK-%'
@@ -83,4 +83,5 @@ Search patterns:
 
 Always use LIKE with % wildcards for partial matches.
 Use ILIKE or LOWER() for case-insensitive searches.
-"""
+
+Database Schema:""" + self.get_schema(task)
@@ -5,8 +5,30 @@ Handles deposits, withdrawals, and transfers.
 
 import uuid
 from decimal import Decimal
+from typing import Literal, Optional
+from pydantic import BaseModel, Field, model_validator
 from sqlalchemy import text
 from app.agents.base import BaseAgent, AgentResult
+from app.deadline import Deadline
+
+
+# Account numbers look like CHK-001234
+ACCOUNT_NUMBER_PATTERN = r"^[A-Z]{2,4}-\d{4,}$"
+
+
+class TransactionRequest(BaseModel):
+    """Transaction details extracted from a task."""
+    type: Literal["deposit", "withdrawal", "transfer"]
+    amount: Decimal = Field(gt=0, decimal_places=2)
+    account: str = Field(pattern=ACCOUNT_NUMBER_PATTERN)
+    to_account: Optional[str] = Field(default=None, pattern=ACCOUNT_NUMBER_PATTERN)
+    description: Optional[str] = None
+
+    @model_validator(mode="after")
+    def check_transfer(self) -> "TransactionRequest":
+        if self.type == "transfer" and (self.to_account is None or self.to_account == self.account):
+            raise ValueError("a transfer needs a different destination account")
+        return self
 
 
 class TransactionAgent(BaseAgent):
@@ -14,9 +36,11 @@ class TransactionAgent(BaseAgent):
 
     name = "transaction"
     description = "Processes deposits, withdrawals, and transfers between accounts"
+    read_only = False
 
-    async def execute(self, task: str) -> AgentResult:
+    async def execute(self, task: str, deadline: Deadline | None = None) -> AgentResult:
         """Execute a transaction task."""
+        self.deadline = deadline
         try:
             # Parse the transaction details from the task
             operation = await self._parse_transaction(task)
@@ -51,19 +75,12 @@ class TransactionAgent(BaseAgent):
 - description: brief description of the transaction
 
 Example response:
-{"type": "transfer", "amount": 500, "account": "CHK-001234", "to_account": "SAV-001234", "description": "Monthly savings"}
-
-Return only the JSON object."""
+{"type": "transfer", "amount": 500, "account": "CHK-001234", "to_account": "SAV-001234", "description": "Monthly savings"}"""
 
-        response = await self.llm.generate(task, system_prompt, temperature=0.1)
-
-        import json
-        content = response.content.strip()
-        if content.startswith("```"):
-            content = content.split("```")[1]
-            if content.startswith("json"):
-                content = content[4:]
-        return json.loads(content)
+        operation = await self.llm.generate_json(
+            task, TransactionRequest, system_prompt, temperature=0.1, deadline=self.deadline
+        )
+        return operation.model_dump(exclude_none=True)
 
     async def _process_deposit(self, operation: dict) -> AgentResult:
         """Process a deposit transaction."""
@@ -0,0 +1,104 @@
+"""
+Result budgeting for FinBank AI.
+Shrinks agent results to a token budget before they are sent to the LLM
+for synthesis. The full results are kept for the client.
+"""
+
+import json
+from decimal import Decimal
+from typing import Any
+
+from app.config import get_settings
+
+
+# Payload keys that are never useful to the synthesizing LLM
+BULKY_KEYS = {"csv"}
+
+# Rough characters-per-token ratio used for estimates
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(value: Any) -> int:
+    """Estimate how many prompt tokens a value costs once stringified."""
+    return len(str(value)) // CHARS_PER_TOKEN + 1
+
+
+def _is_rows(value: Any) -> bool:
+    """Check whether a value looks like a list of result rows."""
+    return isinstance(value, list) and bool(value) and all(isinstance(row, dict) for row in value)
+
+
+def column_stats(rows: list[dict]) -> dict[str, dict]:
+    """Summarize each column of a result set."""
+    stats = {}
+    for column in rows[0].keys():
+        values = [row.get(column) for row in rows if row.get(column) is not None]
+        numbers = [float(v) for v in values if isinstance(v, (int, float, Decimal)) and not isinstance(v, bool)]
+        if numbers and len(numbers) == len(values):
+            stats[column] = {
+                "min": min(numbers),
+                "max": max(numbers),
+                "sum": round(sum(numbers), 2),
+                "avg": round(sum(numbers) / len(numbers), 2),
+            }
+        else:
+            stats[column] = {"distinct": len({str(v) for v in values}), "nulls": len(rows) - len(values)}
+    return stats
+
+
+def _summarize_rows(rows: list[dict], top_rows: int) -> dict:
+    """Replace a row list with its count, column stats and the first rows."""
+    summary = {"row_count": len(rows), "rows": rows[:top_rows]}
+    if len(rows) > top_rows:
+        summary["columns"] = column_stats(rows)
+        summary["truncated"] = True
+    return summary
+
+
+def _shrink(value: Any, top_rows: int) -> Any:
+    """Recursively shrink row lists and drop bulky payloads."""
+    if _is_rows(value):
+        return _summarize_rows(value, top_rows)
+    if isinstance(value, dict):
+        shrunk = {}
+        for key, item in value.items():
+            if key in BULKY_KEYS and isinstance(item, str):
+                shrunk[key] = f"<{len(item)} characters omitted>"
+            else:
+                shrunk[key] = _shrink(item, top_rows)
+        return shrunk
+    return value
+
+
+def budget_results(
+    agent_results: dict,
+    max_tokens: int | None = None,
+    top_rows: int | None = None,
+) -> dict:
+    """
+    Fit agent results into a prompt token budget.
+
+    Row lists are reduced to their count, column stats and top rows, and
+    bulky payloads such as CSV bodies are dropped. If that is still over
+    budget the number of rows kept is halved until it fits.
+    """
+    settings = get_settings()
+    max_tokens = max_tokens if max_tokens is not None else settings.synthesis_token_budget
+    top_rows = top_rows if top_rows is not None else settings.synthesis_top_rows
+
+    while True:
+        budgeted = {agent: _shrink(result, top_rows) for agent, result in agent_results.items()}
+        if top_rows == 0 or estimate_tokens(budgeted) <= max_tokens:
+            break
+        top_rows //= 2
+
+    # Last resort: cut the text itself so the prompt size is bounded
+    if estimate_tokens(budgeted) > max_tokens:
+        per_agent = max_tokens * CHARS_PER_TOKEN // max(len(budgeted), 1)
+        truncated = {}
+        for agent, result in budgeted.items():
+            text = json.dumps(result, default=str)
+            truncated[agent] = text if len(text) <= per_agent else text[:per_agent] + "...(truncated)"
+        budgeted = truncated
+
+    return budgeted
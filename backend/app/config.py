@@ -26,8 +26,127 @@ class Settings(BaseSettings):
     azure_openai_deployment: Optional[str] = None
     ollama_base_url: str = "http://localhost:11434"
 
+    # Ollama HTTP connection pool (timeouts in seconds)
+    ollama_max_connections: int = 20
+    ollama_max_keepalive_connections: int = 10
+    ollama_keepalive_expiry: float = 60.0
+    ollama_connect_timeout: float = 5.0
+    ollama_write_timeout: float = 10.0
+    ollama_pool_timeout: float = 10.0
+    # Requests the Ollama server runs in parallel (its OLLAMA_NUM_PARALLEL)
+    ollama_num_parallel: int = 4
+
+    # Provider-side prompt prefix caching (Claude cache_control blocks)
+    prompt_caching_enabled: bool = True
+
+    # Ollama model warm-up: models preloaded at startup and refreshed every
+    # interval seconds (empty list: the default model, when the default
+    # provider is Ollama); every request also sends keep_alive so the loaded
+    # model and its prefix KV cache stay in memory between calls
+    ollama_keep_alive: str = "30m"
+    ollama_warmup_enabled: bool = True
+    ollama_warmup_models: list[str] = []
+    ollama_warmup_interval: float = 600.0
+
     # Default LLM provider
-    default_llm_provider: str = "openai"  # openai, claude, azure, ollama
+    default_llm_provider: str = "openai"  # openai, claude, azure, ollama, replay
+
+    # Replay provider for load tests: "record" captures responses from
+    # replay_record_provider, "replay" serves them back with synthetic latency
+    # (none, fixed, uniform, lognormal or recorded)
+    replay_mode: str = "replay"
+    replay_file: str = "llm_recordings.jsonl"
+    replay_record_provider: str = "ollama"
+    replay_latency_distribution: str = "none"
+    replay_latency_ms: float = 0.0
+    replay_latency_jitter_ms: float = 0.0
+    replay_seed: Optional[int] = None
+    replay_chunk_size: int = 16
+    replay_chunk_delay_ms: float = 0.0
+
+    # Planner cache (set size to 0 to disable)
+    plan_cache_size: int = 512
+    plan_cache_ttl_seconds: float = 600.0
+
+    # Parameterized SQL per task shape: requests differing only in literals
+    # (account numbers, names, amounts, dates) reuse SQL without an LLM call
+    sql_template_cache_enabled: bool = True
+    sql_template_cache_size: int = 512
+    sql_template_cache_ttl_seconds: float = 86400.0
+
+    # Row cap for read agents' generated SQL, enforced by injecting or
+    # tightening LIMIT/TOP and when fetching results
+    sql_max_rows: int = 1000
+
+    # LLM response cache for low-temperature calls (memory LRU in front of SQLite)
+    llm_cache_enabled: bool = True
+    llm_cache_max_temperature: float = 0.2
+    llm_cache_memory_size: int = 1024
+    llm_cache_disk_max_entries: int = 10000  # 0 keeps the cache in memory only
+    llm_cache_path: str = "llm_cache.sqlite3"
+    llm_cache_ttl_seconds: float = 604800.0
+
+    # Per-provider admission control: token bucket (0 disables), adaptive
+    # in-flight cap and jittered retries of transient errors
+    llm_rate_limit_per_second: float = 0.0
+    llm_rate_limit_burst: int = 20
+    llm_initial_concurrency: int = 8
+    llm_min_concurrency: int = 1
+    llm_max_concurrency: int = 64
+    llm_latency_threshold: float = 60.0
+    llm_max_retries: int = 3
+    llm_retry_base_delay: float = 0.5
+    llm_retry_max_delay: float = 8.0
+
+    # Default prompts in flight per generate_many call (Ollama uses
+    # ollama_num_parallel instead)
+    llm_batch_concurrency: int = 16
+
+    # Hedged requests: once the primary has taken longer than the given
+    # percentile of recent latencies for a call type (planning, sql,
+    # synthesis), send a backup request to hedge_provider
+    hedge_provider: Optional[str] = None
+    hedge_model: Optional[str] = None
+    hedge_percentiles: dict[str, float] = {"planning": 95.0, "sql": 95.0}
+    hedge_min_samples: int = 20
+    hedge_min_delay: float = 0.5
+    hedge_window: int = 200
+
+    # Share one LLM call between identical concurrent generate calls
+    llm_coalescing_enabled: bool = True
+
+    # Rule-based fast-path router in front of the LLM planner
+    fast_router_enabled: bool = True
+    fast_router_min_confidence: float = 0.8
+
+    # Fused planning: one LLM call returns the plan plus SQL for read-only agents
+    fused_planning_enabled: bool = False
+
+    # Send only the tables a task needs in SQL prompts; above max_tables the
+    # full schema is used instead
+    schema_pruning_enabled: bool = True
+    schema_pruning_max_tables: int = 6
+
+    # Stream SQL generation calls and cancel them once a complete statement
+    # has been parsed; off, SQL calls use generate with a ";" stop sequence
+    sql_stream_extraction: bool = True
+
+    # Tracing (number of spans kept for /api/metrics)
+    trace_buffer_size: int = 5000
+
+    # Result budgeting before synthesis
+    synthesis_token_budget: int = 3000
+    synthesis_top_rows: int = 20
+
+    # Request deadlines (seconds)
+    chat_request_timeout: float = 90.0
+    llm_call_timeout: float = 120.0
+    min_synthesis_time: float = 3.0
+
+    # Batch chat endpoint
+    batch_chat_concurrency: int = 8
+    batch_chat_max_concurrency: int = 32
+    batch_chat_max_messages: int = 500
 
     # Azure AD
     azure_ad_tenant_id: Optional[str] = None
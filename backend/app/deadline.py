@@ -0,0 +1,55 @@
+"""
+Request deadlines for FinBank AI.
+A deadline is created per chat request and passed down through the
+orchestrator, agents and LLM providers so every stage works within the
+time the request has left.
+"""
+
+import time
+from typing import Optional
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a request has run out of time."""
+
+
+class Deadline:
+    """An absolute point in time by which a request must finish."""
+
+    def __init__(self, timeout_seconds: Optional[float] = None):
+        self.timeout_seconds = timeout_seconds
+        self.expires_at = time.monotonic() + timeout_seconds if timeout_seconds else None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, or None if the deadline is unbounded."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def check(self) -> None:
+        """Raise DeadlineExceeded if there is no time left."""
+        if self.expired:
+            raise DeadlineExceeded(f"Request exceeded its {self.timeout_seconds:.0f}s deadline")
+
+    def timeout(self, cap: Optional[float] = None) -> Optional[float]:
+        """
+        Get the timeout for the next stage.
+
+        Returns the remaining time, capped at the stage's own limit, and
+        raises DeadlineExceeded if nothing is left.
+        """
+        self.check()
+        remaining = self.remaining()
+        if remaining is None:
+            return cap
+        return remaining if cap is None else min(remaining, cap)
+
+
+def stage_timeout(deadline: Optional[Deadline], cap: Optional[float] = None) -> Optional[float]:
+    """Timeout for a stage that may or may not run under a deadline."""
+    return deadline.timeout(cap) if deadline else cap
@@ -0,0 +1,78 @@
+"""
+Typed chat events for FinBank AI.
+The orchestrator yields these events and each transport serializes them
+once, instead of formatting and re-parsing prefixed strings.
+"""
+
+from typing import Any, ClassVar, Literal, Optional
+from pydantic import BaseModel
+
+
+class ChatEvent(BaseModel):
+    """Base class for events emitted while processing a chat message."""
+    type: str
+    content: str = ""
+
+    def to_ws_message(self) -> dict:
+        """Serialize the event as a WebSocket frame."""
+        return {"type": self.type, "content": self.content}
+
+
+class StatusEvent(ChatEvent):
+    """Progress update for the user."""
+    type: Literal["status"] = "status"
+
+
+class AgentEvent(ChatEvent):
+    """Base class for events about a single planned agent task."""
+    agent: str
+    task_index: int = 0
+
+    # Status of the "agent" WebSocket frame understood by the frontend
+    ws_status: ClassVar[str] = "running"
+
+    def to_ws_message(self) -> dict:
+        return {
+            "type": "agent",
+            "agent": self.agent,
+            "status": self.ws_status,
+            "content": self.content,
+            "task_index": self.task_index,
+        }
+
+
+class AgentStartedEvent(AgentEvent):
+    """An agent started working on a task; content is the task description."""
+    type: Literal["agent_started"] = "agent_started"
+    ws_status: ClassVar[str] = "running"
+
+
+class AgentDoneEvent(AgentEvent):
+    """An agent finished; content is its message and data its full result."""
+    type: Literal["agent_done"] = "agent_done"
+    ws_status: ClassVar[str] = "done"
+    data: Any = None
+
+    def to_ws_message(self) -> dict:
+        return {**super().to_ws_message(), "data": self.data}
+
+
+class AgentErrorEvent(AgentEvent):
+    """An agent raised an error; content is the error message."""
+    type: Literal["agent_error"] = "agent_error"
+    ws_status: ClassVar[str] = "error"
+
+
+class ResponseDeltaEvent(ChatEvent):
+    """A chunk of response text while synthesis is streaming."""
+    type: Literal["response_delta"] = "response_delta"
+
+
+class ResponseEvent(ChatEvent):
+    """The complete final response, with the full agent results."""
+    type: Literal["response"] = "response"
+    data: Optional[dict] = None
+
+    def to_ws_message(self) -> dict:
+        # Full results already went out on the agent "done" frames
+        return {"type": "response", "content": self.content, "complete": True}
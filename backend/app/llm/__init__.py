@@ -3,47 +3,58 @@ LLM provider factory for FinBank AI.
 """
 
 from typing import Literal
-from app.llm.base import BaseLLMProvider, LLMResponse
+from app.llm.base import BaseLLMProvider, BatchItem, BatchResponse, LLMResponse
 from app.llm.openai_provider import OpenAIProvider
 from app.llm.claude_provider import ClaudeProvider
 from app.llm.ollama_provider import OllamaProvider
-from app.config import get_settings
+from app.llm.replay_provider import ReplayProvider
+from app.llm.wrappers import (
+    CachedProvider,
+    CoalescingProvider,
+    HedgedProvider,
+    LimitedProvider,
+    ProviderWrapper,
+    TracedProvider,
+)
+from app.llm.registry import ProviderRegistry, provider_registry
 
-ProviderType = Literal["openai", "claude", "azure", "ollama"]
+ProviderType = Literal["openai", "claude", "azure", "ollama", "replay"]
 
 
-def get_llm_provider(provider_type: ProviderType | None = None) -> BaseLLMProvider:
+def get_llm_provider(provider_type: ProviderType | None = None, model: str | None = None) -> BaseLLMProvider:
     """
     Get an LLM provider instance.
 
+    Instances are shared across requests, one per provider and model.
+
     Args:
-        provider_type: The provider to use. If None, uses the default from settings.
+        provider_type: The provider to use. If None, uses the current default.
+        model: The model to use. If None, uses the provider's default model.
 
     Returns:
-        An LLM provider instance.
+        An LLM provider instance, wrapped for coalescing, caching, admission control
+        and tracing.
     """
-    settings = get_settings()
-    provider = provider_type or settings.default_llm_provider
-
-    if provider == "openai":
-        return OpenAIProvider()
-    elif provider == "claude":
-        return ClaudeProvider()
-    elif provider == "azure":
-        # Azure OpenAI uses the same interface as OpenAI
-        return OpenAIProvider(model=settings.azure_openai_deployment or "gpt-4")
-    elif provider == "ollama":
-        return OllamaProvider()
-    else:
-        raise ValueError(f"Unknown LLM provider: {provider}")
+    return provider_registry.get(provider_type, model)
 
 
 __all__ = [
     "BaseLLMProvider",
     "LLMResponse",
+    "BatchItem",
+    "BatchResponse",
     "OpenAIProvider",
     "ClaudeProvider",
     "OllamaProvider",
+    "ReplayProvider",
+    "ProviderWrapper",
+    "TracedProvider",
+    "CachedProvider",
+    "CoalescingProvider",
+    "HedgedProvider",
+    "LimitedProvider",
+    "ProviderRegistry",
+    "provider_registry",
     "get_llm_provider",
     "ProviderType",
 ]
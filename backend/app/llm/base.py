@@ -3,16 +3,53 @@ Base LLM provider interface for FinBank AI.
 All LLM providers must implement this interface.
 """
 
+import asyncio
 from abc import ABC, abstractmethod
 from typing import AsyncGenerator, Optional
 from pydantic import BaseModel
 
+from app.config import get_settings
+from app.deadline import Deadline
+from app.llm.cache import plan_cache, plan_cache_key, response_cache, response_cache_key
+from app.llm.sql_extractor import SQL_STOP_SEQUENCES, SqlStreamExtractor, extract_sql
+from app.llm.structured import ModelT, StructuredOutputError, model_schema, parse_structured, schema_instructions
+
 
 class LLMResponse(BaseModel):
     """Response from an LLM provider."""
     content: str
     model: str
     tokens_used: Optional[int] = None
+    # Input tokens served from the provider's prompt cache
+    cached_tokens: Optional[int] = None
+
+
+class BatchItem(BaseModel):
+    """Result for one prompt of a generate_many call."""
+    index: int
+    response: Optional[LLMResponse] = None
+    error: Optional[str] = None
+
+
+class BatchResponse(BaseModel):
+    """Results of a generate_many call, in prompt order."""
+    items: list[BatchItem]
+    tokens_used: int = 0
+    cached_tokens: int = 0
+    errors: int = 0
+
+
+class PlannedTask(BaseModel):
+    """One task of a plan from plan_tasks."""
+    agent: str
+    task: str
+    depends_on: Optional[list[int]] = None
+    sql: Optional[str] = None
+
+
+class TaskPlan(BaseModel):
+    """Planner output."""
+    tasks: list[PlannedTask]
 
 
 class BaseLLMProvider(ABC):
@@ -25,8 +62,14 @@ class BaseLLMProvider(ABC):
         system_prompt: Optional[str] = None,
         temperature: float = 0.7,
         max_tokens: int = 2000,
+        deadline: Optional[Deadline] = None,
+        stop: Optional[list[str]] = None,
+        json_schema: Optional[dict] = None,
     ) -> LLMResponse:
-        """Generate a response from the LLM."""
+        """
+        Generate a response from the LLM, ending early at any of the stop sequences.
+        With json_schema the provider's native JSON mode is used and the content is JSON.
+        """
         pass
 
     @abstractmethod
@@ -36,15 +79,179 @@ class BaseLLMProvider(ABC):
         system_prompt: Optional[str] = None,
         temperature: float = 0.7,
         max_tokens: int = 2000,
+        deadline: Optional[Deadline] = None,
+        stop: Optional[list[str]] = None,
     ) -> AsyncGenerator[str, None]:
-        """Generate a streaming response from the LLM."""
+        """Generate a streaming response from the LLM, ending early at any of the stop sequences."""
         pass
 
-    async def plan_tasks(self, user_message: str, available_agents: list[str]) -> list[dict]:
+    def batch_concurrency(self) -> int:
+        """How many generate_many requests to keep in flight by default."""
+        return get_settings().llm_batch_concurrency
+
+    async def generate_many(
+        self,
+        prompts: list[str],
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        deadline: Optional[Deadline] = None,
+        stop: Optional[list[str]] = None,
+        concurrency: Optional[int] = None,
+        json_schema: Optional[dict] = None,
+    ) -> BatchResponse:
+        """
+        Generate responses for many independent prompts.
+
+        Prompts run concurrently, at most `concurrency` at a time (default:
+        batch_concurrency()), each through generate so caching, coalescing
+        and admission control apply per prompt. A failed prompt is reported
+        on its item instead of failing the batch.
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency or self.batch_concurrency()))
+
+        async def run(index: int, prompt: str) -> BatchItem:
+            async with semaphore:
+                try:
+                    response = await self.generate(
+                        prompt, system_prompt, temperature, max_tokens, deadline, stop, json_schema
+                    )
+                except Exception as e:
+                    return BatchItem(index=index, error=str(e) or type(e).__name__)
+                return BatchItem(index=index, response=response)
+
+        items = await asyncio.gather(*(run(index, prompt) for index, prompt in enumerate(prompts)))
+        responses = [item.response for item in items if item.response is not None]
+        return BatchResponse(
+            items=items,
+            tokens_used=sum(response.tokens_used or 0 for response in responses),
+            cached_tokens=sum(response.cached_tokens or 0 for response in responses),
+            errors=len(items) - len(responses),
+        )
+
+    async def generate_json(
+        self,
+        prompt: str,
+        schema: type[ModelT],
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.1,
+        max_tokens: int = 2000,
+        deadline: Optional[Deadline] = None,
+    ) -> ModelT:
+        """
+        Generate a response validated against a pydantic model.
+
+        Uses the provider's native JSON mode (OpenAI response_format, a forced
+        Claude tool call, Ollama format) so the output is well-formed JSON.
+        A response that still fails validation is retried once with the
+        validation error; after that StructuredOutputError is raised.
+        """
+        schema_json = model_schema(schema)
+        system_prompt = schema_instructions(system_prompt, schema_json)
+        for attempt in range(2):
+            response = await self.generate(prompt, system_prompt, temperature, max_tokens, deadline, None, schema_json)
+            try:
+                return parse_structured(response.content, schema)
+            except StructuredOutputError as e:
+                if attempt:
+                    raise
+                prompt = f"{prompt}\n\nYour previous response was invalid ({e}). Respond again."
+
+    def caches_prompt_prefix(self) -> bool:
+        """Whether the provider caches marked system prompts, so they should not vary per task."""
+        return False
+
+    async def warm_up(self) -> Optional[float]:
+        """
+        Load the model ahead of the first request.
+        Returns the load time in seconds, or None if the provider has nothing to load.
+        """
+        return None
+
+    async def plan_tasks(
+        self,
+        user_message: str,
+        available_agents: list[str],
+        deadline: Optional[Deadline] = None,
+        sql_agents: Optional[list[str]] = None,
+        schema: Optional[str] = None,
+    ) -> list[dict]:
         """
         Ask the LLM to plan which agents to use for a user request.
         Returns a list of tasks with agent assignments.
+
+        When sql_agents and schema are given the plan is fused with SQL
+        generation: tasks for those read-only agents also carry a "sql"
+        statement, saving each agent its own SQL generation call.
+
+        Plans are cached on the normalized message and agent list, so repeated
+        phrasings skip the LLM round trip.
+        """
+        fused = bool(sql_agents and schema)
+        cache_key = plan_cache_key(user_message, available_agents, mode="fused" if fused else "plan")
+        cached = plan_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        try:
+            result = await self.generate_json(
+                prompt=f"User request: {user_message}",
+                schema=TaskPlan,
+                system_prompt=self._planner_prompt(sql_agents if fused else None, schema),
+                temperature=0.3,
+                deadline=deadline,
+            )
+        except StructuredOutputError:
+            return []
+
+        plan = [task.model_dump(exclude_none=True) for task in result.tasks]
+        if plan:
+            plan_cache.set(cache_key, plan)
+        return plan
+
+    async def plan_many(
+        self,
+        user_messages: list[str],
+        available_agents: list[str],
+        deadline: Optional[Deadline] = None,
+        concurrency: Optional[int] = None,
+    ) -> list[Optional[list[dict]]]:
         """
+        Plan many user requests with one generate_many batch.
+
+        Plans are cached as in plan_tasks. A request whose response failed
+        or did not validate gets None, so the caller can plan it with
+        plan_tasks, which retries invalid responses.
+        """
+        keys = [plan_cache_key(message, available_agents) for message in user_messages]
+        plans: list[Optional[list[dict]]] = [plan_cache.get(key) for key in keys]
+        pending = [index for index, plan in enumerate(plans) if plan is None]
+        if not pending:
+            return plans
+
+        schema_json = model_schema(TaskPlan)
+        batch = await self.generate_many(
+            [f"User request: {user_messages[index]}" for index in pending],
+            system_prompt=schema_instructions(self._planner_prompt(), schema_json),
+            temperature=0.3,
+            deadline=deadline,
+            concurrency=concurrency,
+            json_schema=schema_json,
+        )
+        for index, item in zip(pending, batch.items):
+            if item.response is None:
+                continue
+            try:
+                result = parse_structured(item.response.content, TaskPlan)
+            except StructuredOutputError:
+                continue
+            plans[index] = [task.model_dump(exclude_none=True) for task in result.tasks]
+            if plans[index]:
+                plan_cache.set(keys[index], plans[index])
+        return plans
+
+    def _planner_prompt(self, sql_agents: Optional[list[str]] = None, schema: Optional[str] = None) -> str:
+        """System prompt for plan_tasks; with sql_agents and schema, for a fused plan."""
         system_prompt = f"""You are a task planner for a banking AI assistant.
 Given a user request, determine which agents to use and what tasks to assign.
 
@@ -64,72 +271,114 @@ IMPORTANT ROUTING RULES:
 - Use "analytics" agent for: calculate, analyze, report, statistics
 - Use "search" agent for: search by partial name or account number
 
-Respond with a JSON array of tasks. Each task should have:
+Respond with a JSON object whose "tasks" array lists the tasks. Each task should have:
 - "agent": the agent name
 - "task": description of what the agent should do
+- "depends_on": (optional) list of 0-based indexes of earlier tasks that must finish first
+
+Tasks without "depends_on" run in parallel, so only add it when a task needs another task's result.
 
 Example response:
-[
+{{"tasks": [
   {{"agent": "crud", "task": "Create a new customer named John Smith"}},
-  {{"agent": "query", "task": "List all customers"}}
-]
+  {{"agent": "query", "task": "List all customers", "depends_on": [0]}}
+]}}
 
 Only use agents that are needed. Be specific about the task."""
 
-        response = await self.generate(
-            prompt=f"User request: {user_message}",
-            system_prompt=system_prompt,
-            temperature=0.3,
-        )
+        if sql_agents and schema:
+            agents = ", ".join(f'"{agent}"' for agent in sql_agents)
+            system_prompt += f"""
 
-        # Parse JSON from response
-        import json
-        try:
-            # Extract JSON array from response
-            content = response.content
-            start = content.find('[')
-            end = content.rfind(']') + 1
-            if start >= 0 and end > start:
-                return json.loads(content[start:end])
-        except json.JSONDecodeError:
-            pass
-
-        return []
-
-    async def generate_sql(self, task: str, schema: str) -> str:
+For tasks assigned to {agents}, also include "sql": a single SQLite SELECT statement that performs the task.
+Database Schema:
+{schema}
+
+SQL rules:
+- Use SQLite syntax, || for string concatenation and strftime() for dates
+- Use LIKE with % wildcards and LOWER() for partial, case-insensitive matches
+- Use SUM(), COUNT(), AVG() with GROUP BY for aggregations
+- Use LIMIT for large result sets
+- Never write INSERT, UPDATE, DELETE or DROP statements"""
+        return system_prompt
+
+    async def generate_sql(self, task: str, schema: str, deadline: Optional[Deadline] = None) -> str:
         """Generate SQL based on a task and schema."""
         system_prompt = f"""You are a SQL expert. Generate SQL Server (T-SQL) queries.
 Given a task description and database schema, generate the appropriate SQL query.
 
-Database Schema:
-{schema}
-
 Rules:
 - Use proper SQL Server syntax
 - Return only the SQL query, no explanations
 - Use JOINs when needed to get related data
 - Use appropriate WHERE clauses for filtering
-- Never use DROP, DELETE, or UPDATE unless explicitly requested for that purpose"""
+- Never use DROP, DELETE, or UPDATE unless explicitly requested for that purpose
 
-        response = await self.generate(
+Database Schema:
+{schema}"""
+
+        return await self.complete_sql(
             prompt=f"Task: {task}",
             system_prompt=system_prompt,
             temperature=0.2,
+            deadline=deadline,
         )
 
-        # Extract SQL from response
-        content = response.content.strip()
-        if content.startswith("```sql"):
-            content = content[6:]
-        if content.startswith("```"):
-            content = content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
+    async def complete_sql(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.1,
+        max_tokens: int = 500,
+        deadline: Optional[Deadline] = None,
+    ) -> str:
+        """
+        Generate a single SQL statement and return it without fences or prose.
 
-        return content.strip()
+        With sql_stream_extraction the response is streamed and cancelled as
+        soon as a complete statement has been parsed, so trailing
+        explanations are never generated; otherwise generation stops at ";".
+        Streamed statements are cached like generate responses.
+        """
+        settings = get_settings()
+        if not settings.sql_stream_extraction:
+            response = await self.generate(
+                prompt, system_prompt, temperature, max_tokens, deadline, SQL_STOP_SEQUENCES
+            )
+            return extract_sql(response.content)
 
-    async def synthesize(self, user_message: str, agent_results: dict) -> str:
-        """Combine agent results into a natural language response."""
+        cacheable = (
+            settings.llm_cache_enabled
+            and temperature <= settings.llm_cache_max_temperature
+            and getattr(self, "cacheable", True)
+        )
+        key = response_cache_key(
+            f"{getattr(self, 'provider', type(self).__name__)}:sql", getattr(self, "model", None),
+            system_prompt, prompt, temperature, max_tokens,
+        )
+        if cacheable:
+            cached = await response_cache.get(key)
+            if cached is not None:
+                return cached["content"]
+
+        extractor = SqlStreamExtractor()
+        stream = self.generate_stream(prompt, system_prompt, temperature, max_tokens, deadline)
+        try:
+            async for chunk in stream:
+                if extractor.feed(chunk):
+                    break
+        finally:
+            # Closing the stream cancels the provider request
+            await stream.aclose()
+        extractor.close()
+
+        sql = extractor.sql() or extractor.text.strip()
+        if cacheable and sql:
+            await response_cache.set(key, {"content": sql, "model": getattr(self, "model", None)})
+        return sql
+
+    def _synthesis_prompts(self, user_message: str, agent_results: dict) -> tuple[str, str]:
+        """Build the (system prompt, prompt) pair used to synthesize a response."""
         system_prompt = """You are a helpful banking assistant.
 Synthesize the results from various agents into a clear, friendly response.
 Format numbers as currency when appropriate.
@@ -141,10 +390,39 @@ Be concise but informative."""
             for agent, result in agent_results.items()
         ])
 
+        return system_prompt, f"User asked: {user_message}\n\nAgent results:\n{results_text}"
+
+    async def synthesize(
+        self,
+        user_message: str,
+        agent_results: dict,
+        deadline: Optional[Deadline] = None,
+    ) -> str:
+        """Combine agent results into a natural language response."""
+        system_prompt, prompt = self._synthesis_prompts(user_message, agent_results)
+
         response = await self.generate(
-            prompt=f"User asked: {user_message}\n\nAgent results:\n{results_text}",
+            prompt=prompt,
             system_prompt=system_prompt,
             temperature=0.7,
+            deadline=deadline,
         )
 
         return response.content
+
+    async def synthesize_stream(
+        self,
+        user_message: str,
+        agent_results: dict,
+        deadline: Optional[Deadline] = None,
+    ) -> AsyncGenerator[str, None]:
+        """Combine agent results into a natural language response, streaming text deltas."""
+        system_prompt, prompt = self._synthesis_prompts(user_message, agent_results)
+
+        async for chunk in self.generate_stream(
+            prompt=prompt,
+            system_prompt=system_prompt,
+            temperature=0.7,
+            deadline=deadline,
+        ):
+            yield chunk
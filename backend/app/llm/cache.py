@@ -0,0 +1,246 @@
+"""
+In-process caches for LLM results.
+"""
+
+import asyncio
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from copy import deepcopy
+from threading import Lock
+from typing import Any, Hashable, Optional
+
+from app.config import get_settings
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries expire after a fixed time-to-live."""
+
+    def __init__(self, max_size: int = 256, ttl_seconds: float = 300.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return a copy of the cached value, or None on a miss or expired entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return deepcopy(entry[1])
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entry when full."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        """Drop one entry if present."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        """Drop every entry. Hit/miss counters are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Get cache size and hit/miss counters."""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+def normalize_message(message: str) -> str:
+    """Normalize a user message so trivially different phrasings share a cache key."""
+    message = re.sub(r"\s+", " ", message.strip().lower())
+    return message.rstrip(".!?")
+
+
+def plan_cache_key(user_message: str, available_agents: list[str], mode: str = "plan") -> tuple:
+    """Build the plan cache key from the message and the agents it could be routed to."""
+    return mode, normalize_message(user_message), tuple(sorted(available_agents))
+
+
+class DiskCache:
+    """
+    SQLite-backed key/value store that survives restarts.
+
+    Holds at most max_entries rows, evicting the least recently used.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000, ttl_seconds: float = 604800.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_entries_accessed ON entries (accessed_at)")
+        return self._conn
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the stored value, or None on a miss or expired entry."""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value FROM entries WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl_seconds),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a JSON-serializable value and evict the oldest rows over the limit."""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+            conn.execute(
+                "DELETE FROM entries WHERE key IN ("
+                "SELECT key FROM entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            conn.commit()
+
+    def size(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connect().execute("DELETE FROM entries")
+            self._conn.commit()
+
+
+class ResponseCache:
+    """
+    Two-level cache of LLM responses: an in-memory LRU in front of a
+    DiskCache. Disk hits are promoted into memory, and disk access runs
+    in a worker thread so it never blocks the event loop.
+    """
+
+    def __init__(self, memory: TTLCache, disk: Optional[DiskCache] = None):
+        self.memory = memory
+        self.disk = disk
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[dict]:
+        value = self.memory.get(key)
+        if value is not None:
+            self.memory_hits += 1
+            return value
+        if self.disk is not None:
+            value = await asyncio.to_thread(self.disk.get, key)
+            if value is not None:
+                self.disk_hits += 1
+                self.memory.set(key, value)
+                return value
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: dict) -> None:
+        self.memory.set(key, value)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, value)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    async def stats(self) -> dict:
+        """Get per-level hit counters and sizes."""
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        return {
+            "memory_size": len(self.memory),
+            "memory_max_size": self.memory.max_size,
+            "disk_size": await asyncio.to_thread(self.disk.size) if self.disk is not None else 0,
+            "disk_max_entries": self.disk.max_entries if self.disk is not None else 0,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / total if total else 0.0,
+        }
+
+
+def response_cache_key(
+    provider: str,
+    model: str,
+    system_prompt: Optional[str],
+    prompt: str,
+    temperature: float,
+    max_tokens: int,
+    stop: Optional[list[str]] = None,
+    json_schema: Optional[dict] = None,
+) -> str:
+    """Build the response cache key from everything that shapes the completion."""
+    payload = json.dumps(
+        [provider, model, system_prompt, prompt, temperature, max_tokens, stop, json_schema], sort_keys=True
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+_settings = get_settings()
+
+# Shared cache of planner output, see BaseLLMProvider.plan_tasks
+plan_cache = TTLCache(
+    max_size=_settings.plan_cache_size,
+    ttl_seconds=_settings.plan_cache_ttl_seconds,
+)
+
+# Shared cache of low-temperature completions, see CachedProvider
+response_cache = ResponseCache(
+    memory=TTLCache(
+        max_size=_settings.llm_cache_memory_size,
+        ttl_seconds=_settings.llm_cache_ttl_seconds,
+    ),
+    disk=DiskCache(
+        _settings.llm_cache_path,
+        max_entries=_settings.llm_cache_disk_max_entries,
+        ttl_seconds=_settings.llm_cache_ttl_seconds,
+    ) if _settings.llm_cache_disk_max_entries > 0 else None,
+)
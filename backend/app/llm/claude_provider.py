@@ -2,11 +2,38 @@
 Anthropic Claude LLM provider implementation.
 """
 
+import json
 from typing import AsyncGenerator, Optional
-from anthropic import AsyncAnthropic
+from anthropic import NOT_GIVEN, AsyncAnthropic
 
 from app.llm.base import BaseLLMProvider, LLMResponse
+from app.llm.structured import StructuredOutputError
 from app.config import get_settings
+from app.deadline import Deadline, stage_timeout
+
+
+def _system_blocks(system_prompt: Optional[str]):
+    """
+    The system prompt as a content block marked for prompt caching.
+
+    The task itself is in the (unmarked) user message; see
+    BaseAgent.get_schema for how SQL system prompts are kept fixed.
+    """
+    if not system_prompt:
+        return ""
+    block = {"type": "text", "text": system_prompt}
+    if get_settings().prompt_caching_enabled:
+        block["cache_control"] = {"type": "ephemeral"}
+    return [block]
+
+
+def _json_tool(json_schema: dict) -> dict:
+    """A tool whose input is the structured response; forcing it gives schema-shaped JSON."""
+    return {
+        "name": "respond",
+        "description": "Return the response as structured data.",
+        "input_schema": json_schema,
+    }
 
 
 class ClaudeProvider(BaseLLMProvider):
@@ -14,27 +41,53 @@ class ClaudeProvider(BaseLLMProvider):
 
     def __init__(self, model: str = "claude-3-sonnet-20240229"):
         settings = get_settings()
-        self.client = AsyncAnthropic(api_key=settings.anthropic_api_key)
+        # Retries are handled by LimitedProvider
+        self.client = AsyncAnthropic(api_key=settings.anthropic_api_key, max_retries=0)
         self.model = model
 
+    def caches_prompt_prefix(self) -> bool:
+        return get_settings().prompt_caching_enabled
+
     async def generate(
         self,
         prompt: str,
         system_prompt: Optional[str] = None,
         temperature: float = 0.7,
         max_tokens: int = 2000,
+        deadline: Optional[Deadline] = None,
+        stop: Optional[list[str]] = None,
+        json_schema: Optional[dict] = None,
     ) -> LLMResponse:
+        tool = _json_tool(json_schema) if json_schema else None
         response = await self.client.messages.create(
             model=self.model,
             max_tokens=max_tokens,
-            system=system_prompt or "",
+            system=_system_blocks(system_prompt),
+            stop_sequences=stop or NOT_GIVEN,
+            tools=[tool] if tool else NOT_GIVEN,
+            tool_choice={"type": "tool", "name": tool["name"]} if tool else NOT_GIVEN,
             messages=[{"role": "user", "content": prompt}],
+            timeout=stage_timeout(deadline, get_settings().llm_call_timeout),
         )
 
+        if tool:
+            block = next((block for block in response.content if block.type == "tool_use"), None)
+            if block is None:
+                # e.g. the response hit max_tokens before the tool call
+                raise StructuredOutputError(f"Response has no tool call (stop reason: {response.stop_reason})")
+            content = json.dumps(block.input)
+        else:
+            content = response.content[0].text
+
+        usage = response.usage
+        cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+        cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
         return LLMResponse(
-            content=response.content[0].text,
+            content=content,
             model=self.model,
-            tokens_used=response.usage.input_tokens + response.usage.output_tokens,
+            # input_tokens excludes tokens read from or written to the cache
+            tokens_used=usage.input_tokens + cache_read + cache_write + usage.output_tokens,
+            cached_tokens=cache_read,
         )
 
     async def generate_stream(
@@ -43,12 +96,16 @@ class ClaudeProvider(BaseLLMProvider):
         system_prompt: Optional[str] = None,
         temperature: float = 0.7,
         max_tokens: int = 2000,
+        deadline: Optional[Deadline] = None,
+        stop: Optional[list[str]] = None,
     ) -> AsyncGenerator[str, None]:
         async with self.client.messages.stream(
             model=self.model,
             max_tokens=max_tokens,
-            system=system_prompt or "",
+            system=_system_blocks(system_prompt),
+            stop_sequences=stop or NOT_GIVEN,
             messages=[{"role": "user", "content": prompt}],
+            timeout=stage_timeout(deadline, get_settings().llm_call_timeout),
         ) as stream:
             async for text in stream.text_stream:
                 yield text
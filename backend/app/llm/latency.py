@@ -0,0 +1,45 @@
+"""
+Live LLM latency tracking for FinBank AI.
+Latencies are grouped by call type so hedging can compare a call against
+others of the same kind.
+"""
+
+from collections import deque
+from typing import Optional
+
+from app.tracing import percentile, tracer
+
+# Pipeline stage span -> LLM call type
+CALL_TYPES = {"plan": "planning", "agent": "sql", "synthesize": "synthesis"}
+
+
+def current_call_type() -> Optional[str]:
+    """
+    Call type of the LLM call being made, from the enclosing pipeline span.
+
+    LLM calls made inside an agent are counted as "sql", since generating
+    SQL is what agents mostly use the LLM for.
+    """
+    span = tracer.current()
+    return CALL_TYPES.get(span.name) if span else None
+
+
+class LatencyTracker:
+    """Sliding window of recent latencies (seconds) per call type."""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: dict[str, deque[float]] = {}
+
+    def record(self, call_type: str, latency: float) -> None:
+        self._samples.setdefault(call_type, deque(maxlen=self.window)).append(latency)
+
+    def count(self, call_type: str) -> int:
+        return len(self._samples.get(call_type, ()))
+
+    def percentile(self, call_type: str, pct: float) -> Optional[float]:
+        """The pct-th percentile latency, or None with no samples."""
+        samples = self._samples.get(call_type)
+        if not samples:
+            return None
+        return percentile(sorted(samples), pct)
@@ -0,0 +1,231 @@
+"""
+Admission control for LLM providers.
+Each provider gets a token-bucket rate limit, an adaptive cap on requests
+in flight and jittered retries, so load spikes queue briefly in-process
+instead of turning into provider 429s and long timeouts.
+"""
+
+import asyncio
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import anthropic
+import httpx
+import openai
+
+from app.config import get_settings
+from app.deadline import Deadline, stage_timeout
+from app.tracing import tracer
+
+# HTTP statuses worth retrying: rate limits, overload and transient server errors
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504, 529}
+OVERLOAD_STATUS = {429, 503, 529}
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code
+    return getattr(error, "status_code", None)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether a provider error is transient and the call can be retried."""
+    if isinstance(error, (httpx.ReadTimeout, openai.APITimeoutError, anthropic.APITimeoutError)):
+        # The call already used its whole timeout; retrying would only double the wait
+        return False
+    if isinstance(error, (httpx.TransportError, openai.APIConnectionError, anthropic.APIConnectionError)):
+        return True
+    return _status_code(error) in RETRYABLE_STATUS
+
+
+def is_overload(error: BaseException) -> bool:
+    """Whether a provider error signals that we are sending too much."""
+    if isinstance(error, (httpx.TimeoutException, openai.APITimeoutError, anthropic.APITimeoutError)):
+        return True
+    return _status_code(error) in OVERLOAD_STATUS
+
+
+def retry_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter for the given retry attempt (0-based)."""
+    settings = get_settings()
+    cap = min(settings.llm_retry_max_delay, settings.llm_retry_base_delay * 2 ** attempt)
+    return random.uniform(0, cap)
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second with bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Take a token, sleeping until one is available. A rate of 0 disables the bucket."""
+        if self.rate <= 0:
+            return
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AdaptiveLimiter:
+    """
+    Caps requests in flight and adapts the cap AIMD-style: it grows by
+    roughly one per cap's worth of fast successes and halves on overload
+    errors or slow responses.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial: int = 8,
+        minimum: int = 1,
+        maximum: int = 64,
+        latency_threshold: float = 60.0,
+        rate: float = 0.0,
+        burst: int = 20,
+    ):
+        self.name = name
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_threshold = latency_threshold
+        self.bucket = TokenBucket(rate, burst)
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+        self.admitted = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.retries = 0
+        self.errors = 0
+        self.decreases = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    def _wake_next(self) -> None:
+        while self._waiters and self._has_capacity():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # Reserve the slot for the waiter before it resumes
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    async def _acquire(self, deadline: Optional[Deadline]) -> None:
+        await asyncio.wait_for(self.bucket.acquire(), stage_timeout(deadline))
+        if self._has_capacity() and not self._waiters:
+            self.in_flight += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.max_queue_depth = max(self.max_queue_depth, len(self._waiters))
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), stage_timeout(deadline))
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # Granted a slot just as we gave up: hand it on
+                self.in_flight -= 1
+                self._wake_next()
+            else:
+                waiter.cancel()
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+            raise
+
+    def _release(self, latency: Optional[float], error: Optional[BaseException]) -> None:
+        self.in_flight -= 1
+        overloaded = error is not None and is_overload(error)
+        slow = latency is not None and latency > self.latency_threshold
+        if overloaded or slow:
+            self.limit = max(self.minimum, self.limit / 2)
+            self.decreases += 1
+        elif error is None and latency is not None:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        self._wake_next()
+
+    @asynccontextmanager
+    async def slot(self, deadline: Optional[Deadline] = None) -> AsyncIterator[None]:
+        """Hold one in-flight slot, waiting in the queue if the cap is reached."""
+        start = time.perf_counter()
+        with tracer.span("llm_queue", provider=self.name) as span:
+            await self._acquire(deadline)
+            span.attributes["queue_depth"] = self.queue_depth
+        wait = time.perf_counter() - start
+        self.admitted += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+        start = time.perf_counter()
+        try:
+            yield
+        except (asyncio.CancelledError, GeneratorExit):
+            # Cancelled, or a stream closed early by its consumer
+            self._release(None, None)
+            raise
+        except BaseException as e:
+            self.errors += 1
+            self._release(None, e)
+            raise
+        else:
+            self._release(time.perf_counter() - start, None)
+
+    def stats(self) -> dict:
+        """Get the current cap, queue depth and wait-time counters."""
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "admitted": self.admitted,
+            "avg_wait_ms": self.total_wait / self.admitted * 1000 if self.admitted else 0.0,
+            "max_wait_ms": self.max_wait * 1000,
+            "retries": self.retries,
+            "errors": self.errors,
+            "decreases": self.decreases,
+            "rate_per_second": self.bucket.rate,
+        }
+
+
+_limiters: dict[str, AdaptiveLimiter] = {}
+
+
+def get_limiter(provider: str) -> AdaptiveLimiter:
+    """Get the limiter shared by every model of a provider."""
+    limiter = _limiters.get(provider)
+    if limiter is None:
+        settings = get_settings()
+        limiter = _limiters[provider] = AdaptiveLimiter(
+            provider,
+            initial=settings.llm_initial_concurrency,
+            minimum=settings.llm_min_concurrency,
+            maximum=settings.llm_max_concurrency,
+            latency_threshold=settings.llm_latency_threshold,
+            rate=settings.llm_rate_limit_per_second,
+            burst=settings.llm_rate_limit_burst,
+        )
+    return limiter
+
+
+def limiter_stats() -> dict:
+    """Stats for every provider limiter created so far."""
+    return {name: limiter.stats() for name, limiter in _limiters.items()}
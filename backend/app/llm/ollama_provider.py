@@ -2,20 +2,132 @@
 Ollama local LLM provider implementation.
 """
 
+import time
 from typing import AsyncGenerator, Optional
 import httpx
 
 from app.llm.base import BaseLLMProvider, LLMResponse
 from app.config import get_settings
+from app.deadline import Deadline, stage_timeout
+
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_ollama_client() -> httpx.AsyncClient:
+    """
+    Get the process-wide pooled HTTP client for Ollama.
+
+    Connections are kept alive and reused across requests instead of
+    opening a new TCP connection for every LLM call.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        settings = get_settings()
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.ollama_max_connections,
+                max_keepalive_connections=settings.ollama_max_keepalive_connections,
+                keepalive_expiry=settings.ollama_keepalive_expiry,
+            ),
+            timeout=_request_timeout(None),
+        )
+    return _client
+
+
+async def close_ollama_client() -> None:
+    """Close the pooled Ollama client, e.g. on application shutdown."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _request_timeout(deadline: Optional[Deadline]) -> httpx.Timeout:
+    """Per-phase timeouts; the read phase is bounded by the request deadline."""
+    settings = get_settings()
+    return httpx.Timeout(
+        connect=settings.ollama_connect_timeout,
+        read=stage_timeout(deadline, settings.llm_call_timeout),
+        write=settings.ollama_write_timeout,
+        pool=settings.ollama_pool_timeout,
+    )
 
 
 class OllamaProvider(BaseLLMProvider):
     """Ollama local LLM provider."""
 
-    def __init__(self, model: str = "llama3.2"):
+    def __init__(self, model: str = "llama3.2", client: Optional[httpx.AsyncClient] = None):
         settings = get_settings()
         self.base_url = settings.ollama_base_url
         self.model = model
+        self._own_client = client
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._own_client or get_ollama_client()
+
+    def _payload(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        stream: bool,
+        stop: Optional[list[str]] = None,
+        json_schema: Optional[dict] = None,
+    ) -> dict:
+        """
+        Build an /api/generate request body.
+
+        The system prompt leads the prompt text so consecutive calls share a
+        prefix, and keep_alive keeps the model loaded between requests so
+        calls skip the cold load and Ollama can reuse the KV cache for that
+        prefix. The `context` field is not used: it would carry one
+        request's conversation into the next. A json_schema is passed as
+        `format`, which constrains decoding to matching JSON.
+        """
+        full_prompt = prompt
+        if system_prompt:
+            full_prompt = f"{system_prompt}\n\nUser: {prompt}"
+        payload = {
+            "model": self.model,
+            "prompt": full_prompt,
+            "stream": stream,
+            "options": {
+                "temperature": temperature,
+                "num_predict": max_tokens,
+            },
+        }
+        if stop:
+            payload["options"]["stop"] = stop
+        if json_schema:
+            payload["format"] = json_schema
+        payload["keep_alive"] = get_settings().ollama_keep_alive
+        return payload
+
+    def batch_concurrency(self) -> int:
+        """One request per server slot (OLLAMA_NUM_PARALLEL); more would only queue in Ollama."""
+        return get_settings().ollama_num_parallel
+
+    async def warm_up(self) -> Optional[float]:
+        """
+        Load the model into memory and reset its keep_alive timer.
+        A request without a prompt makes Ollama load the model and return.
+        """
+        settings = get_settings()
+        start = time.perf_counter()
+        response = await self.client.post(
+            f"{self.base_url}/api/generate",
+            json={"model": self.model, "keep_alive": settings.ollama_keep_alive},
+            timeout=_request_timeout(None),
+        )
+        response.raise_for_status()
+        load_duration = response.json().get("load_duration")
+        if load_duration is not None:
+            # Reported in nanoseconds; near zero when the model was already loaded
+            return load_duration / 1e9
+        return time.perf_counter() - start
 
     async def generate(
         self,
@@ -23,27 +135,19 @@ class OllamaProvider(BaseLLMProvider):
         system_prompt: Optional[str] = None,
         temperature: float = 0.7,
         max_tokens: int = 2000,
+        deadline: Optional[Deadline] = None,
+        stop: Optional[list[str]] = None,
+        json_schema: Optional[dict] = None,
     ) -> LLMResponse:
-        full_prompt = prompt
-        if system_prompt:
-            full_prompt = f"{system_prompt}\n\nUser: {prompt}"
-
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/api/generate",
-                json={
-                    "model": self.model,
-                    "prompt": full_prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": temperature,
-                        "num_predict": max_tokens,
-                    },
-                },
-                timeout=120.0,
-            )
-            response.raise_for_status()
-            data = response.json()
+        response = await self.client.post(
+            f"{self.base_url}/api/generate",
+            json=self._payload(
+                prompt, system_prompt, temperature, max_tokens, stream=False, stop=stop, json_schema=json_schema
+            ),
+            timeout=_request_timeout(deadline),
+        )
+        response.raise_for_status()
+        data = response.json()
 
         return LLMResponse(
             content=data["response"],
@@ -57,29 +161,18 @@ class OllamaProvider(BaseLLMProvider):
         system_prompt: Optional[str] = None,
         temperature: float = 0.7,
         max_tokens: int = 2000,
+        deadline: Optional[Deadline] = None,
+        stop: Optional[list[str]] = None,
     ) -> AsyncGenerator[str, None]:
-        full_prompt = prompt
-        if system_prompt:
-            full_prompt = f"{system_prompt}\n\nUser: {prompt}"
-
-        async with httpx.AsyncClient() as client:
-            async with client.stream(
-                "POST",
-                f"{self.base_url}/api/generate",
-                json={
-                    "model": self.model,
-                    "prompt": full_prompt,
-                    "stream": True,
-                    "options": {
-                        "temperature": temperature,
-                        "num_predict": max_tokens,
-                    },
-                },
-                timeout=120.0,
-            ) as response:
-                async for line in response.aiter_lines():
-                    if line:
-                        import json
-                        data = json.loads(line)
-                        if "response" in data:
-                            yield data["response"]
+        async with self.client.stream(
+            "POST",
+            f"{self.base_url}/api/generate",
+            json=self._payload(prompt, system_prompt, temperature, max_tokens, stream=True, stop=stop),
+            timeout=_request_timeout(deadline),
+        ) as response:
+            async for line in response.aiter_lines():
+                if line:
+                    import json
+                    data = json.loads(line)
+                    if "response" in data:
+                        yield data["response"]
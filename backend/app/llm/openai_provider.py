@@ -3,10 +3,11 @@ OpenAI LLM provider implementation.
 """
 
 from typing import AsyncGenerator, Optional
-from openai import AsyncOpenAI
+from openai import NOT_GIVEN, AsyncOpenAI
 
 from app.llm.base import BaseLLMProvider, LLMResponse
 from app.config import get_settings
+from app.deadline import Deadline, stage_timeout
 
 
 class OpenAIProvider(BaseLLMProvider):
@@ -14,7 +15,8 @@ class OpenAIProvider(BaseLLMProvider):
 
     def __init__(self, model: str = "gpt-4-turbo-preview"):
         settings = get_settings()
-        self.client = AsyncOpenAI(api_key=settings.openai_api_key)
+        # Retries are handled by LimitedProvider
+        self.client = AsyncOpenAI(api_key=settings.openai_api_key, max_retries=0)
         self.model = model
 
     async def generate(
@@ -23,6 +25,9 @@ class OpenAIProvider(BaseLLMProvider):
         system_prompt: Optional[str] = None,
         temperature: float = 0.7,
         max_tokens: int = 2000,
+        deadline: Optional[Deadline] = None,
+        stop: Optional[list[str]] = None,
+        json_schema: Optional[dict] = None,
     ) -> LLMResponse:
         messages = []
         if system_prompt:
@@ -34,12 +39,21 @@ class OpenAIProvider(BaseLLMProvider):
             messages=messages,
             temperature=temperature,
             max_tokens=max_tokens,
+            stop=stop or NOT_GIVEN,
+            # JSON mode works on every JSON-capable model, unlike json_schema
+            # response formats; the schema itself is in the system prompt
+            response_format={"type": "json_object"} if json_schema else NOT_GIVEN,
+            timeout=stage_timeout(deadline, get_settings().llm_call_timeout),
         )
 
+        # OpenAI caches long prompt prefixes automatically and reports the hits
+        usage = response.usage
+        details = getattr(usage, "prompt_tokens_details", None) if usage else None
         return LLMResponse(
             content=response.choices[0].message.content,
             model=self.model,
-            tokens_used=response.usage.total_tokens if response.usage else None,
+            tokens_used=usage.total_tokens if usage else None,
+            cached_tokens=getattr(details, "cached_tokens", None),
         )
 
     async def generate_stream(
@@ -48,6 +62,8 @@ class OpenAIProvider(BaseLLMProvider):
         system_prompt: Optional[str] = None,
         temperature: float = 0.7,
         max_tokens: int = 2000,
+        deadline: Optional[Deadline] = None,
+        stop: Optional[list[str]] = None,
     ) -> AsyncGenerator[str, None]:
         messages = []
         if system_prompt:
@@ -59,7 +75,9 @@ class OpenAIProvider(BaseLLMProvider):
             messages=messages,
             temperature=temperature,
             max_tokens=max_tokens,
+            stop=stop or NOT_GIVEN,
             stream=True,
+            timeout=stage_timeout(deadline, get_settings().llm_call_timeout),
         )
 
         async for chunk in stream:
@@ -0,0 +1,197 @@
+"""
+Process-wide LLM provider registry for FinBank AI.
+Providers hold SDK clients with their own connection pools, so one
+instance per (provider, model) is created and reused by every request.
+"""
+
+import time
+from threading import RLock
+from typing import Optional
+
+from app.config import get_settings
+from app.llm.base import BaseLLMProvider
+from app.llm.claude_provider import ClaudeProvider
+from app.llm.ollama_provider import OllamaProvider
+from app.llm.openai_provider import OpenAIProvider
+from app.llm.replay_provider import ReplayProvider
+from app.llm.limiter import get_limiter, limiter_stats
+from app.llm.wrappers import (
+    CachedProvider,
+    CoalescingProvider,
+    HedgedProvider,
+    LimitedProvider,
+    ProviderWrapper,
+    TracedProvider,
+)
+
+PROVIDERS = ["openai", "claude", "azure", "ollama", "replay"]
+
+
+def default_model(provider: str) -> str:
+    """Model used when a request names a provider but no model."""
+    if provider == "openai":
+        return "gpt-4-turbo-preview"
+    if provider == "claude":
+        return "claude-3-sonnet-20240229"
+    if provider == "azure":
+        return get_settings().azure_openai_deployment or "gpt-4"
+    if provider == "ollama":
+        return "llama3.2"
+    if provider == "replay":
+        return "replay"
+    raise ValueError(f"Unknown LLM provider: {provider}")
+
+
+def _base_provider(provider: str, model: str) -> BaseLLMProvider:
+    """Construct an unwrapped provider."""
+    if provider in ("openai", "azure"):
+        # Azure OpenAI uses the same interface as OpenAI
+        return OpenAIProvider(model=model)
+    if provider == "claude":
+        return ClaudeProvider(model=model)
+    if provider == "ollama":
+        return OllamaProvider(model=model)
+    if provider == "replay":
+        settings = get_settings()
+        inner = None
+        if settings.replay_mode == "record":
+            recorded = settings.replay_record_provider
+            inner = _base_provider(recorded, default_model(recorded))
+        return ReplayProvider.from_settings(inner)
+    raise ValueError(f"Unknown LLM provider: {provider}")
+
+
+def create_provider(provider: str, model: str, secondary: Optional[BaseLLMProvider] = None) -> BaseLLMProvider:
+    """
+    Construct a new provider instance with coalescing, caching, hedging to
+    `secondary` (if given), admission control and tracing.
+    """
+    llm = _base_provider(provider, model)
+    # Coalesce before the cache lookup; cache hits skip admission control,
+    # and llm spans only measure real provider calls, one per attempt
+    limited = LimitedProvider(TracedProvider(llm), get_limiter(provider))
+    # Hedging sits below the cache so its latency window only sees real calls
+    hedged = HedgedProvider(limited, secondary) if secondary is not None else limited
+    cached = CachedProvider(hedged, provider) if getattr(llm, "cacheable", True) else hedged
+    return CoalescingProvider(cached, provider)
+
+
+def _http_client(llm: BaseLLMProvider):
+    """The httpx client behind a provider, if it exposes one."""
+    while hasattr(llm, "inner"):
+        llm = llm.inner
+    client = getattr(llm, "client", None)
+    # The OpenAI and Anthropic SDKs keep their httpx client on `_client`
+    return getattr(client, "_client", client)
+
+
+def pool_stats(llm: BaseLLMProvider) -> Optional[dict]:
+    """Open and idle connection counts for a provider's HTTP pool."""
+    pool = getattr(getattr(_http_client(llm), "_transport", None), "_pool", None)
+    connections = getattr(pool, "connections", None)
+    if connections is None:
+        return None
+    idle = sum(1 for connection in connections if connection.is_idle())
+    return {"connections": len(connections), "idle": idle, "active": len(connections) - idle}
+
+
+def wrapper_stats(llm: BaseLLMProvider) -> dict:
+    """Stats reported by the hedging and coalescing layers of a provider."""
+    stats = {}
+    while isinstance(llm, ProviderWrapper):
+        if isinstance(llm, HedgedProvider):
+            stats["hedging"] = llm.stats()
+        elif isinstance(llm, CoalescingProvider):
+            stats["coalescing"] = llm.stats()
+        llm = llm.inner
+    return stats
+
+
+class ProviderRegistry:
+    """Caches one provider per (provider, model) and tracks the default."""
+
+    def __init__(self, provider: str, model: Optional[str] = None):
+        self._instances: dict[tuple[str, str], BaseLLMProvider] = {}
+        self._created_at: dict[tuple[str, str], float] = {}
+        self._uses: dict[tuple[str, str], int] = {}
+        self._default = (provider, model or default_model(provider))
+        self._lock = RLock()
+
+    @property
+    def default(self) -> tuple[str, str]:
+        """The (provider, model) used when a request does not pick one."""
+        return self._default
+
+    def get(self, provider: Optional[str] = None, model: Optional[str] = None) -> BaseLLMProvider:
+        """Get the shared instance for a provider and model, creating it on first use."""
+        if provider is None:
+            provider, default = self._default
+            model = model or default
+        key = (provider, model or default_model(provider))
+
+        with self._lock:
+            llm = self._instances.get(key)
+            if llm is None:
+                target = self._hedge_target(key)
+                llm = create_provider(*key, self.get(*target) if target is not None else None)
+                self._instances[key] = llm
+                self._created_at[key] = time.time()
+            self._uses[key] = self._uses.get(key, 0) + 1
+        return llm
+
+    def _hedge_target(self, key: tuple[str, str]) -> Optional[tuple[str, str]]:
+        """The (provider, model) that backs up calls to `key`, if hedging is on."""
+        settings = get_settings()
+        if not settings.hedge_provider:
+            return None
+        target = (settings.hedge_provider, settings.hedge_model or default_model(settings.hedge_provider))
+        return target if target != key else None
+
+    def set_default(self, provider: str, model: Optional[str] = None) -> BaseLLMProvider:
+        """
+        Switch the default provider.
+
+        The new provider is created before the switch, so a provider that
+        fails to initialize leaves the current default in place.
+        """
+        key = (provider, model or default_model(provider))
+        llm = self.get(*key)
+        # A single assignment: concurrent readers see the old or new pair, never a mix
+        self._default = key
+        get_settings().default_llm_provider = provider
+        return llm
+
+    async def close(self) -> None:
+        """Close every provider's SDK client."""
+        with self._lock:
+            instances = list(self._instances.values())
+            self._instances.clear()
+        for llm in instances:
+            client = _http_client(llm)
+            if client is not None and not getattr(client, "is_closed", True):
+                await client.aclose()
+
+    def stats(self) -> dict:
+        """Get the default provider and per-instance usage and pool statistics."""
+        with self._lock:
+            instances = list(self._instances.items())
+        provider, model = self._default
+        return {
+            "default": {"provider": provider, "model": model},
+            "limiters": limiter_stats(),
+            "instances": [
+                {
+                    "provider": key[0],
+                    "model": key[1],
+                    "created_at": self._created_at[key],
+                    "uses": self._uses.get(key, 0),
+                    "pool": pool_stats(llm),
+                    **wrapper_stats(llm),
+                }
+                for key, llm in instances
+            ],
+        }
+
+
+# Shared registry, see get_llm_provider
+provider_registry = ProviderRegistry(get_settings().default_llm_provider)
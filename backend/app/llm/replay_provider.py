@@ -0,0 +1,240 @@
+"""
+Record/replay LLM provider for deterministic load tests.
+In record mode calls go to a real provider and every prompt/response pair
+is appended to a JSONL file. In replay mode responses are served from
+that file with synthetic latency, so the orchestrator, agents and
+database can be benchmarked without network access or LLM spend.
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+import time
+from pathlib import Path
+from threading import Lock
+from typing import AsyncGenerator, Literal, Optional
+
+from app.llm.base import BaseLLMProvider, LLMResponse
+from app.config import get_settings
+from app.deadline import Deadline
+
+ReplayMode = Literal["record", "replay"]
+LatencyDistribution = Literal["none", "fixed", "uniform", "lognormal", "recorded"]
+
+
+class ReplayMiss(LookupError):
+    """Raised in replay mode when a prompt has no recording."""
+
+
+def recording_key(prompt: str, system_prompt: Optional[str]) -> str:
+    """Recordings are matched on the prompts alone, so sampling settings may differ."""
+    return hashlib.sha256(json.dumps([system_prompt, prompt]).encode()).hexdigest()
+
+
+def _apply_stop(content: str, stop: Optional[list[str]]) -> str:
+    """Cut replayed content at the first stop sequence, as a provider would."""
+    for sequence in stop or ():
+        index = content.find(sequence)
+        if index != -1:
+            content = content[:index]
+    return content
+
+
+class LatencyModel:
+    """
+    Samples synthetic response latencies.
+
+    Distributions:
+        none: no delay
+        fixed: always mean_ms
+        uniform: mean_ms +/- jitter_ms
+        lognormal: mean mean_ms, standard deviation jitter_ms, with the
+            long right tail typical of LLM latencies
+        recorded: the latency measured when the response was recorded
+    """
+
+    def __init__(
+        self,
+        distribution: LatencyDistribution = "none",
+        mean_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.distribution = distribution
+        self.mean_ms = mean_ms
+        self.jitter_ms = jitter_ms
+        self._random = random.Random(seed)
+
+    def sample(self, recorded_ms: Optional[float] = None) -> float:
+        """Get a latency in seconds."""
+        if self.distribution == "fixed":
+            ms = self.mean_ms
+        elif self.distribution == "uniform":
+            ms = self._random.uniform(self.mean_ms - self.jitter_ms, self.mean_ms + self.jitter_ms)
+        elif self.distribution == "lognormal" and self.mean_ms > 0:
+            sigma_squared = math.log(1 + (self.jitter_ms / self.mean_ms) ** 2)
+            mu = math.log(self.mean_ms) - sigma_squared / 2
+            ms = self._random.lognormvariate(mu, math.sqrt(sigma_squared))
+        elif self.distribution == "recorded":
+            ms = recorded_ms or 0.0
+        else:
+            ms = 0.0
+        return max(0.0, ms) / 1000
+
+
+class ReplayProvider(BaseLLMProvider):
+    """Records a real provider's responses, or replays them from a file."""
+
+    # Response caching would skip the simulated latency (and, when
+    # recording, the calls to record)
+    cacheable = False
+
+    def __init__(
+        self,
+        path: str,
+        mode: ReplayMode = "replay",
+        inner: Optional[BaseLLMProvider] = None,
+        latency: Optional[LatencyModel] = None,
+        chunk_size: int = 16,
+        chunk_delay_ms: float = 0.0,
+    ):
+        if mode == "record" and inner is None:
+            raise ValueError("Record mode needs a provider to record from")
+        self.path = Path(path)
+        self.mode = mode
+        self.inner = inner
+        self.model = inner.model if inner is not None else "replay"
+        self.latency = latency or LatencyModel()
+        self.chunk_size = max(1, chunk_size)
+        self.chunk_delay_ms = chunk_delay_ms
+        self.recordings: dict[str, dict] = {}
+        self.misses = 0
+        self._lock = Lock()
+        if mode == "replay":
+            self.load()
+
+    @classmethod
+    def from_settings(cls, inner: Optional[BaseLLMProvider] = None) -> "ReplayProvider":
+        """Build a provider from the replay_* settings; `inner` is recorded in record mode."""
+        settings = get_settings()
+        return cls(
+            settings.replay_file,
+            mode=settings.replay_mode,
+            inner=inner,
+            latency=LatencyModel(
+                settings.replay_latency_distribution,
+                mean_ms=settings.replay_latency_ms,
+                jitter_ms=settings.replay_latency_jitter_ms,
+                seed=settings.replay_seed,
+            ),
+            chunk_size=settings.replay_chunk_size,
+            chunk_delay_ms=settings.replay_chunk_delay_ms,
+        )
+
+    def batch_concurrency(self) -> int:
+        if self.inner is not None:
+            return self.inner.batch_concurrency()
+        return super().batch_concurrency()
+
+    def caches_prompt_prefix(self) -> bool:
+        if self.inner is not None:
+            return self.inner.caches_prompt_prefix()
+        return super().caches_prompt_prefix()
+
+    def load(self) -> None:
+        """Load recordings from the file; later entries for a prompt win."""
+        self.recordings.clear()
+        if not self.path.exists():
+            return
+        with self.path.open(encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.recordings[entry["key"]] = entry
+
+    def _record(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        response: LLMResponse,
+        latency_ms: float,
+        first_chunk_ms: Optional[float] = None,
+    ) -> None:
+        entry = {
+            "key": recording_key(prompt, system_prompt),
+            "system_prompt": system_prompt,
+            "prompt": prompt,
+            "content": response.content,
+            "model": response.model,
+            "tokens_used": response.tokens_used,
+            "latency_ms": round(latency_ms, 1),
+        }
+        if first_chunk_ms is not None:
+            entry["first_chunk_ms"] = round(first_chunk_ms, 1)
+        with self._lock:
+            self.recordings[entry["key"]] = entry
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def _lookup(self, prompt: str, system_prompt: Optional[str]) -> dict:
+        entry = self.recordings.get(recording_key(prompt, system_prompt))
+        if entry is None:
+            self.misses += 1
+            raise ReplayMiss(f"No recording for prompt: {prompt[:80]!r}")
+        return entry
+
+    async def generate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        deadline: Optional[Deadline] = None,
+        stop: Optional[list[str]] = None,
+        json_schema: Optional[dict] = None,
+    ) -> LLMResponse:
+        if self.mode == "record":
+            start = time.perf_counter()
+            response = await self.inner.generate(prompt, system_prompt, temperature, max_tokens, deadline, stop, json_schema)
+            latency_ms = (time.perf_counter() - start) * 1000
+            await asyncio.to_thread(self._record, prompt, system_prompt, response, latency_ms)
+            return response
+
+        entry = self._lookup(prompt, system_prompt)
+        await asyncio.sleep(self.latency.sample(entry.get("latency_ms")))
+        content = _apply_stop(entry["content"], stop)
+        return LLMResponse(content=content, model=entry["model"], tokens_used=entry.get("tokens_used"))
+
+    async def generate_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        deadline: Optional[Deadline] = None,
+        stop: Optional[list[str]] = None,
+    ) -> AsyncGenerator[str, None]:
+        if self.mode == "record":
+            start = time.perf_counter()
+            first_chunk_ms = None
+            chunks = []
+            async for chunk in self.inner.generate_stream(prompt, system_prompt, temperature, max_tokens, deadline, stop):
+                if first_chunk_ms is None:
+                    first_chunk_ms = (time.perf_counter() - start) * 1000
+                chunks.append(chunk)
+                yield chunk
+            response = LLMResponse(content="".join(chunks), model=self.model)
+            latency_ms = (time.perf_counter() - start) * 1000
+            await asyncio.to_thread(self._record, prompt, system_prompt, response, latency_ms, first_chunk_ms)
+            return
+
+        entry = self._lookup(prompt, system_prompt)
+        # The sampled latency is the time to first chunk
+        await asyncio.sleep(self.latency.sample(entry.get("first_chunk_ms", entry.get("latency_ms"))))
+        content = _apply_stop(entry["content"], stop)
+        for i in range(0, len(content), self.chunk_size):
+            if i and self.chunk_delay_ms:
+                await asyncio.sleep(self.chunk_delay_ms / 1000)
+            yield content[i:i + self.chunk_size]
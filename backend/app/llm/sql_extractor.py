@@ -0,0 +1,130 @@
+"""
+SQL extraction from LLM output.
+Finds the first SQL statement in model text, skipping markdown fences and
+prose, and tells a streaming caller as soon as the statement is complete
+so generation can be cancelled instead of running on into explanations.
+"""
+
+import re
+from typing import Optional
+
+# Stop sequences for non-streamed SQL generation calls. Only ";" is safe:
+# a fence or a blank line can also come before the statement. Providers
+# apply it without regard to quotes, so a literal such as 'x;y' is cut;
+# streamed calls rely on SqlStreamExtractor instead.
+SQL_STOP_SEQUENCES = [";"]
+
+# A statement starts at a line beginning with a SQL keyword, optionally
+# right after an opening fence. A CTE must look like "WITH name AS (" so
+# prose starting with "With" is not taken for SQL.
+_STATEMENT_START = re.compile(
+    r"^[ \t]*(?:```(?:sql)?[ \t]*)?"
+    r"(SELECT\b|INSERT\b|UPDATE\b|DELETE\b|WITH\s+(?:RECURSIVE\s+)?[\w\"\[\]]+\s*(?:\([^)]*\)\s*)?AS\s*\()",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# Words that can begin a line inside a statement; a paragraph starting with
+# anything else after a blank line is prose
+_SQL_WORDS = {
+    "SELECT", "FROM", "WHERE", "JOIN", "LEFT", "RIGHT", "INNER", "OUTER", "CROSS", "FULL",
+    "ON", "AND", "OR", "NOT", "GROUP", "ORDER", "HAVING", "LIMIT", "OFFSET", "UNION",
+    "EXCEPT", "INTERSECT", "WITH", "AS", "CASE", "WHEN", "THEN", "ELSE", "END", "INSERT",
+    "INTO", "VALUES", "UPDATE", "SET", "DELETE", "IN", "EXISTS", "BETWEEN", "LIKE", "IS",
+    "TOP", "DISTINCT", "ALL",
+}
+
+_WORD = re.compile(r"[A-Za-z_]+")
+
+
+class SqlStreamExtractor:
+    """
+    Incrementally extracts one SQL statement from streamed text.
+
+    feed() returns True once the statement is complete: a ";" or a closing
+    code fence outside string literals and parentheses, or a blank line
+    followed by prose.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.complete = False
+        self._start: Optional[int] = None
+        self._end: Optional[int] = None
+        self._final = False
+        # Scanner state, kept between feeds
+        self._pos = 0
+        self._quote: Optional[str] = None
+        self._depth = 0
+
+    def feed(self, chunk: str) -> bool:
+        """Add streamed text; returns True when the statement is complete."""
+        if self.complete:
+            return True
+        self.text += chunk
+        if self._start is None:
+            match = _STATEMENT_START.search(self.text)
+            if match is None:
+                return False
+            self._start = self._pos = match.start(1)
+        self._scan()
+        return self.complete
+
+    def close(self) -> None:
+        """Mark the end of the text, settling a trailing word left undecided."""
+        self._final = True
+        if self._start is not None and not self.complete:
+            self._scan()
+
+    def _scan(self) -> None:
+        text = self.text
+        while self._pos < len(text):
+            char = text[self._pos]
+            if self._quote:
+                if char == self._quote:
+                    self._quote = None
+            elif char in ("'", '"'):
+                self._quote = char
+            elif char == "(":
+                self._depth += 1
+            elif char == ")":
+                self._depth = max(0, self._depth - 1)
+            elif char == ";" and self._depth == 0:
+                self._finish(self._pos)
+                return
+            elif char == "`":
+                if text.startswith("```", self._pos):
+                    self._finish(self._pos)
+                    return
+                if not self._final and "```".startswith(text[self._pos:]):
+                    # Possibly a fence split across chunks
+                    return
+            elif char == "\n" and self._depth == 0 and text.startswith("\n\n", self._pos):
+                # The first word of the next paragraph tells a formatted
+                # statement from prose; wait for it unless the text has ended
+                rest = text[self._pos:].lstrip()
+                word = _WORD.match(rest)
+                if not self._final and (not rest or (word and word.end() == len(rest))):
+                    return
+                if word and word.group(0).upper() not in _SQL_WORDS:
+                    self._finish(self._pos)
+                    return
+            self._pos += 1
+
+    def _finish(self, end: int) -> None:
+        self._end = end
+        self.complete = True
+
+    def sql(self) -> str:
+        """The statement found so far, without fences or a trailing semicolon."""
+        if self._start is None:
+            return ""
+        end = self._end if self._end is not None else len(self.text)
+        return self.text[self._start:end].strip().rstrip(";").strip()
+
+
+def extract_sql(text: str) -> str:
+    """Extract the first SQL statement from complete LLM output."""
+    extractor = SqlStreamExtractor()
+    extractor.feed(text)
+    extractor.close()
+    return extractor.sql() or text.strip()
@@ -0,0 +1,44 @@
+"""
+Structured (JSON) output for FinBank AI.
+Helpers behind BaseLLMProvider.generate_json: the schema a provider's
+native JSON mode is given, and validation of what comes back.
+"""
+
+import json
+from typing import Optional, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+class StructuredOutputError(ValueError):
+    """Raised when an LLM response does not match the requested schema."""
+
+
+def model_schema(schema: type[BaseModel]) -> dict:
+    """JSON schema for a pydantic model, as sent to the provider."""
+    return schema.model_json_schema()
+
+
+def schema_instructions(system_prompt: Optional[str], schema: dict) -> str:
+    """
+    Append the schema to the system prompt.
+
+    OpenAI's JSON mode only guarantees valid JSON, so the model must also be
+    told the shape; the other providers enforce the schema themselves.
+    """
+    instructions = f"Respond with a JSON object matching this JSON schema:\n{json.dumps(schema)}"
+    return f"{system_prompt}\n\n{instructions}" if system_prompt else instructions
+
+
+def parse_structured(content: str, schema: type[ModelT]) -> ModelT:
+    """Validate a JSON response against the schema."""
+    content = content.strip()
+    if content.startswith("```"):
+        # Models without a native JSON mode may still fence their output
+        content = content.split("```")[1].removeprefix("json")
+    try:
+        return schema.model_validate_json(content)
+    except ValidationError as e:
+        raise StructuredOutputError(f"Response does not match {schema.__name__}: {e}") from e
@@ -0,0 +1,122 @@
+"""
+Ollama model warm-up for FinBank AI.
+Loads the configured models when the app starts and refreshes them
+periodically, so the first chat after startup or an idle spell does not
+wait for Ollama to load the model.
+"""
+
+import asyncio
+import time
+from typing import Optional
+
+from app.config import get_settings
+from app.llm.registry import provider_registry
+
+
+class ModelWarmer:
+    """Preloads Ollama models in the background and tracks their load state."""
+
+    def __init__(self):
+        self.models: dict[str, dict] = {}
+        self._task: Optional[asyncio.Task] = None
+        # Loads of models added while the refresh loop is running
+        self._loads: set[asyncio.Task] = set()
+
+    def _state(self, model: str) -> dict:
+        return self.models.setdefault(model, {"status": "cold", "load_ms": None, "warmed_at": None, "error": None})
+
+    async def warm(self, model: str) -> None:
+        """Load one model, recording its state and load time."""
+        state = self._state(model)
+        was_ready = state["status"] == "ready"
+        if not was_ready:
+            state["status"] = "loading"
+        try:
+            load_time = await provider_registry.get("ollama", model).warm_up()
+        except Exception as e:
+            state.update(status="error", error=str(e))
+            return
+        # Keep the cold load time; refreshing a loaded model takes milliseconds
+        if not was_ready and load_time is not None:
+            state["load_ms"] = round(load_time * 1000, 1)
+        state.update(status="ready", warmed_at=time.time(), error=None)
+
+    @staticmethod
+    def configured_models() -> list[str]:
+        """ollama_warmup_models, or the default model when Ollama is the default provider."""
+        settings = get_settings()
+        if not settings.ollama_warmup_enabled:
+            return []
+        if settings.ollama_warmup_models:
+            return list(settings.ollama_warmup_models)
+        provider, model = provider_registry.default
+        return [model] if provider == "ollama" else []
+
+    async def warm_all(self) -> None:
+        """Load every configured model concurrently."""
+        models = self.configured_models()
+        self._prune(models)
+        await asyncio.gather(*(self.warm(model) for model in models))
+
+    async def _run(self) -> None:
+        interval = get_settings().ollama_warmup_interval
+        while True:
+            await self.warm_all()
+            await asyncio.sleep(interval)
+
+    def _prune(self, models: list[str]) -> None:
+        """Forget models that are no longer configured, e.g. after a provider switch."""
+        for model in list(self.models):
+            if model not in models:
+                del self.models[model]
+
+    def start(self) -> None:
+        """Start warming in the background; startup does not wait for models to load."""
+        models = self.configured_models()
+        self._prune(models)
+        if not models:
+            if self._task is not None:
+                self._task.cancel()
+                self._task = None
+            return
+        new = [model for model in models if model not in self.models]
+        for model in models:
+            self._state(model)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            return
+        # The running loop would only load these on its next refresh
+        for model in new:
+            load = asyncio.create_task(self.warm(model))
+            self._loads.add(load)
+            load.add_done_callback(self._loads.discard)
+
+    async def stop(self) -> None:
+        """Stop the refresh loop and any loads in progress."""
+        for load in list(self._loads):
+            load.cancel()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def ready(self) -> bool:
+        """Whether every configured model is loaded (always true with warm-up off)."""
+        models = self.configured_models()
+        return all(self.models.get(model, {}).get("status") == "ready" for model in models)
+
+    def status(self) -> dict:
+        """Readiness and per-model load state."""
+        return {
+            "ready": self.ready,
+            "enabled": get_settings().ollama_warmup_enabled,
+            "models": {model: dict(state) for model, state in self.models.items()},
+        }
+
+
+# Global warmer instance
+model_warmer = ModelWarmer()
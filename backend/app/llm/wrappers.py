@@ -0,0 +1,435 @@
+"""
+Provider wrappers for FinBank AI.
+Wrappers implement BaseLLMProvider around another provider to add
+cross-cutting behaviour without touching the provider implementations.
+"""
+
+import asyncio
+import time
+from typing import AsyncGenerator, Optional
+
+from app.config import get_settings
+from app.deadline import Deadline, DeadlineExceeded, stage_timeout
+from app.llm.base import BaseLLMProvider, LLMResponse
+from app.llm.cache import ResponseCache, response_cache, response_cache_key
+from app.llm.latency import LatencyTracker, current_call_type
+from app.llm.limiter import AdaptiveLimiter, is_retryable, retry_delay
+from app.tracing import tracer
+
+
+class ProviderWrapper(BaseLLMProvider):
+    """Base class for providers that delegate to an inner provider."""
+
+    def __init__(self, inner: BaseLLMProvider):
+        self.inner = inner
+
+    def __getattr__(self, name: str):
+        # Expose provider attributes such as model or client
+        if name == "inner":
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+    async def generate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        deadline: Optional[Deadline] = None,
+        stop: Optional[list[str]] = None,
+        json_schema: Optional[dict] = None,
+    ) -> LLMResponse:
+        return await self.inner.generate(prompt, system_prompt, temperature, max_tokens, deadline, stop, json_schema)
+
+    async def generate_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        deadline: Optional[Deadline] = None,
+        stop: Optional[list[str]] = None,
+    ) -> AsyncGenerator[str, None]:
+        async for chunk in self.inner.generate_stream(prompt, system_prompt, temperature, max_tokens, deadline, stop):
+            yield chunk
+
+    def batch_concurrency(self) -> int:
+        return self.inner.batch_concurrency()
+
+    def caches_prompt_prefix(self) -> bool:
+        return self.inner.caches_prompt_prefix()
+
+    async def warm_up(self) -> Optional[float]:
+        return await self.inner.warm_up()
+
+
+class TracedProvider(ProviderWrapper):
+    """Records an "llm" span with token usage for every provider call."""
+
+    async def generate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        deadline: Optional[Deadline] = None,
+        stop: Optional[list[str]] = None,
+        json_schema: Optional[dict] = None,
+    ) -> LLMResponse:
+        with tracer.span("llm", model=getattr(self, "model", None)) as span:
+            response = await self.inner.generate(prompt, system_prompt, temperature, max_tokens, deadline, stop, json_schema)
+            span.tokens = response.tokens_used
+            if response.cached_tokens:
+                span.attributes["cached_tokens"] = response.cached_tokens
+        return response
+
+    async def generate_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        deadline: Optional[Deadline] = None,
+        stop: Optional[list[str]] = None,
+    ) -> AsyncGenerator[str, None]:
+        with tracer.span("llm", model=getattr(self, "model", None), stream=True) as span:
+            chunks = 0
+            async for chunk in self.inner.generate_stream(prompt, system_prompt, temperature, max_tokens, deadline, stop):
+                chunks += 1
+                with tracer.suspended():
+                    yield chunk
+            span.attributes["chunks"] = chunks
+
+
+class CachedProvider(ProviderWrapper):
+    """
+    Serves repeated low-temperature generate calls from the response cache.
+
+    Calls above llm_cache_max_temperature and streaming calls always go to
+    the inner provider.
+    """
+
+    def __init__(self, inner: BaseLLMProvider, provider: str, cache: ResponseCache = response_cache):
+        super().__init__(inner)
+        self.provider = provider
+        self.cache = cache
+
+    async def generate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        deadline: Optional[Deadline] = None,
+        stop: Optional[list[str]] = None,
+        json_schema: Optional[dict] = None,
+    ) -> LLMResponse:
+        settings = get_settings()
+        if not settings.llm_cache_enabled or temperature > settings.llm_cache_max_temperature:
+            return await self.inner.generate(prompt, system_prompt, temperature, max_tokens, deadline, stop, json_schema)
+
+        key = response_cache_key(
+            self.provider, getattr(self, "model", None),
+            system_prompt, prompt, temperature, max_tokens, stop, json_schema,
+        )
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return LLMResponse(**cached)
+
+        response = await self.inner.generate(prompt, system_prompt, temperature, max_tokens, deadline, stop, json_schema)
+        if response.content:
+            await self.cache.set(key, response.model_dump())
+        return response
+
+
+class CoalescingProvider(ProviderWrapper):
+    """
+    Single-flight de-duplication of identical concurrent generate calls.
+
+    The first caller starts the request and later identical callers await
+    the same task. Errors reach every waiter, and the request is cancelled
+    only once all of its waiters have gone away. The shared request runs
+    without a deadline; each waiter gives up at its own, so the request
+    lives as long as the latest deadline among its waiters.
+    """
+
+    def __init__(self, inner: BaseLLMProvider, provider: str):
+        super().__init__(inner)
+        self.provider = provider
+        self.coalesced = 0
+        self._in_flight: dict[str, list] = {}
+
+    async def generate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        deadline: Optional[Deadline] = None,
+        stop: Optional[list[str]] = None,
+        json_schema: Optional[dict] = None,
+    ) -> LLMResponse:
+        if not get_settings().llm_coalescing_enabled:
+            return await self.inner.generate(prompt, system_prompt, temperature, max_tokens, deadline, stop, json_schema)
+
+        key = response_cache_key(
+            self.provider, getattr(self, "model", None),
+            system_prompt, prompt, temperature, max_tokens, stop, json_schema,
+        )
+        flight = self._in_flight.get(key)
+        if flight is None:
+            task = asyncio.ensure_future(
+                self.inner.generate(prompt, system_prompt, temperature, max_tokens, None, stop, json_schema)
+            )
+            # [task, number of waiters]
+            flight = self._in_flight[key] = [task, 0]
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.coalesced += 1
+
+        task = flight[0]
+        flight[1] += 1
+        try:
+            response = await asyncio.wait_for(asyncio.shield(task), stage_timeout(deadline))
+        except (asyncio.CancelledError, asyncio.TimeoutError) as e:
+            if not task.done() and flight[1] == 1:
+                # Last waiter left: nobody needs the result any more
+                task.cancel()
+            if isinstance(e, asyncio.TimeoutError) and not task.done():
+                raise DeadlineExceeded(f"Request exceeded its {deadline.timeout_seconds:.0f}s deadline") from e
+            raise
+        finally:
+            flight[1] -= 1
+        return response.model_copy()
+
+    def stats(self) -> dict:
+        """Get the number of requests in flight and calls that joined one."""
+        return {"in_flight": len(self._in_flight), "coalesced": self.coalesced}
+
+
+class LimitedProvider(ProviderWrapper):
+    """
+    Admits calls through the provider's AdaptiveLimiter and retries
+    transient errors with jittered exponential backoff.
+
+    Streams are retried only if they fail before the first chunk.
+    """
+
+    def __init__(self, inner: BaseLLMProvider, limiter: AdaptiveLimiter):
+        super().__init__(inner)
+        self.limiter = limiter
+
+    async def _backoff(self, attempt: int, error: BaseException, deadline: Optional[Deadline]) -> None:
+        """Sleep before the next attempt, or re-raise if retrying is pointless."""
+        if attempt >= get_settings().llm_max_retries or not is_retryable(error):
+            raise error
+        delay = retry_delay(attempt)
+        remaining = deadline.remaining() if deadline else None
+        if remaining is not None and delay >= remaining:
+            raise error
+        self.limiter.retries += 1
+        await asyncio.sleep(delay)
+
+    async def generate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        deadline: Optional[Deadline] = None,
+        stop: Optional[list[str]] = None,
+        json_schema: Optional[dict] = None,
+    ) -> LLMResponse:
+        attempt = 0
+        while True:
+            try:
+                async with self.limiter.slot(deadline):
+                    return await self.inner.generate(prompt, system_prompt, temperature, max_tokens, deadline, stop, json_schema)
+            except Exception as e:
+                await self._backoff(attempt, e, deadline)
+                attempt += 1
+
+    async def generate_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        deadline: Optional[Deadline] = None,
+        stop: Optional[list[str]] = None,
+    ) -> AsyncGenerator[str, None]:
+        attempt = 0
+        while True:
+            started = False
+            try:
+                async with self.limiter.slot(deadline):
+                    async for chunk in self.inner.generate_stream(
+                        prompt, system_prompt, temperature, max_tokens, deadline, stop
+                    ):
+                        started = True
+                        yield chunk
+                return
+            except Exception as e:
+                if started:
+                    raise
+                await self._backoff(attempt, e, deadline)
+                attempt += 1
+
+
+class HedgedProvider(ProviderWrapper):
+    """
+    Sends a backup request to a secondary provider when the primary is slow.
+
+    For each call type with a configured percentile (see hedge_percentiles),
+    the backup goes out once the primary has taken longer than that
+    percentile of its recent latencies. Whichever answers first wins and
+    the other request is cancelled. Streams are hedged on the time to
+    their first chunk.
+    """
+
+    def __init__(self, inner: BaseLLMProvider, secondary: BaseLLMProvider, tracker: Optional[LatencyTracker] = None):
+        super().__init__(inner)
+        self.secondary = secondary
+        settings = get_settings()
+        self.tracker = tracker or LatencyTracker(settings.hedge_window)
+        self.hedges: dict[str, int] = {}
+        self.hedge_wins: dict[str, int] = {}
+
+    def _hedge_delay(self, call_type: Optional[str], samples: Optional[str] = None) -> Optional[float]:
+        """
+        Seconds to wait for the primary before hedging, or None to not hedge.
+
+        The percentile is configured per call type and taken over the
+        latencies recorded under `samples` (default: the call type).
+        """
+        settings = get_settings()
+        pct = settings.hedge_percentiles.get(call_type) if call_type else None
+        samples = samples or call_type
+        if pct is None or self.tracker.count(samples) < settings.hedge_min_samples:
+            return None
+        return max(settings.hedge_min_delay, self.tracker.percentile(samples, pct))
+
+    def _count(self, call_type: str, won: bool) -> None:
+        self.hedges[call_type] = self.hedges.get(call_type, 0) + 1
+        if won:
+            self.hedge_wins[call_type] = self.hedge_wins.get(call_type, 0) + 1
+
+    @staticmethod
+    async def _race(first: asyncio.Task, second: asyncio.Task) -> asyncio.Task:
+        """
+        Wait for the first task to succeed and cancel the other.
+
+        If one fails, the other's outcome is used instead.
+        """
+        pending = {first, second}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if not task.cancelled() and task.exception() is None:
+                        return task
+                if not pending:
+                    # Both failed: surface the primary's error
+                    return first
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def generate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        deadline: Optional[Deadline] = None,
+        stop: Optional[list[str]] = None,
+        json_schema: Optional[dict] = None,
+    ) -> LLMResponse:
+        call_type = current_call_type()
+        delay = self._hedge_delay(call_type)
+        start = time.perf_counter()
+        primary = asyncio.ensure_future(
+            self.inner.generate(prompt, system_prompt, temperature, max_tokens, deadline, stop, json_schema)
+        )
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                response = primary.result()
+                if call_type:
+                    self.tracker.record(call_type, time.perf_counter() - start)
+                return response
+
+            with tracer.span("hedge", call_type=call_type, delay_ms=round(delay * 1000)) as span:
+                backup = asyncio.ensure_future(
+                    self.secondary.generate(prompt, system_prompt, temperature, max_tokens, deadline, stop, json_schema)
+                )
+                winner = await self._race(primary, backup)
+                span.attributes["winner"] = "secondary" if winner is backup else "primary"
+            self._count(call_type, winner is backup)
+            # A cancelled primary still took at least this long
+            self.tracker.record(call_type, time.perf_counter() - start)
+            return winner.result()
+        finally:
+            primary.cancel()
+
+    async def generate_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        deadline: Optional[Deadline] = None,
+        stop: Optional[list[str]] = None,
+    ) -> AsyncGenerator[str, None]:
+        call_type = current_call_type()
+        # Streams are compared by time to first chunk
+        stream_type = f"{call_type}:stream" if call_type else None
+        delay = self._hedge_delay(call_type, stream_type)
+
+        args = (prompt, system_prompt, temperature, max_tokens, deadline, stop)
+        start = time.perf_counter()
+        streams = {"primary": self.inner.generate_stream(*args).__aiter__()}
+        firsts = {"primary": asyncio.ensure_future(streams["primary"].__anext__())}
+        winner = "primary"
+        try:
+            done, _ = await asyncio.wait({firsts["primary"]}, timeout=delay)
+            if not done:
+                with tracer.span("hedge", call_type=call_type, stream=True, delay_ms=round(delay * 1000)) as span:
+                    streams["secondary"] = self.secondary.generate_stream(*args).__aiter__()
+                    firsts["secondary"] = asyncio.ensure_future(streams["secondary"].__anext__())
+                    task = await self._race(firsts["primary"], firsts["secondary"])
+                    winner = "secondary" if task is firsts["secondary"] else "primary"
+                    span.attributes["winner"] = winner
+                self._count(call_type, winner == "secondary")
+
+            try:
+                first_chunk = firsts[winner].result()
+            except StopAsyncIteration:
+                return
+            if stream_type:
+                self.tracker.record(stream_type, time.perf_counter() - start)
+            yield first_chunk
+            async for chunk in streams[winner]:
+                yield chunk
+        finally:
+            # A generator can only be closed once its pending __anext__ has finished
+            for task in firsts.values():
+                task.cancel()
+            await asyncio.gather(*firsts.values(), return_exceptions=True)
+            for stream in streams.values():
+                await stream.aclose()
+
+    def stats(self) -> dict:
+        """Get hedges sent and won per call type, and the current hedge delays."""
+        settings = get_settings()
+        return {
+            "secondary": getattr(self.secondary, "model", None),
+            "hedges": dict(self.hedges),
+            "secondary_wins": dict(self.hedge_wins),
+            "delays_ms": {
+                samples: round(delay * 1000)
+                for call_type in settings.hedge_percentiles
+                for samples in (call_type, f"{call_type}:stream")
+                if (delay := self._hedge_delay(call_type, samples)) is not None
+            },
+        }
@@ -3,19 +3,26 @@ FinBank AI - Multi-Agent Banking Assistant
 Main FastAPI application entry point.
 """
 
+import time
 from fastapi import FastAPI, WebSocket, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from pydantic import BaseModel
 from typing import Optional
 
 from app.config import get_settings
-from app.database import get_db, init_db
-from app.orchestrator import Orchestrator
+from app.database import SessionLocal, get_db, init_db
+from app.orchestrator import Orchestrator, process_batch
 from app.websocket import handle_chat_websocket
 from app.agents import get_available_agents
-from app.llm import get_llm_provider, ProviderType
+from app.llm import get_llm_provider, provider_registry, ProviderType
+from app.llm.cache import plan_cache, response_cache
+from app.llm.ollama_provider import close_ollama_client
+from app.llm.warmup import model_warmer
+from app.sql_templates import sql_template_cache
+from app.tracing import tracer
 
 settings = get_settings()
 
@@ -39,8 +46,17 @@ app.add_middleware(
 # Startup event
 @app.on_event("startup")
 async def startup():
-    """Initialize database on startup."""
+    """Initialize database and start loading Ollama models on startup."""
     init_db()
+    model_warmer.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop model warm-up and release pooled LLM connections."""
+    await model_warmer.stop()
+    await provider_registry.close()
+    await close_ollama_client()
 
 
 # Health check
@@ -50,6 +66,13 @@ async def health_check():
     return {"status": "healthy", "service": "finbank-ai"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness check: 503 until the configured Ollama models are loaded."""
+    status = model_warmer.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
 # API Models
 class ChatRequest(BaseModel):
     """Chat request model."""
@@ -61,6 +84,32 @@ class ChatResponse(BaseModel):
     """Chat response model."""
     response: str
     agents_used: list[str]
+    data: Optional[dict] = None
+
+
+class BatchChatRequest(BaseModel):
+    """Batch chat request model."""
+    messages: list[str]
+    provider: Optional[ProviderType] = None
+    concurrency: Optional[int] = None
+
+
+class BatchChatItem(BaseModel):
+    """Result for one message of a batch."""
+    index: int
+    message: str
+    success: bool
+    response: Optional[str] = None
+    agents_used: list[str] = []
+    error: Optional[str] = None
+    duration_ms: float
+
+
+class BatchChatResponse(BaseModel):
+    """Batch chat response model."""
+    results: list[BatchChatItem]
+    concurrency: int
+    total_ms: float
 
 
 # REST API Endpoints
@@ -70,6 +119,24 @@ async def list_agents():
     return {"agents": get_available_agents()}
 
 
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Get hit/miss counters for the in-process caches."""
+    return {"plan": plan_cache.stats(), "llm": await response_cache.stats(), "sql_templates": sql_template_cache.stats()}
+
+
+@app.get("/api/metrics")
+async def get_metrics():
+    """Get per-stage latency histograms for the chat pipeline."""
+    return {"stages": tracer.histograms()}
+
+
+@app.get("/api/metrics/spans")
+async def get_recent_spans(limit: int = 100):
+    """Get the most recent tracing spans."""
+    return {"spans": [span.model_dump() for span in tracer.recent(limit)]}
+
+
 @app.get("/api/providers")
 async def list_providers():
     """List available LLM providers."""
@@ -79,11 +146,18 @@ async def list_providers():
             {"name": "claude", "description": "Anthropic Claude"},
             {"name": "azure", "description": "Azure OpenAI"},
             {"name": "ollama", "description": "Local Ollama"},
+            {"name": "replay", "description": "Recorded responses for load tests"},
         ],
         "default": settings.default_llm_provider,
     }
 
 
+@app.get("/api/providers/stats")
+async def provider_stats():
+    """Get shared provider instances with usage and connection pool statistics."""
+    return provider_registry.stats()
+
+
 @app.post("/api/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest, db: Session = Depends(get_db)):
     """
@@ -95,16 +169,41 @@ async def chat(request: ChatRequest, db: Session = Depends(get_db)):
         orchestrator = Orchestrator(db, llm)
         result = await orchestrator.process_simple(request.message)
 
-        # Extract agents used from messages
-        agents_used = [
-            msg.split(":")[1].split("]")[0]
-            for msg in result["messages"]
-            if msg.startswith("[AGENT:")
-        ]
-
         return ChatResponse(
             response=result["response"],
-            agents_used=list(set(agents_used)),
+            agents_used=result["agents_used"],
+            data=result["results"],
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/chat/batch", response_model=BatchChatResponse)
+async def chat_batch(request: BatchChatRequest):
+    """
+    Process many messages concurrently (non-streaming).
+
+    Results are returned in request order with per-item timings. Messages
+    share one LLM provider and the plan cache; each gets its own DB session.
+    """
+    if len(request.messages) > settings.batch_chat_max_messages:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many messages. Maximum per batch: {settings.batch_chat_max_messages}",
+        )
+
+    concurrency = min(request.concurrency or settings.batch_chat_concurrency, settings.batch_chat_max_concurrency)
+    concurrency = max(1, concurrency)
+
+    try:
+        llm = get_llm_provider(request.provider)
+        start = time.perf_counter()
+        results = await process_batch(request.messages, llm, SessionLocal, concurrency)
+
+        return BatchChatResponse(
+            results=[BatchChatItem(**result) for result in results],
+            concurrency=concurrency,
+            total_ms=round((time.perf_counter() - start) * 1000, 2),
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -380,11 +479,12 @@ async def create_customer(request: CustomerCreateRequest, db: Session = Depends(
 @app.get("/api/settings", response_model=SettingsResponse)
 async def get_settings_api():
     """Get current application settings."""
+    provider, model = provider_registry.default
     return SettingsResponse(
-        provider=settings.default_llm_provider,
-        model="llama3.2" if settings.default_llm_provider == "ollama" else "gpt-4",
+        provider=provider,
+        model=model,
         temperature=0.7,
-        ollama_base_url=settings.ollama_base_url if settings.default_llm_provider == "ollama" else None,
+        ollama_base_url=settings.ollama_base_url if provider == "ollama" else None,
     )
 
 
@@ -398,24 +498,23 @@ async def update_provider_settings(request: ProviderUpdateRequest):
     """
     try:
         # Validate provider
-        valid_providers = ["openai", "claude", "azure", "ollama"]
+        valid_providers = ["openai", "claude", "azure", "ollama", "replay"]
         if request.provider not in valid_providers:
             raise HTTPException(
                 status_code=400,
                 detail=f"Invalid provider. Must be one of: {', '.join(valid_providers)}"
             )
 
-        # Update runtime settings
-        settings.default_llm_provider = request.provider
-
-        # Verify the provider can be initialized
+        # Initialize the provider, then make it the default for new requests
         try:
-            _ = get_llm_provider(request.provider)  # Test initialization
+            provider_registry.set_default(request.provider, request.model)
         except Exception as e:
             raise HTTPException(
                 status_code=500,
                 detail=f"Failed to initialize provider '{request.provider}': {str(e)}"
             )
+        # Start loading a newly selected Ollama model
+        model_warmer.start()
 
         return {
             "success": True,
@@ -3,11 +3,29 @@ Main AI Orchestrator for FinBank AI.
 Coordinates agents to process user requests.
 """
 
-from typing import AsyncGenerator
+import asyncio
+import time
+from typing import Any, AsyncGenerator, AsyncIterator, Awaitable, Callable
 from sqlalchemy.orm import Session
 
-from app.agents import get_agent, get_available_agents
+from app.budget import budget_results, estimate_tokens
+from app.config import get_settings
+from app.deadline import Deadline
+from app.events import (
+    AgentDoneEvent,
+    AgentErrorEvent,
+    AgentStartedEvent,
+    ChatEvent,
+    ResponseDeltaEvent,
+    ResponseEvent,
+    StatusEvent,
+)
+from app.agents import AGENT_REGISTRY, AgentResult, get_agent, get_available_agents
+from app.agents.base import DATABASE_SCHEMA
+from app.schema import pruned_schema
 from app.llm import BaseLLMProvider, get_llm_provider
+from app.router import route_message
+from app.tracing import tracer
 
 
 class Orchestrator:
@@ -18,72 +36,375 @@ class Orchestrator:
     def __init__(self, db: Session, llm: BaseLLMProvider | None = None):
         self.db = db
         self.llm = llm or get_llm_provider()
+        # Full agent results of the last processed message, for clients
+        self.results: dict = {}
 
-    async def process(self, user_message: str) -> AsyncGenerator[str, None]:
+    async def process(
+        self,
+        user_message: str,
+        stream: bool = False,
+        deadline: Deadline | None = None,
+        planned: list[dict] | None = None,
+    ) -> AsyncGenerator[ChatEvent, None]:
         """
         Process a user message and stream the response.
 
-        Yields status updates and the final response.
+        Yields typed events: status updates, agent progress and the final
+        response. With stream=True the response text is also yielded as
+        ResponseDeltaEvent chunks while it is generated.
+
+        Every stage runs within the request deadline (chat_request_timeout
+        by default). When time runs out, the agent results gathered so far
+        are returned without LLM synthesis.
+
+        A plan made ahead of time (see process_batch) is used instead of
+        asking the LLM planner, unless the rules route the message.
         """
+        settings = get_settings()
+        deadline = deadline or Deadline(settings.chat_request_timeout)
+        tracer.new_trace()
+
         # Step 1: Plan which agents to use
-        yield "[STATUS] Planning tasks..."
+        yield StatusEvent(content="Planning tasks...")
         available = [a["name"] for a in get_available_agents()]
-        plan = await self.llm.plan_tasks(user_message, available)
+        try:
+            with tracer.span("plan") as span:
+                route = route_message(user_message, available)
+                if route.path == "rules":
+                    plan = route.plan
+                elif planned is not None:
+                    plan = planned
+                elif settings.fused_planning_enabled:
+                    # One call returns the plan plus SQL for the read-only agents
+                    sql_agents = [
+                        name for name in available
+                        if name in AGENT_REGISTRY and AGENT_REGISTRY[name].accepts_planned_sql
+                    ]
+                    plan = await self.llm.plan_tasks(
+                        user_message, available, deadline=deadline, sql_agents=sql_agents,
+                        schema=pruned_schema(user_message, DATABASE_SCHEMA),
+                    )
+                else:
+                    plan = await self.llm.plan_tasks(user_message, available, deadline=deadline)
+                span.attributes.update(path=route.path, confidence=route.confidence, tasks=len(plan))
+        except Exception:
+            if not deadline.expired:
+                raise
+            yield ResponseEvent(content="Sorry, the request timed out while planning. Please try again.")
+            return
+
+        if route.path == "rules":
+            yield StatusEvent(content=f"Routed to {route.agent} agent (rules, confidence {route.confidence:.2f})")
 
-        # DEBUG: Print the plan
-        print(f"\n{'='*60}")
-        print(f"USER MESSAGE: {user_message}")
-        print(f"PLAN: {plan}")
-        print(f"{'='*60}\n")
+        results = {}
+        self.results = results
 
         if not plan:
-            yield "[STATUS] Processing directly..."
-            response = await self.llm.generate(
-                prompt=user_message,
-                system_prompt="You are a helpful banking assistant. Answer the user's question directly.",
-            )
-            yield f"[RESPONSE]{response.content}"
+            yield StatusEvent(content="Processing directly...")
+            system_prompt = "You are a helpful banking assistant. Answer the user's question directly."
+            async for event in self._respond(
+                lambda: self.llm.generate_stream(prompt=user_message, system_prompt=system_prompt, deadline=deadline),
+                lambda: self.llm.generate(prompt=user_message, system_prompt=system_prompt, deadline=deadline),
+                results, stream, deadline, direct=True,
+            ):
+                yield event
             return
 
-        yield f"[STATUS] Using {len(plan)} agent(s)"
+        yield StatusEvent(content=f"Using {len(plan)} agent(s)")
 
-        # Step 2: Execute each agent task
-        results = {}
-        for task in plan:
+        # Step 2: Execute agent tasks; each starts once its own dependencies finish
+        dependencies = self._plan_dependencies(plan)
+        jobs: dict[int, asyncio.Task] = {}
+        started: set[int] = set()
+        for index, task in enumerate(plan):
+            # A Session is not safe to share between concurrent tasks; write
+            # agents never overlap another task and keep the request's session
             agent_name = task.get("agent", "query")
-            task_desc = task.get("task", user_message)
+            agent_class = AGENT_REGISTRY.get(agent_name)
+            own_session = len(plan) > 1 and (agent_class is None or agent_class.read_only)
+            jobs[index] = asyncio.create_task(self._run_after(
+                [jobs[d] for d in dependencies[index]], index, started,
+                agent_name, task.get("task", user_message), deadline, task.get("sql"), own_session,
+            ))
+
+        announced: set[int] = set()
+        try:
+            # Report in plan order, even if a later task finished first
+            for index, job in jobs.items():
+                for later in range(index, len(plan)):
+                    if later not in announced and all(d < index for d in dependencies[later]):
+                        announced.add(later)
+                        yield AgentStartedEvent(
+                            agent=plan[later].get("agent", "query"),
+                            task_index=later,
+                            content=plan[later].get("task", user_message),
+                        )
+
+                agent_name = plan[index].get("agent", "query")
+                key = self._result_key(index, agent_name)
+                await asyncio.wait({job}, timeout=deadline.remaining())
+                if not job.done():
+                    error = "Timed out" if index in started else "Skipped"
+                    yield AgentErrorEvent(agent=agent_name, task_index=index, content=f"{error}: request deadline exceeded")
+                    results[key] = {"error": f"{error}: request deadline exceeded"}
+                    continue
+                try:
+                    result = job.result()
+                    results[key] = result.model_dump()
+                    yield AgentDoneEvent(
+                        agent=agent_name,
+                        task_index=index,
+                        content=result.message or "",
+                        data=results[key],
+                    )
+                except Exception as e:
+                    yield AgentErrorEvent(agent=agent_name, task_index=index, content=str(e))
+                    results[key] = {"error": str(e)}
+        finally:
+            # Don't leave agents running if they timed out or the consumer stops listening
+            for job in jobs.values():
+                job.cancel()
+
+        # Step 3: Synthesize final response from a size-bounded view of the results
+        remaining = deadline.remaining()
+        if remaining is not None and remaining < settings.min_synthesis_time:
+            yield StatusEvent(content="Time limit reached, returning partial results")
+            yield ResponseEvent(content=self._partial_response(results), data=results)
+            return
+
+        yield StatusEvent(content="Generating response...")
+        with tracer.span("budget") as span:
+            budgeted = budget_results(results)
+            span.tokens = estimate_tokens(budgeted)
+            span.attributes["tokens_before"] = estimate_tokens(results)
+
+        async for event in self._respond(
+            lambda: self.llm.synthesize_stream(user_message, budgeted, deadline=deadline),
+            lambda: self.llm.synthesize(user_message, budgeted, deadline=deadline),
+            results, stream, deadline,
+        ):
+            yield event
+
+    async def _respond(
+        self,
+        streamed: Callable[[], AsyncIterator[str]],
+        complete: Callable[[], Awaitable[Any]],
+        results: dict,
+        stream: bool,
+        deadline: Deadline,
+        direct: bool = False,
+    ) -> AsyncGenerator[ChatEvent, None]:
+        """
+        Generate the final response, streamed or in one piece.
+
+        Falls back to the partial results if the deadline runs out while
+        the LLM is still writing.
+        """
+        parts: list[str] = []
+        try:
+            if stream:
+                with tracer.span("synthesize", direct=direct, stream=True):
+                    async for chunk in streamed():
+                        parts.append(chunk)
+                        with tracer.suspended():
+                            yield ResponseDeltaEvent(content=chunk)
+                content = "".join(parts)
+            else:
+                with tracer.span("synthesize", direct=direct):
+                    response = await complete()
+                content = response if isinstance(response, str) else response.content
+        except Exception:
+            if not deadline.expired:
+                raise
+            yield StatusEvent(content="Time limit reached, returning partial results")
+            content = "".join(parts) or self._partial_response(results)
+
+        yield ResponseEvent(content=content, data=results if not direct else None)
+
+    @staticmethod
+    def _result_key(index: int, agent_name: str) -> str:
+        """Results are keyed per task, so two tasks for one agent don't collide."""
+        return f"{index}:{agent_name}"
+
+    def _partial_response(self, results: dict) -> str:
+        """Summarize agent results without the LLM when there is no time left to synthesize."""
+        if not results:
+            return "Sorry, the request timed out before any results were ready. Please try again."
+
+        lines = ["I ran out of time before I could write a full answer. Here is what I found:", ""]
+        for key, result in results.items():
+            agent_name = key.split(":", 1)[-1]
+            if "error" in result:
+                lines.append(f"- **{agent_name}**: {result['error']}")
+            else:
+                lines.append(f"- **{agent_name}**: {result.get('message') or 'Completed'}")
+        return "\n".join(lines)
 
-            yield f"[AGENT:{agent_name}] {task_desc}"
+    async def _run_after(
+        self,
+        dependencies: list[asyncio.Task],
+        index: int,
+        started: set[int],
+        agent_name: str,
+        task_desc: str,
+        deadline: Deadline,
+        planned_sql: str | None,
+        own_session: bool,
+    ) -> AgentResult:
+        """Run a task once the tasks it depends on have finished, however they ended."""
+        if dependencies:
+            await asyncio.wait(dependencies)
+        if deadline.expired:
+            raise RuntimeError("Skipped: request deadline exceeded")
+        started.add(index)
+        return await self._run_agent(agent_name, task_desc, deadline, planned_sql, own_session=own_session)
 
+    async def _run_agent(
+        self,
+        agent_name: str,
+        task_desc: str,
+        deadline: Deadline,
+        planned_sql: str | None = None,
+        own_session: bool = False,
+    ) -> AgentResult:
+        """
+        Instantiate an agent and execute a single planned task.
+
+        With own_session the agent gets a new Session on the same engine,
+        closed when it finishes, and runs its queries in a worker thread.
+        """
+        db = Session(bind=self.db.get_bind()) if own_session else self.db
+        with tracer.span("agent", agent=agent_name, planned_sql=planned_sql is not None) as span:
             try:
-                agent = get_agent(agent_name, self.db, self.llm)
-                result = await agent.execute(task_desc)
-                results[agent_name] = result.model_dump()
-                yield f"[AGENT:{agent_name}:DONE] {result.message}"
-            except Exception as e:
-                yield f"[AGENT:{agent_name}:ERROR] {str(e)}"
-                results[agent_name] = {"error": str(e)}
+                agent = get_agent(agent_name, db, self.llm)
+                agent.planned_sql = planned_sql
+                agent.owns_session = own_session
+                result = await agent.execute(task_desc, deadline=deadline)
+            finally:
+                if own_session:
+                    db.close()
+            span.attributes["success"] = result.success
+            if result.sql_rewrites:
+                span.attributes["sql_rewrites"] = result.sql_rewrites
+            if isinstance(result.data, list):
+                span.rows = len(result.data)
+        return result
 
-        # Step 3: Synthesize final response
-        yield "[STATUS] Generating response..."
-        response = await self.llm.synthesize(user_message, results)
-        yield f"[RESPONSE]{response}"
+    def _plan_dependencies(self, plan: list[dict]) -> list[set[int]]:
+        """
+        Work out which earlier tasks each planned task has to wait for.
 
-    async def process_simple(self, user_message: str) -> dict:
+        Explicit "depends_on" indexes from the planner are honoured, and
+        write agents act as barriers so reads never race a pending write.
+        """
+        def writes(task: dict) -> bool:
+            agent_class = AGENT_REGISTRY.get(task.get("agent", "query"))
+            return agent_class is not None and not agent_class.read_only
+
+        dependencies = []
+        for index, task in enumerate(plan):
+            depends_on = task.get("depends_on") or []
+            if not isinstance(depends_on, list):
+                depends_on = [depends_on]
+            needed = {d for d in depends_on if isinstance(d, int) and 0 <= d < index}
+            for earlier in range(index):
+                if writes(task) or writes(plan[earlier]):
+                    needed.add(earlier)
+            dependencies.append(needed)
+        return dependencies
+
+    async def process_simple(
+        self,
+        user_message: str,
+        deadline: Deadline | None = None,
+        planned: list[dict] | None = None,
+    ) -> dict:
         """
         Process a user message and return the complete response.
 
-        Returns a dict with all results and the final response.
+        Returns a dict with all events, results and the final response.
         """
-        messages = []
+        events = []
         final_response = ""
 
-        async for msg in self.process(user_message):
-            messages.append(msg)
-            if msg.startswith("[RESPONSE]"):
-                final_response = msg[10:]
+        async for event in self.process(user_message, deadline=deadline, planned=planned):
+            events.append(event)
+            if isinstance(event, ResponseEvent):
+                final_response = event.content
+
+        agents_used = []
+        for event in events:
+            if isinstance(event, AgentStartedEvent) and event.agent not in agents_used:
+                agents_used.append(event.agent)
 
         return {
-            "messages": messages,
+            "events": events,
             "response": final_response,
+            "results": self.results,
+            "agents_used": agents_used,
         }
+
+
+async def process_batch(
+    messages: list[str],
+    llm: BaseLLMProvider,
+    session_factory: Callable[[], Session],
+    concurrency: int,
+) -> list[dict]:
+    """
+    Process many messages concurrently and return their results in order.
+
+    All messages share one LLM provider (and so its client and caches),
+    while each gets its own database session. At most `concurrency`
+    messages are in flight at once.
+
+    Messages the rules cannot route are planned up front in one
+    generate_many batch (not with fused planning, whose prompt differs
+    per message); any the batch could not plan are planned individually.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    plans: list[list[dict] | None] = [None] * len(messages)
+
+    settings = get_settings()
+    if not settings.fused_planning_enabled:
+        available = [a["name"] for a in get_available_agents()]
+        pending = [
+            index for index, message in enumerate(messages)
+            if route_message(message, available).path == "llm"
+        ]
+        if pending:
+            with tracer.span("plan", batch=len(pending)):
+                planned = await llm.plan_many(
+                    [messages[index] for index in pending], available,
+                    deadline=Deadline(settings.chat_request_timeout), concurrency=concurrency,
+                )
+            for index, plan in zip(pending, planned):
+                plans[index] = plan
+
+    async def run(index: int, message: str) -> dict:
+        async with semaphore:
+            db = session_factory()
+            start = time.perf_counter()
+            try:
+                result = await Orchestrator(db, llm).process_simple(message, planned=plans[index])
+                return {
+                    "index": index,
+                    "message": message,
+                    "success": True,
+                    "response": result["response"],
+                    "agents_used": result["agents_used"],
+                    "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+                }
+            except Exception as e:
+                db.rollback()
+                return {
+                    "index": index,
+                    "message": message,
+                    "success": False,
+                    "error": str(e),
+                    "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+                }
+            finally:
+                db.close()
+
+    return await asyncio.gather(*(run(index, message) for index, message in enumerate(messages)))
@@ -0,0 +1,136 @@
+"""
+Rule-based intent router for FinBank AI.
+Maps clearly unambiguous requests straight to an agent plan so the
+orchestrator can skip the LLM planning round trip.
+"""
+
+import re
+from typing import Literal
+from pydantic import BaseModel
+
+from app.agents import AGENT_REGISTRY
+from app.config import get_settings
+
+
+# Keyword rules per agent, mirroring the routing rules in the planner prompt
+ROUTING_KEYWORDS: dict[str, list[str]] = {
+    "transaction": ["deposit", "deposits", "withdraw", "withdrawal", "transfer", "send money", "move money"],
+    "crud": ["add", "create", "register", "update", "modify", "change", "edit", "delete", "remove", "deactivate"],
+    "analytics": ["calculate", "analyze", "analyse", "analytics", "statistics", "stats", "average", "total",
+                  "sum of", "how many", "breakdown", "per branch", "per tier", "per month"],
+    "search": ["search", "look up", "lookup", "containing", "starting with", "partial", "similar to"],
+    "risk": ["suspicious", "fraud", "fraudulent", "risk", "risky", "anomaly", "anomalies", "unusual", "flagged"],
+    "export": ["export", "csv", "statement", "download"],
+    "query": ["list", "show", "display", "get", "find", "view", "what is", "what are", "give me"],
+}
+
+# CRUD verbs are common English words, so they only count next to a record noun
+CRUD_NOUNS = ["customer", "customers", "client", "clients", "user", "users", "record", "email", "phone", "address"]
+
+# Write agents only take the fast path for an explicit command on a specific
+# record: the message starts with one of these verbs and names an account
+# number, email address or customer id
+WRITE_VERBS: dict[str, list[str]] = {
+    "transaction": ["deposit", "withdraw", "transfer", "send", "move"],
+    "crud": ["add", "create", "register", "update", "modify", "change", "edit", "delete", "remove", "deactivate"],
+}
+RECORD_ID = re.compile(
+    r"\b[a-z]{2,4}-\d{4,}\b"
+    r"|\b[\w.+-]+@[\w-]+(?:\.[\w-]+)+\b"
+    r"|\b(?:customer|client|id)\s*#?\s*\d+\b"
+)
+
+# Words that suggest the user is asking for more than one thing
+MULTI_INTENT_MARKERS = [" and ", " then ", " also ", ";", " as well as "]
+
+LONG_MESSAGE_WORDS = 30
+
+
+class RouteDecision(BaseModel):
+    """Outcome of rule-based routing."""
+    path: Literal["rules", "llm"]
+    confidence: float
+    plan: list[dict] = []
+    agent: str | None = None
+
+
+def _matches(text: str, keyword: str) -> bool:
+    """Check for a keyword on word boundaries."""
+    return re.search(rf"(?<!\w){re.escape(keyword)}(?!\w)", text) is not None
+
+
+def _is_write_command(text: str, agent: str) -> bool:
+    """Check that a message is an imperative command on an identified record."""
+    words = text.split()
+    if words and words[0] == "please":
+        words = words[1:]
+    if not words or words[0] not in WRITE_VERBS.get(agent, []) or "?" in text:
+        return False
+    return RECORD_ID.search(text) is not None
+
+
+def score_message(user_message: str, available_agents: list[str]) -> tuple[str | None, float]:
+    """
+    Score how confidently a message maps to a single agent.
+
+    Returns the best agent (or None) and a confidence between 0 and 1.
+    """
+    text = " " + re.sub(r"\s+", " ", user_message.lower().strip()) + " "
+
+    matched = []
+    for agent, keywords in ROUTING_KEYWORDS.items():
+        if agent not in available_agents:
+            continue
+        if agent == "crud" and not any(_matches(text, noun) for noun in CRUD_NOUNS):
+            continue
+        if any(_matches(text, keyword) for keyword in keywords):
+            matched.append(agent)
+
+    # Generic read verbs ("show", "list") defer to any more specific agent
+    specific = [agent for agent in matched if agent != "query"]
+
+    if not matched:
+        return None, 0.0
+    if len(specific) > 1:
+        # Several distinct intents need the LLM to split the work
+        return None, 0.3
+    if specific:
+        agent = specific[0]
+        agent_class = AGENT_REGISTRY.get(agent)
+        if agent_class is not None and not agent_class.read_only and not _is_write_command(text, agent):
+            # Questions about how to do something must never start a write
+            return None, 0.3
+        confidence = 0.9
+        if "query" in matched and any(marker in text for marker in MULTI_INTENT_MARKERS):
+            confidence = 0.6
+    else:
+        agent = "query"
+        confidence = 0.85
+
+    if len(text.split()) > LONG_MESSAGE_WORDS:
+        confidence *= 0.8
+
+    return agent, round(confidence, 2)
+
+
+def route_message(user_message: str, available_agents: list[str]) -> RouteDecision:
+    """
+    Route a message by keyword rules when the match is unambiguous.
+
+    Falls back to the LLM planner when confidence is below the configured
+    threshold or the fast path is disabled.
+    """
+    settings = get_settings()
+    if not settings.fast_router_enabled:
+        return RouteDecision(path="llm", confidence=0.0)
+
+    agent, confidence = score_message(user_message, available_agents)
+    if agent is None or confidence < settings.fast_router_min_confidence:
+        return RouteDecision(path="llm", confidence=confidence, agent=agent)
+
+    return RouteDecision(
+        path="rules",
+        confidence=confidence,
+        agent=agent,
+        plan=[{"agent": agent, "task": user_message}],
+    )
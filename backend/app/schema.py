@@ -0,0 +1,195 @@
+"""
+Schema pruning for SQL-generation prompts.
+Picks the tables a task mentions, by keyword matching against the model
+metadata in app/models.py, and adds the tables needed to join them.
+Prompts then carry only those tables instead of the whole schema.
+"""
+
+import re
+from collections import deque
+from functools import lru_cache
+from typing import Iterable
+
+from sqlalchemy import Table
+
+from app.config import get_settings
+from app.models import Base
+
+# Tables described to the LLM, in prompt order
+SCHEMA_TABLES = [
+    "customer_tiers",
+    "branches",
+    "customers",
+    "account_types",
+    "accounts",
+    "transactions",
+    "loans",
+    "cards",
+]
+
+# Words that point at a table beyond its own name and columns (singular forms)
+TABLE_KEYWORDS = {
+    "customer_tiers": {"tier", "vip", "premium", "basic", "benefit"},
+    "branches": {"branch", "manager", "downtown", "westside", "airport", "bellevue"},
+    "customers": {"customer", "client", "people", "person", "who", "name", "email", "phone", "holder", "owner"},
+    "account_types": {"checking", "saving", "investment", "interest"},
+    "accounts": {"account", "balance", "chk", "sav", "inv", "richest", "wealthiest", "opened"},
+    "transactions": {
+        "transaction", "deposit", "withdrawal", "withdraw", "transfer", "payment", "spent",
+        "spending", "spend", "activity", "fraud", "suspicious", "statement", "txn",
+    },
+    "loans": {"loan", "mortgage", "auto", "personal", "principal", "debt", "borrow", "borrowed", "monthly"},
+    "cards": {"card", "credit", "debit", "expiry", "expire", "expiring"},
+}
+
+# Capitalized words that take "'s" as a contraction, not a possessive
+CONTRACTIONS = ["What", "That", "Let", "It", "He", "She", "There", "Here", "Who", "Where", "How", "When"]
+
+# A full name ("John Smith") or a capitalized possessive ("Smith's") refers to a customer
+PERSON_PATTERN = re.compile(
+    r"\b[A-Z][a-z]+ [A-Z][a-z]+\b"
+    rf"|\b(?!(?:{'|'.join(CONTRACTIONS)})'s\b)[A-Z][a-z]+'s\b"
+)
+
+# Column names too generic to point at one table
+GENERIC_COLUMNS = {"id", "name", "type", "status", "city", "address", "created_at", "min_balance", "interest_rate"}
+
+
+def _singular(word: str) -> str:
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith("es") and word[:-2].endswith(("ch", "sh", "x")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def _words(text: str) -> set[str]:
+    return {_singular(word) for word in re.findall(r"[a-z_]+", text.lower())}
+
+
+def _tables() -> dict[str, Table]:
+    return {name: Base.metadata.tables[name] for name in SCHEMA_TABLES}
+
+
+@lru_cache()
+def _keywords() -> dict[str, tuple[set[str], set[str]]]:
+    """
+    Keywords and phrases per table.
+
+    Keywords are the table name and TABLE_KEYWORDS; phrases are column
+    names found in only one table, e.g. "credit limit".
+    """
+    tables = _tables()
+    column_counts: dict[str, int] = {}
+    for table in tables.values():
+        for column in table.columns:
+            column_counts[column.name] = column_counts.get(column.name, 0) + 1
+
+    keywords = {}
+    for name, table in tables.items():
+        words = {_singular(name), name} | TABLE_KEYWORDS.get(name, set())
+        phrases = {
+            column.name.replace("_", " ")
+            for column in table.columns
+            if column_counts[column.name] == 1 and column.name not in GENERIC_COLUMNS and not column.foreign_keys
+        }
+        keywords[name] = (words, phrases)
+    return keywords
+
+
+@lru_cache()
+def _join_graph() -> dict[str, set[str]]:
+    """Undirected graph of foreign-key links between schema tables."""
+    graph = {name: set() for name in SCHEMA_TABLES}
+    for name, table in _tables().items():
+        for fk in table.foreign_keys:
+            target = fk.column.table.name
+            if target in graph and target != name:
+                graph[name].add(target)
+                graph[target].add(name)
+    return graph
+
+
+def _path(graph: dict[str, set[str]], start: str, goal: str) -> list[str]:
+    """Shortest chain of joins from start to goal."""
+    previous = {start: None}
+    queue = deque([start])
+    while queue:
+        node = queue.popleft()
+        if node == goal:
+            break
+        for neighbour in sorted(graph[node]):
+            if neighbour not in previous:
+                previous[neighbour] = node
+                queue.append(neighbour)
+    path = []
+    node = goal
+    while node is not None and node in previous:
+        path.append(node)
+        node = previous[node]
+    return path
+
+
+def select_tables(task: str, required: Iterable[str] = ()) -> list[str]:
+    """
+    Pick the tables a task needs.
+
+    Tables are matched by keyword, then closed over foreign keys: tables
+    on the shortest join path between any two selected tables are added
+    so the LLM can write the joins. Returns [] when nothing matches.
+    """
+    words = _words(task)
+    text = " ".join(re.findall(r"[a-z]+", task.lower()))
+    selected = {
+        name for name, (keywords, phrases) in _keywords().items()
+        if words & keywords or any(phrase in text for phrase in phrases)
+    }
+    if PERSON_PATTERN.search(task):
+        selected.add("customers")
+    selected.update(required)
+    if not selected:
+        return []
+
+    graph = _join_graph()
+    anchor = min(selected, key=SCHEMA_TABLES.index)
+    for name in list(selected):
+        selected.update(_path(graph, anchor, name))
+    return [name for name in SCHEMA_TABLES if name in selected]
+
+
+def render_schema(table_names: list[str]) -> str:
+    """Describe tables and the relationships between them, like DATABASE_SCHEMA."""
+    tables = _tables()
+    lines = ["", "Tables:"]
+    for name in table_names:
+        columns = ", ".join(column.name for column in tables[name].columns)
+        lines.append(f"- {name} ({columns})")
+
+    relationships = []
+    for name in table_names:
+        for column in tables[name].columns:
+            for fk in column.foreign_keys:
+                target = fk.column.table.name
+                if target in table_names:
+                    relationships.append(f"- {name}.{column.name} -> {target}.{fk.column.name}")
+    if relationships:
+        lines += ["", "Relationships:", *relationships]
+    return "\n".join(lines) + "\n"
+
+
+def pruned_schema(task: str, full_schema: str, required: Iterable[str] = ()) -> str:
+    """
+    Schema text for a SQL prompt about `task`.
+
+    Falls back to full_schema when pruning is disabled, nothing matched,
+    or the task touches most of the tables anyway.
+    """
+    settings = get_settings()
+    if not settings.schema_pruning_enabled:
+        return full_schema
+    tables = select_tables(task, required)
+    if not tables or len(tables) > settings.schema_pruning_max_tables:
+        return full_schema
+    return render_schema(tables)
@@ -0,0 +1,245 @@
+"""
+Static checks for LLM-generated SQL before read agents run it.
+Rejects anything but a single SELECT, writes and cross joins, and caps
+the rows a query can return by injecting or tightening its LIMIT (TOP or
+FETCH on SQL Server), so a runaway query cannot pull a whole table into memory.
+"""
+
+import re
+from typing import Optional
+
+from pydantic import BaseModel
+
+_TOKEN = re.compile(
+    r"(?P<comment>--[^\n]*|/\*.*?\*/)"
+    r"|(?P<string>'(?:[^']|'')*')"
+    r"|(?P<ident>\"(?:[^\"]|\"\")*\"|\[[^\]]*\]|`[^`]*`)"
+    r"|(?P<number>\d+(?:\.\d+)?)"
+    r"|(?P<param>:\w+)"
+    r"|(?P<word>[@#]?[A-Za-z_][\w$#@]*)"
+    r"|(?P<punct>\S)",
+    re.DOTALL,
+)
+
+# Keywords that write, change the schema or reach outside the database
+WRITE_KEYWORDS = {
+    "INSERT", "UPDATE", "DELETE", "MERGE", "UPSERT", "DROP", "ALTER", "CREATE", "TRUNCATE",
+    "RENAME", "GRANT", "REVOKE", "ATTACH", "DETACH", "PRAGMA", "VACUUM", "REINDEX", "EXEC", "EXECUTE",
+    "INTO", "BULK", "OPENROWSET", "OPENQUERY", "SHUTDOWN", "DBCC",
+}
+
+# Keywords that end a FROM clause
+FROM_END = {"WHERE", "GROUP", "HAVING", "ORDER", "LIMIT", "OFFSET", "FETCH", "WINDOW"}
+COMPOUND = {"UNION", "EXCEPT", "INTERSECT"}
+NON_COLUMNS = {"NULL", "TRUE", "FALSE"}
+
+
+class UnsafeSqlError(ValueError):
+    """Raised when generated SQL is not a single, safe read query."""
+
+
+class GuardedSql(BaseModel):
+    """SQL that passed the guard, with the rewrites applied to it."""
+    sql: str
+    max_rows: int
+    rewrites: list[str] = []
+
+
+class _Token:
+    __slots__ = ("kind", "text", "start", "end", "depth", "scope")
+
+    def __init__(self, match: re.Match):
+        self.kind = match.lastgroup
+        self.text = match.group()
+        self.start = match.start()
+        self.end = match.end()
+        self.depth = 0
+        self.scope = -1
+
+    @property
+    def upper(self) -> str:
+        return self.text.upper() if self.kind == "word" else self.text
+
+
+def _tokenize(sql: str) -> list[_Token]:
+    """Tokens without comments, each tagged with its parenthesis depth and scope."""
+    tokens = []
+    scopes = [-1]
+    for match in _TOKEN.finditer(sql):
+        token = _Token(match)
+        if token.kind == "comment":
+            continue
+        if token.text == "'":
+            raise UnsafeSqlError("unterminated string literal")
+        if token.text == ")":
+            if len(scopes) == 1:
+                raise UnsafeSqlError("unbalanced parentheses")
+            scopes.pop()
+        token.depth = len(scopes) - 1
+        token.scope = scopes[-1]
+        if token.text == "(":
+            scopes.append(len(tokens))
+        tokens.append(token)
+    if len(scopes) > 1:
+        raise UnsafeSqlError("unbalanced parentheses")
+    return tokens
+
+
+def _is_column(tokens: list[_Token], index: int) -> bool:
+    token = tokens[index] if 0 <= index < len(tokens) else None
+    return token is not None and token.kind in ("word", "ident") and token.upper not in NON_COLUMNS
+
+
+def _column_equalities(tokens: list[_Token]) -> int:
+    """Count `column = column` comparisons, the usual join conditions."""
+    count = 0
+    for i, token in enumerate(tokens):
+        if token.text != "=" or (i and tokens[i - 1].text in ("<", ">", "!")):
+            continue
+        if _is_column(tokens, i - 1) and _is_column(tokens, i + 1):
+            count += 1
+    return count
+
+
+def _check_joins(part: list[_Token]) -> None:
+    """Reject cross joins in one SELECT of a scope."""
+    words = [token.upper for token in part]
+    if "FROM" not in words:
+        return
+    start = words.index("FROM") + 1
+    end = next((i for i in range(start, len(part)) if words[i] in FROM_END), len(part))
+    clause = part[start:end]
+
+    for i, token in enumerate(clause):
+        if token.upper != "JOIN":
+            continue
+        before = [t.upper for t in clause[max(0, i - 3):i]]
+        if "CROSS" in before:
+            raise UnsafeSqlError("CROSS JOIN is not allowed")
+        if "NATURAL" in before:
+            continue
+        following = clause[i + 1:]
+        next_join = next((j for j, t in enumerate(following) if t.upper == "JOIN"), len(following))
+        if not any(t.upper in ("ON", "USING") for t in following[:next_join]):
+            raise UnsafeSqlError("JOIN without an ON or USING condition")
+
+    commas = sum(1 for token in clause if token.text == ",")
+    if commas:
+        where = []
+        if end < len(part) and words[end] == "WHERE":
+            where_end = next((i for i in range(end + 1, len(part)) if words[i] in FROM_END), len(part))
+            where = part[end + 1:where_end]
+        if _column_equalities(where) < commas:
+            raise UnsafeSqlError("comma-separated tables without join conditions (cross join)")
+
+
+def _check_scopes(tokens: list[_Token]) -> None:
+    scopes: dict[int, list[_Token]] = {}
+    for token in tokens:
+        scopes.setdefault(token.scope, []).append(token)
+    for scope_tokens in scopes.values():
+        part: list[_Token] = []
+        for token in scope_tokens:
+            if token.upper in COMPOUND:
+                _check_joins(part)
+                part = []
+            else:
+                part.append(token)
+        _check_joins(part)
+
+
+def _replace(sql: str, token: _Token, text: str) -> str:
+    return sql[:token.start] + text + sql[token.end:]
+
+
+def _cap_limit(sql: str, top: list[_Token], max_rows: int) -> tuple[str, Optional[str]]:
+    """LIMIT (SQLite, PostgreSQL, MySQL): add one or tighten the existing one."""
+    limits = [i for i, token in enumerate(top) if token.upper == "LIMIT"]
+    if not limits:
+        return f"{sql} LIMIT {max_rows}", f"added LIMIT {max_rows}"
+    after = top[limits[-1] + 1:]
+    # LIMIT count [OFFSET n] or LIMIT offset, count
+    count = after[2] if len(after) >= 3 and after[1].text == "," else after[0] if after else None
+    if count is not None and count.kind == "number":
+        if float(count.text) <= max_rows:
+            return sql, None
+        return _replace(sql, count, str(max_rows)), f"tightened LIMIT {count.text} to {max_rows}"
+    # A bound or computed limit cannot be checked statically
+    return f"SELECT * FROM ({sql}) AS limited LIMIT {max_rows}", f"wrapped in LIMIT {max_rows}"
+
+
+def _wrap_top(sql: str, top: list[_Token], max_rows: int) -> str:
+    """Cap the main SELECT from outside, after any CTEs."""
+    select = next(token for token in top if token.upper == "SELECT")
+    return f"{sql[:select.start]}SELECT TOP {max_rows} * FROM ({sql[select.start:]}) AS limited"
+
+
+def _cap_top(sql: str, tokens: list[_Token], max_rows: int) -> tuple[str, Optional[str]]:
+    """TOP / OFFSET-FETCH (SQL Server): add TOP or FETCH, or tighten the existing cap."""
+    top = [token for token in tokens if token.depth == 0]
+    for i, token in enumerate(top):
+        if token.upper == "TOP":
+            # TOP n or TOP (n); the parenthesized number is one level down
+            j = tokens.index(token) + 1
+            j = j + 1 if j < len(tokens) and tokens[j].text == "(" else j
+            count = tokens[min(j, len(tokens) - 1)]
+            following = tokens[j + 1:j + 3]
+            if count.kind != "number" or any(t.upper == "PERCENT" for t in following):
+                # A bound count or a percentage cannot be checked statically
+                return _wrap_top(sql, top, max_rows), f"wrapped in TOP {max_rows}"
+            if float(count.text) <= max_rows:
+                return sql, None
+            return _replace(sql, count, str(max_rows)), f"tightened TOP {count.text} to {max_rows}"
+        if token.upper == "FETCH":
+            count = top[i + 2] if i + 2 < len(top) else None
+            if count is None or count.kind != "number":
+                return _wrap_top(sql, top, max_rows), f"wrapped in TOP {max_rows}"
+            if float(count.text) <= max_rows:
+                return sql, None
+            return _replace(sql, count, str(max_rows)), f"tightened FETCH {count.text} to {max_rows}"
+    if any(token.upper == "OFFSET" for token in top):
+        # TOP cannot be combined with OFFSET
+        return f"{sql} FETCH NEXT {max_rows} ROWS ONLY", f"added FETCH NEXT {max_rows} ROWS ONLY"
+    if any(token.upper in COMPOUND for token in top):
+        # TOP would only cap the first SELECT; the row cap on fetching applies instead
+        return sql, None
+
+    select = next(token for token in top if token.upper == "SELECT")
+    index = top.index(select)
+    anchor = top[index + 1] if index + 1 < len(top) and top[index + 1].upper in ("DISTINCT", "ALL") else select
+    sql = sql[:anchor.end] + f" TOP {max_rows}" + sql[anchor.end:]
+    return sql, f"added TOP {max_rows}"
+
+
+def guard_sql(sql: str, max_rows: int, dialect: str = "sqlite") -> GuardedSql:
+    """
+    Check a generated statement and cap the rows it returns.
+
+    Raises UnsafeSqlError for multiple statements, anything but SELECT/WITH,
+    write keywords and cross joins (CROSS JOIN, JOIN without ON/USING, or
+    comma-joined tables without matching column equalities in WHERE).
+    """
+    tokens = _tokenize(sql)
+    while tokens and tokens[-1].text == ";":
+        tokens.pop()
+    if not tokens:
+        raise UnsafeSqlError("empty statement")
+    if any(token.text == ";" for token in tokens):
+        raise UnsafeSqlError("multiple statements are not allowed")
+    if tokens[0].upper not in ("SELECT", "WITH"):
+        raise UnsafeSqlError("only SELECT statements are allowed")
+    writes = sorted({token.upper for token in tokens if token.kind == "word"} & WRITE_KEYWORDS)
+    if writes:
+        raise UnsafeSqlError(f"write keyword {writes[0]} is not allowed")
+    if not any(token.upper == "SELECT" and token.depth == 0 for token in tokens):
+        raise UnsafeSqlError("no SELECT in the main statement")
+    _check_scopes(tokens)
+
+    # Drop trailing semicolons and comments before rewriting
+    statement = sql[:tokens[-1].end].strip()
+    tokens = _tokenize(statement)
+    if dialect == "mssql":
+        statement, rewrite = _cap_top(statement, tokens, max_rows)
+    else:
+        statement, rewrite = _cap_limit(statement, [t for t in tokens if t.depth == 0], max_rows)
+    return GuardedSql(sql=statement, max_rows=max_rows, rewrites=[rewrite] if rewrite else [])
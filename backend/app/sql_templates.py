@@ -0,0 +1,238 @@
+"""
+Parameterized NL-to-SQL template cache.
+Requests that differ only in their literals ("transactions for CHK-001234",
+"transactions for SAV-004411") share a task shape. The SQL generated for
+the first one is stored with those literals replaced by bind parameters,
+so later requests of the same shape run it with their own values and skip
+the LLM.
+"""
+
+import re
+from typing import Optional, Union
+
+from app.config import get_settings
+from app.llm.cache import TTLCache, normalize_message
+
+# Literals lifted out of task text, tried in order at each position. Only
+# typed values are lifted: a name or quoted word could fill a different
+# column in another task of the same shape ("customers in Seattle" is a
+# city, "customers in Downtown" a branch).
+LITERAL_PATTERNS = [
+    ("account", r"\b[A-Za-z]{2,4}-\d{4,}\b"),
+    ("email", r"\b[\w.+-]+@[\w-]+(?:\.[\w-]+)+\b"),
+    ("date", r"\b\d{4}-\d{2}-\d{2}\b"),
+    ("number", r"\$?\b\d[\d,]*(?:\.\d+)?\b"),
+]
+_LITERAL = re.compile("|".join(f"(?P<{kind}>{pattern})" for kind, pattern in LITERAL_PATTERNS))
+
+# String (including T-SQL N'...') and numeric literals in generated SQL
+_SQL_LITERAL = re.compile(r"(?<![\w'])N?'(?:[^']|'')*'|(?<![\w.:@])\d+(?:\.\d+)?(?![\w.])")
+
+# A number only becomes a parameter when it is compared with a column, so
+# LIMIT/TOP counts and flags such as is_active = 1 are not taken for it
+_COMPARISON = re.compile(r"(?:[=<>]|\bBETWEEN|\bAND)\s*$", re.IGNORECASE)
+
+# Text around a lifted value inside a SQL string literal that still
+# generalizes, e.g. the wildcards in '%smith%'
+_AFFIX = re.compile(r"[%_]*")
+
+Literal = tuple[str, str]
+Value = Union[str, int, float]
+
+
+def _number(text: str) -> Value:
+    text = text.lstrip("$").replace(",", "")
+    return float(text) if "." in text else int(text)
+
+
+def extract_literals(task: str) -> tuple[str, list[Literal]]:
+    """
+    Split a task into its shape and its literals.
+
+    The shape is the normalized task with each literal replaced by a
+    placeholder naming its kind.
+    """
+    literals: list[Literal] = []
+    parts = []
+    last = 0
+    for match in _LITERAL.finditer(task):
+        parts.append(task[last:match.start()])
+        parts.append(f"<{match.lastgroup}>")
+        literals.append((match.lastgroup, match.group()))
+        last = match.end()
+    parts.append(task[last:])
+    return normalize_message("".join(parts)), literals
+
+
+def _case(text: str, value: str) -> Optional[str]:
+    """How `value` was transformed to appear as `text` in the SQL."""
+    if text == value:
+        return "same"
+    if text == value.lower():
+        return "lower"
+    if text == value.upper():
+        return "upper"
+    return None
+
+
+def _apply_case(value: str, case: str) -> str:
+    return value.lower() if case == "lower" else value.upper() if case == "upper" else value
+
+
+def _match_string(text: str, literals: list[Literal]) -> list[dict]:
+    """Parameter specs for the task literals found in a SQL string."""
+    specs = []
+    for slot, (kind, value) in enumerate(literals):
+        if kind == "number":
+            continue
+        index = text.lower().find(value.lower())
+        if index == -1:
+            continue
+        prefix, suffix = text[:index], text[index + len(value):]
+        case = _case(text[index:index + len(value)], value)
+        if case and _AFFIX.fullmatch(prefix) and _AFFIX.fullmatch(suffix):
+            specs.append({"slot": slot, "prefix": prefix, "suffix": suffix, "case": case})
+    return specs
+
+
+def parameterize(sql: str, literals: list[Literal]) -> Optional[tuple[str, list[dict], list[int]]]:
+    """
+    Replace the SQL literals that came from the task with bind parameters.
+
+    Returns the template, its parameter specs and the slots of the task
+    numbers that stay fixed in it, or None when the SQL does not generalize. Every
+    string literal of the task must map to the SQL. A task number becomes
+    a parameter only when it matches exactly one SQL number and that one
+    is compared with a column; otherwise it is fixed, and the template
+    only serves tasks with the same number there.
+    """
+    numbers: dict[int, list[re.Match]] = {}
+    for match in _SQL_LITERAL.finditer(sql):
+        if match.group()[0].isdigit():
+            for slot, (kind, value) in enumerate(literals):
+                if kind == "number" and float(_number(value)) == float(match.group()):
+                    numbers.setdefault(slot, []).append(match)
+    bound_numbers = {
+        matches[0].start(): slot for slot, matches in numbers.items()
+        if len(matches) == 1 and _COMPARISON.search(sql[:matches[0].start()])
+    }
+
+    specs: list[dict] = []
+    used: set[int] = set()
+    failed = False
+
+    def replace(match: re.Match) -> str:
+        nonlocal failed
+        token = match.group()
+        if token[0].isdigit():
+            slot = bound_numbers.get(match.start())
+            if slot is None:
+                return token
+            found = [{"slot": slot, "prefix": "", "suffix": "", "case": "number"}]
+        else:
+            found = _match_string(token.lstrip("N")[1:-1].replace("''", "'"), literals)
+        if not found:
+            return token
+        if len(found) > 1:
+            failed = True
+            return token
+        used.add(found[0]["slot"])
+        specs.append(found[0])
+        return f":p{len(specs) - 1}"
+
+    template = _SQL_LITERAL.sub(replace, sql)
+    strings = {slot for slot, (kind, _) in enumerate(literals) if kind != "number"}
+    if failed or not strings <= used:
+        return None
+    fixed = [slot for slot, (kind, _) in enumerate(literals) if kind == "number" and slot not in used]
+    return template, specs, fixed
+
+
+def bind(specs: list[dict], literals: list[Literal]) -> dict[str, Value]:
+    """Bind parameter values for a template from a task's literals."""
+    params = {}
+    for index, spec in enumerate(specs):
+        value = literals[spec["slot"]][1]
+        if spec["case"] == "number":
+            params[f"p{index}"] = _number(value)
+        else:
+            params[f"p{index}"] = spec["prefix"] + _apply_case(value, spec["case"]) + spec["suffix"]
+    return params
+
+
+def render(sql: str, params: dict[str, Value]) -> str:
+    """The SQL with parameters inlined, for display."""
+    def value(match: re.Match) -> str:
+        param = params[match.group(1)]
+        if isinstance(param, str):
+            return "'" + param.replace("'", "''") + "'"
+        return str(param)
+    return re.sub(r":(p\d+)\b", value, sql)
+
+
+class SqlTemplateCache:
+    """
+    Parameterized SQL per agent and task shape.
+
+    Templates are keyed on the shape plus the values of the task numbers
+    they keep fixed, so a different number there is a miss.
+    """
+
+    def __init__(self, max_size: int = 512, ttl_seconds: float = 86400.0):
+        self.templates = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        # Fixed number slots of the latest template per shape
+        self.fixed_slots = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self.stored = 0
+        self.uncacheable = 0
+
+    def _key(self, agent: str, shape: str, literals: list[Literal]) -> tuple:
+        slots = self.fixed_slots.get((agent, shape)) or ()
+        return agent, shape, tuple(_number(literals[slot][1]) for slot in slots)
+
+    def lookup(self, agent: str, task: str) -> Optional[tuple[str, dict[str, Value]]]:
+        """The template SQL and bound parameters for a task, or None on a miss."""
+        shape, literals = extract_literals(task)
+        template = self.templates.get(self._key(agent, shape, literals))
+        if template is None:
+            return None
+        return template["sql"], bind(template["params"], literals)
+
+    def store(self, agent: str, task: str, sql: str) -> bool:
+        """Store generated SQL for a task's shape; returns False if it does not generalize."""
+        shape, literals = extract_literals(task)
+        result = parameterize(sql, literals)
+        if result is None:
+            self.uncacheable += 1
+            return False
+        template, specs, fixed = result
+        self.fixed_slots.set((agent, shape), tuple(fixed))
+        self.templates.set(self._key(agent, shape, literals), {"sql": template, "params": specs})
+        self.stored += 1
+        return True
+
+    def discard(self, agent: str, task: str) -> None:
+        """Drop the template for a task, e.g. after it failed to run."""
+        shape, literals = extract_literals(task)
+        self.templates.delete(self._key(agent, shape, literals))
+
+    def stats(self) -> dict:
+        """Get hit/miss counters and the number of templates."""
+        stats = self.templates.stats()
+        return {
+            "templates": stats["size"],
+            "max_templates": stats["max_size"],
+            "hits": stats["hits"],
+            "misses": stats["misses"],
+            "hit_rate": stats["hit_rate"],
+            "stored": self.stored,
+            "uncacheable": self.uncacheable,
+        }
+
+
+_settings = get_settings()
+
+# Shared template cache, see QueryAgent
+sql_template_cache = SqlTemplateCache(
+    max_size=_settings.sql_template_cache_size,
+    ttl_seconds=_settings.sql_template_cache_ttl_seconds,
+)
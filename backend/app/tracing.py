@@ -0,0 +1,170 @@
+"""
+Lightweight in-process tracing for the FinBank AI chat pipeline.
+Spans are kept in a ring buffer and summarized as latency histograms.
+"""
+
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Any, Iterator, Optional
+from pydantic import BaseModel, PrivateAttr
+
+from app.config import get_settings
+
+
+# Histogram bucket upper bounds in milliseconds
+LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000]
+
+_current_trace: ContextVar[Optional[str]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span(BaseModel):
+    """A timed stage of a chat request."""
+    name: str
+    trace_id: Optional[str] = None
+    parent: Optional[str] = None
+    agent: Optional[str] = None
+    started_at: float
+    duration_ms: float = 0.0
+    tokens: Optional[int] = None
+    rows: Optional[int] = None
+    error: Optional[str] = None
+    attributes: dict[str, Any] = {}
+    # The span that was current when this one opened
+    _outer: Optional["Span"] = PrivateAttr(default=None)
+
+    @property
+    def key(self) -> str:
+        """Histogram key, e.g. "plan", "llm:query" or "db:search"."""
+        label = self.agent or self.parent
+        return f"{self.name}:{label}" if label and label != self.name else self.name
+
+
+class Tracer:
+    """Records spans into a bounded ring buffer."""
+
+    def __init__(self, buffer_size: int = 5000):
+        self._spans: deque[Span] = deque(maxlen=buffer_size)
+        self._lock = Lock()
+
+    def new_trace(self) -> str:
+        """Start a new trace for the current request context."""
+        trace_id = uuid.uuid4().hex[:16]
+        _current_trace.set(trace_id)
+        return trace_id
+
+    @contextmanager
+    def span(self, name: str, agent: Optional[str] = None, **attributes: Any) -> Iterator[Span]:
+        """
+        Time a block of work as a span.
+
+        Spans opened inside another span inherit its agent label, so LLM and
+        DB calls made by an agent are attributed to that agent.
+        """
+        parent = _current_span.get()
+        span = Span(
+            name=name,
+            trace_id=_current_trace.get(),
+            parent=parent.name if parent else None,
+            agent=agent or (parent.agent if parent else None),
+            started_at=time.time(),
+            attributes=attributes,
+        )
+        span._outer = parent
+        token = _current_span.set(span)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration_ms = (time.perf_counter() - start) * 1000
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # Generator closed from another context; nothing to restore
+                pass
+            with self._lock:
+                self._spans.append(span)
+
+    @contextmanager
+    def suspended(self) -> Iterator[None]:
+        """
+        Hide the open span around a `yield` in a generator.
+
+        An async generator runs in its consumer's context, so a span left
+        open across a yield would become the consumer's current span.
+        """
+        span = _current_span.get()
+        _current_span.set(span._outer if span else None)
+        try:
+            yield
+        finally:
+            _current_span.set(span)
+
+    def current(self) -> Optional[Span]:
+        """The innermost open span in the current context, if any."""
+        return _current_span.get()
+
+    def recent(self, limit: int = 100) -> list[Span]:
+        """Get the most recent spans, newest last."""
+        with self._lock:
+            spans = list(self._spans)
+        return spans[-limit:] if limit > 0 else []
+
+    def histograms(self) -> dict[str, dict]:
+        """Summarize buffered spans as per-stage latency histograms."""
+        with self._lock:
+            spans = list(self._spans)
+
+        grouped: dict[str, list[Span]] = {}
+        for span in spans:
+            grouped.setdefault(span.key, []).append(span)
+
+        return {key: _summarize(group) for key, group in sorted(grouped.items())}
+
+    def clear(self) -> None:
+        """Drop all buffered spans."""
+        with self._lock:
+            self._spans.clear()
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _summarize(spans: list[Span]) -> dict:
+    """Build a histogram summary for a group of spans."""
+    durations = sorted(span.duration_ms for span in spans)
+    buckets = {f"le_{bound}": 0 for bound in LATENCY_BUCKETS_MS}
+    buckets["le_inf"] = 0
+    for duration in durations:
+        for bound in LATENCY_BUCKETS_MS:
+            if duration <= bound:
+                buckets[f"le_{bound}"] += 1
+        buckets["le_inf"] += 1
+
+    return {
+        "count": len(spans),
+        "errors": sum(1 for span in spans if span.error),
+        "mean_ms": round(sum(durations) / len(durations), 2),
+        "p50_ms": round(percentile(durations, 50), 2),
+        "p90_ms": round(percentile(durations, 90), 2),
+        "p99_ms": round(percentile(durations, 99), 2),
+        "max_ms": round(durations[-1], 2),
+        "tokens": sum(span.tokens or 0 for span in spans),
+        "rows": sum(span.rows or 0 for span in spans),
+        "buckets": buckets,
+    }
+
+
+tracer = Tracer(buffer_size=get_settings().trace_buffer_size)
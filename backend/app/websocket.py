@@ -3,10 +3,14 @@ WebSocket handlers for FinBank AI.
 Handles real-time chat communication.
 """
 
+import asyncio
 import json
 from fastapi import WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 
+from app.config import get_settings
+from app.deadline import Deadline
 from app.orchestrator import Orchestrator
 from app.llm import get_llm_provider, ProviderType
 
@@ -48,76 +52,65 @@ async def handle_chat_websocket(websocket: WebSocket, db: Session):
     {
         "type": "message",
         "content": "user message",
-        "provider": "openai" | "claude" | "ollama" (optional)
+        "provider": "openai" | "claude" | "ollama" (optional),
+        "stream": true | false (optional, stream response text as it is generated)
     }
 
     Message format (outgoing):
     {
-        "type": "status" | "agent" | "response" | "error",
+        "type": "status" | "agent" | "response_delta" | "response" | "error",
         "content": "...",
         "agent": "agent_name" (for agent type),
-        "status": "running" | "done" | "error" (for agent type)
+        "status": "running" | "done" | "error" (for agent type),
+        "task_index": 0 (for agent type, index of the task in the plan),
+        "data": {...} (for agent type with status "done", the full agent result),
+        "complete": true (for response type)
     }
+
+    When streaming, "response_delta" frames carry text as it arrives and the
+    final "response" frame carries the complete text.
     """
     await manager.connect(websocket)
+    queued: list[dict] = []
+    # One receive is kept pending across messages; cancelling a receive
+    # could drop a frame that was already partly read
+    receiving: asyncio.Task | None = None
 
     try:
         while True:
-            # Receive message
-            data = await websocket.receive_json()
+            # Receive message (or one that arrived while the last was processing)
+            if queued:
+                data = queued.pop(0)
+            else:
+                if receiving is None:
+                    receiving = asyncio.create_task(websocket.receive_json())
+                try:
+                    data = await receiving
+                finally:
+                    receiving = None
 
             if data.get("type") == "message":
                 content = data.get("content", "")
                 provider = data.get("provider")
+                stream = bool(data.get("stream", False))
 
                 # Get LLM provider
                 llm = get_llm_provider(provider)
 
                 # Create orchestrator
                 orchestrator = Orchestrator(db, llm)
-
-                # Process and stream response
-                async for msg in orchestrator.process(content):
-                    if msg.startswith("[STATUS]"):
-                        await manager.send_message(websocket, {
-                            "type": "status",
-                            "content": msg[8:].strip(),
-                        })
-                    elif msg.startswith("[AGENT:"):
-                        # Parse agent message
-                        # Format: [AGENT:name] task or [AGENT:name:DONE] result
-                        end_bracket = msg.index("]")
-                        agent_info = msg[7:end_bracket]
-                        content = msg[end_bracket + 1:].strip()
-
-                        if ":DONE" in agent_info:
-                            agent_name = agent_info.replace(":DONE", "")
-                            await manager.send_message(websocket, {
-                                "type": "agent",
-                                "agent": agent_name,
-                                "status": "done",
-                                "content": content,
-                            })
-                        elif ":ERROR" in agent_info:
-                            agent_name = agent_info.replace(":ERROR", "")
-                            await manager.send_message(websocket, {
-                                "type": "agent",
-                                "agent": agent_name,
-                                "status": "error",
-                                "content": content,
-                            })
-                        else:
-                            await manager.send_message(websocket, {
-                                "type": "agent",
-                                "agent": agent_info,
-                                "status": "running",
-                                "content": content,
-                            })
-                    elif msg.startswith("[RESPONSE]"):
-                        await manager.send_message(websocket, {
-                            "type": "response",
-                            "content": msg[10:],
-                        })
+                deadline = Deadline(get_settings().chat_request_timeout)
+
+                # Process in the background so a disconnect can cancel the work
+                processing = asyncio.create_task(
+                    _send_events(websocket, orchestrator.process(content, stream=stream, deadline=deadline))
+                )
+                try:
+                    receiving = await _watch_connection(websocket, processing, queued, receiving)
+                except WebSocketDisconnect:
+                    processing.cancel()
+                    db.rollback()
+                    raise
 
             elif data.get("type") == "ping":
                 await manager.send_message(websocket, {"type": "pong"})
@@ -130,3 +123,50 @@ async def handle_chat_websocket(websocket: WebSocket, db: Session):
             "content": str(e),
         })
         manager.disconnect(websocket)
+    finally:
+        if receiving is not None:
+            receiving.cancel()
+
+
+async def _send_events(websocket: WebSocket, events) -> None:
+    """Send orchestrator events to the client, serializing each event once."""
+    async for event in events:
+        await manager.send_message(websocket, jsonable_encoder(event.to_ws_message()))
+
+
+async def _watch_connection(
+    websocket: WebSocket,
+    processing: asyncio.Task,
+    queued: list[dict],
+    receiving: asyncio.Task | None = None,
+) -> asyncio.Task | None:
+    """
+    Wait for a chat message to finish processing while listening to the socket.
+
+    Pings are answered immediately and other messages are added to `queued`.
+    Raises WebSocketDisconnect as soon as the client goes away, so the caller
+    can cancel the abandoned work. A pending receive is reused rather than
+    cancelled, and the one still pending when processing finishes is
+    returned for the caller to await next.
+    """
+    while not processing.done():
+        if receiving is None:
+            receiving = asyncio.create_task(websocket.receive_json())
+        await asyncio.wait({processing, receiving}, return_when=asyncio.FIRST_COMPLETED)
+        if not receiving.done():
+            break
+
+        data = receiving.result()
+        receiving = None
+        if data.get("type") == "ping":
+            await manager.send_message(websocket, {"type": "pong"})
+        else:
+            queued.append(data)
+
+    try:
+        await processing
+    except BaseException:
+        if receiving is not None:
+            receiving.cancel()
+        raise
+    return receiving
@@ -0,0 +1,126 @@
+"""
+Benchmark Ollama connection reuse against a local stub server.
+
+Compares a fresh httpx.AsyncClient per call (the old OllamaProvider
+behaviour) with the pooled client now used by OllamaProvider. The stub
+answers /api/generate instantly, so the difference is connection setup.
+
+Usage:
+    python bench_ollama_client.py [--calls 200] [--concurrency 1] [--connect-latency-ms 0]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import httpx
+
+RESPONSE_BODY = json.dumps({"response": "SELECT 1", "eval_count": 3}).encode()
+
+
+class StubOllama:
+    """Minimal HTTP/1.1 keep-alive server that mimics /api/generate."""
+
+    def __init__(self, connect_latency: float = 0.0):
+        self.connect_latency = connect_latency
+        self.connections = 0
+        self.requests = 0
+        self.server = None
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        if self.connect_latency:
+            # Simulate handshake cost (e.g. TLS or a remote host) on new connections only
+            await asyncio.sleep(self.connect_latency)
+        try:
+            while True:
+                headers = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in headers.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":")[1])
+                await reader.readexactly(length)
+                self.requests += 1
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: " + str(len(RESPONSE_BODY)).encode() + b"\r\n\r\n" + RESPONSE_BODY
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+
+async def run_calls(call, calls: int, concurrency: int) -> float:
+    """Run `calls` invocations with bounded concurrency and return elapsed seconds."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await call()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(calls)))
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--connect-latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stub = StubOllama(connect_latency=args.connect_latency_ms / 1000)
+    base_url = await stub.start()
+
+    os.environ["OLLAMA_BASE_URL"] = base_url
+    os.environ.setdefault("DATABASE_URL", "sqlite:///./finbank.db")
+    from app.llm.ollama_provider import OllamaProvider, close_ollama_client
+
+    payload = {"model": "llama3.2", "prompt": "ping", "stream": False, "options": {}}
+
+    async def fresh_client_call():
+        async with httpx.AsyncClient() as client:
+            response = await client.post(f"{base_url}/api/generate", json=payload, timeout=120.0)
+            response.raise_for_status()
+
+    provider = OllamaProvider()
+    provider.base_url = base_url
+
+    async def pooled_call():
+        await provider.generate("ping")
+
+    print("=" * 60)
+    print(f"Ollama client benchmark: {args.calls} calls, concurrency {args.concurrency}, "
+          f"connect latency {args.connect_latency_ms}ms")
+    print("=" * 60)
+
+    for label, call in [("fresh client per call", fresh_client_call), ("pooled client", pooled_call)]:
+        stub.connections = stub.requests = 0
+        elapsed = await run_calls(call, args.calls, args.concurrency)
+        print(f"{label:24} {elapsed * 1000:9.1f} ms total  "
+              f"{elapsed * 1000 / args.calls:7.3f} ms/call  "
+              f"{stub.connections:4d} connections for {stub.requests} requests")
+
+    await close_ollama_client()
+    await stub.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -37,8 +37,8 @@ async def test_chat_create():
     result_messages = []
     async for msg in orchestrator.process(message):
         result_messages.append(msg)
-        if msg.startswith("[RESPONSE]"):
-            print(f"\nResponse: {msg[10:]}")
+        if msg.type == "response":
+            print(f"\nResponse: {msg.content}")
 
     # Verify in database
     customer = db.execute(text(
@@ -70,8 +70,8 @@ async def test_chat_update_by_name(customer_id):
     print(f"\nSending: {message}")
 
     async for msg in orchestrator.process(message):
-        if msg.startswith("[RESPONSE]"):
-            print(f"\nResponse: {msg[10:]}")
+        if msg.type == "response":
+            print(f"\nResponse: {msg.content}")
 
     # Verify in database
     customer = db.execute(text(
@@ -103,8 +103,8 @@ async def test_chat_update_by_id(customer_id):
     print(f"\nSending: {message}")
 
     async for msg in orchestrator.process(message):
-        if msg.startswith("[RESPONSE]"):
-            print(f"\nResponse: {msg[10:]}")
+        if msg.type == "response":
+            print(f"\nResponse: {msg.content}")
 
     # Verify in database
     customer = db.execute(text(
@@ -136,8 +136,8 @@ async def test_chat_delete_by_name(customer_id):
     print(f"\nSending: {message}")
 
     async for msg in orchestrator.process(message):
-        if msg.startswith("[RESPONSE]"):
-            print(f"\nResponse: {msg[10:]}")
+        if msg.type == "response":
+            print(f"\nResponse: {msg.content}")
 
     # Verify in database
     customer = db.execute(text(
@@ -169,8 +169,8 @@ async def test_chat_query():
     print(f"\nSending: {message}")
 
     async for msg in orchestrator.process(message):
-        if msg.startswith("[RESPONSE]"):
-            response = msg[10:]
+        if msg.type == "response":
+            response = msg.content
             if "erik" in response.lower() or "maria" in response.lower():
                 print(f"✅ Query returned customer data")
             else:
@@ -182,8 +182,8 @@ async def test_chat_query():
     print(f"\n\nSending: {message}")
 
     async for msg in orchestrator.process(message):
-        if msg.startswith("[RESPONSE]"):
-            response = msg[10:]
+        if msg.type == "response":
+            response = msg.content
             if "premium" in response.lower():
                 print(f"✅ Premium tier query returned data")
             else:
@@ -224,8 +224,8 @@ async def test_banking_edge_cases():
         print(f"Sending: {message}")
 
         async for msg in orchestrator.process(message):
-            if msg.startswith("[RESPONSE]"):
-                response = msg[10:]
+            if msg.type == "response":
+                response = msg.content
                 if "cannot" in response.lower() or "account" in response.lower():
                     print(f"✅ Correctly prevented deletion: {response[:150]}")
                 else:
@@ -240,8 +240,8 @@ async def test_banking_edge_cases():
     print(f"Sending: {message}")
 
     async for msg in orchestrator.process(message):
-        if msg.startswith("[RESPONSE]"):
-            response = msg[10:]
+        if msg.type == "response":
+            response = msg.content
             if "erik" in response.lower() and "mol" in response.lower():
                 print(f"✅ Case-insensitive search works")
             else:
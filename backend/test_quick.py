@@ -28,8 +28,8 @@ async def test_update():
     print(f"Message: {message}\n")
 
     async for msg in orchestrator.process(message):
-        if msg.startswith("[RESPONSE]"):
-            print(f"Response: {msg[10:][:200]}")
+        if msg.type == "response":
+            print(f"Response: {msg.content[:200]}")
 
     db.close()
 
@@ -47,8 +47,8 @@ async def test_delete():
     print(f"Message: {message}\n")
 
     async for msg in orchestrator.process(message):
-        if msg.startswith("[RESPONSE]"):
-            print(f"Response: {msg[10:][:200]}")
+        if msg.type == "response":
+            print(f"Response: {msg.content[:200]}")
 
     db.close()
 
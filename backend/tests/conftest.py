@@ -0,0 +1,10 @@
+"""Shared pytest setup for the backend unit tests."""
+import os
+import sys
+from pathlib import Path
+
+# Make the app package importable when running pytest from any directory
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Unit tests never touch the database; avoid needing the SQL Server driver
+os.environ.setdefault("DATABASE_URL", "sqlite://")
@@ -0,0 +1,54 @@
+"""Tests for agent result budgeting."""
+from decimal import Decimal
+
+import pytest
+
+from app.budget import budget_results, column_stats, estimate_tokens
+
+
+@pytest.mark.parametrize("values, expected", [
+    ([1, 2, 3], {"min": 1.0, "max": 3.0, "sum": 6.0, "avg": 2.0}),
+    ([1.5, 2.5], {"min": 1.5, "max": 2.5, "sum": 4.0, "avg": 2.0}),
+    # Numeric and money columns come back as Decimal
+    ([Decimal("100.10"), Decimal("200.20")], {"min": 100.1, "max": 200.2, "sum": 300.3, "avg": 150.15}),
+    ([Decimal("5"), 5, 5.0], {"min": 5.0, "max": 5.0, "sum": 15.0, "avg": 5.0}),
+])
+def test_numeric_columns_get_ranges(values, expected):
+    assert column_stats([{"amount": v} for v in values])["amount"] == expected
+
+
+@pytest.mark.parametrize("values, expected", [
+    (["a", "b", "a"], {"distinct": 2, "nulls": 0}),
+    ([True, False], {"distinct": 2, "nulls": 0}),
+    ([1, "x"], {"distinct": 2, "nulls": 0}),
+    ([None, "x"], {"distinct": 1, "nulls": 1}),
+])
+def test_other_columns_get_distinct_counts(values, expected):
+    assert column_stats([{"col": v} for v in values])["col"] == expected
+
+
+def test_long_row_lists_are_summarized():
+    rows = [{"id": i, "balance": Decimal(i)} for i in range(100)]
+    budgeted = budget_results({"0:query": {"data": rows}}, max_tokens=10_000, top_rows=5)
+    data = budgeted["0:query"]["data"]
+    assert data["row_count"] == 100
+    assert len(data["rows"]) == 5
+    assert data["truncated"] is True
+    assert data["columns"]["balance"]["max"] == 99.0
+
+
+def test_short_row_lists_are_kept():
+    rows = [{"id": 1}, {"id": 2}]
+    assert budget_results({"0:query": {"data": rows}}, top_rows=5)["0:query"]["data"] == {"row_count": 2, "rows": rows}
+
+
+def test_bulky_payloads_are_dropped():
+    budgeted = budget_results({"0:export": {"csv": "x" * 1000}})
+    assert budgeted["0:export"]["csv"] == "<1000 characters omitted>"
+
+
+def test_result_fits_the_budget():
+    rows = [{"id": i, "name": "n" * 50} for i in range(500)]
+    budgeted = budget_results({"0:query": {"data": rows}}, max_tokens=200, top_rows=20)
+    # Truncated text may overshoot by the marker only
+    assert estimate_tokens(budgeted) <= 200 + 10
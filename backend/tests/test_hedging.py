@@ -0,0 +1,57 @@
+"""Tests for hedged LLM requests."""
+import asyncio
+
+from app.config import get_settings
+from app.llm import registry
+from app.llm.base import BaseLLMProvider, LLMResponse
+from app.llm.cache import TTLCache, response_cache
+from app.llm.registry import ProviderRegistry, wrapper_stats
+from app.tracing import tracer
+
+
+class SlowProvider(BaseLLMProvider):
+    def __init__(self, model: str, latency: float):
+        self.model = model
+        self.latency = latency
+        self.calls = 0
+
+    async def generate(self, prompt, system_prompt=None, temperature=0.7, max_tokens=2000,
+                       deadline=None, stop=None, json_schema=None):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return LLMResponse(content=f"{self.model}: {prompt}", model=self.model)
+
+    async def generate_stream(self, prompt, system_prompt=None, temperature=0.7, max_tokens=2000,
+                              deadline=None, stop=None):
+        yield (await self.generate(prompt)).content
+
+
+def test_cache_hits_do_not_move_the_hedge_delay(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "hedge_provider", "openai")
+    monkeypatch.setattr(settings, "hedge_model", "backup")
+    monkeypatch.setattr(settings, "hedge_percentiles", {"planning": 50.0})
+    monkeypatch.setattr(settings, "hedge_min_samples", 3)
+    monkeypatch.setattr(settings, "hedge_min_delay", 0.0)
+    monkeypatch.setattr(response_cache, "memory", TTLCache())
+    monkeypatch.setattr(response_cache, "disk", None)
+    providers = {"ollama": SlowProvider("primary", 0.02), "openai": SlowProvider("backup", 0.02)}
+    monkeypatch.setattr(registry, "_base_provider", lambda provider, model: providers[provider])
+
+    llm = ProviderRegistry("ollama", "primary").get()
+
+    async def scenario():
+        with tracer.span("plan"):
+            for i in range(3):
+                await llm.generate(f"miss {i}", temperature=0.0)
+            delay = wrapper_stats(llm)["hedging"]["delays_ms"]["planning"]
+            # Repeats are served from the response cache
+            for _ in range(20):
+                await llm.generate("miss 0", temperature=0.0)
+        return delay
+
+    delay = asyncio.run(scenario())
+    assert delay >= 20
+    assert wrapper_stats(llm)["hedging"]["delays_ms"]["planning"] == delay
+    assert providers["ollama"].calls == 3
+    assert providers["openai"].calls == 0
@@ -0,0 +1,74 @@
+"""Tests for concurrent task execution in the orchestrator."""
+import asyncio
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.agents import AGENT_REGISTRY, AgentResult, BaseAgent
+from app.events import AgentDoneEvent, AgentStartedEvent
+from app.orchestrator import Orchestrator
+
+
+class FakeLLM:
+    async def synthesize(self, user_message, results, deadline=None):
+        return "done"
+
+
+class SleepAgent(BaseAgent):
+    """Waits for the number of seconds in its task, then records when it ran."""
+    name = "sleep"
+    log: list[tuple[str, str, float]] = []
+
+    async def execute(self, task, deadline=None):
+        label, seconds = task.split(":")
+        self.log.append(("start", label, time.perf_counter()))
+        await asyncio.sleep(float(seconds))
+        self.log.append(("end", label, time.perf_counter()))
+        return AgentResult(success=True, data=None, message=label)
+
+
+class BlockingQueryAgent(BaseAgent):
+    """Runs a blocking call standing in for a slow database query."""
+    name = "blocking"
+
+    async def execute(self, task, deadline=None):
+        await self.run_db(lambda: time.sleep(0.2))
+        return AgentResult(success=True, data=None, message=task)
+
+
+def _process(plan: list[dict]) -> list:
+    orchestrator = Orchestrator(Session(bind=create_engine("sqlite://")), llm=FakeLLM())
+
+    async def collect():
+        return [event async for event in orchestrator.process("zzz", planned=plan)]
+
+    return asyncio.run(collect())
+
+
+def test_task_waits_only_for_its_own_dependencies(monkeypatch):
+    monkeypatch.setitem(AGENT_REGISTRY, "sleep", SleepAgent)
+    SleepAgent.log = []
+    events = _process([
+        {"agent": "sleep", "task": "slow:0.3"},
+        {"agent": "sleep", "task": "fast:0.01"},
+        {"agent": "sleep", "task": "after-fast:0.01", "depends_on": [1]},
+    ])
+    times = {(kind, label): at for kind, label, at in SleepAgent.log}
+    assert times[("start", "after-fast")] >= times[("end", "fast")]
+    assert times[("start", "after-fast")] < times[("end", "slow")]
+
+    # Events still come in plan order
+    done = [event.task_index for event in events if isinstance(event, AgentDoneEvent)]
+    assert done == [0, 1, 2]
+    started = [event.task_index for event in events if isinstance(event, AgentStartedEvent)]
+    assert started == [0, 1, 2]
+
+
+def test_concurrent_tasks_run_database_work_in_parallel(monkeypatch):
+    monkeypatch.setitem(AGENT_REGISTRY, "blocking", BlockingQueryAgent)
+    start = time.perf_counter()
+    events = _process([{"agent": "blocking", "task": "a"}, {"agent": "blocking", "task": "b"}])
+    elapsed = time.perf_counter() - start
+    assert len([event for event in events if isinstance(event, AgentDoneEvent)]) == 2
+    assert elapsed < 0.35
@@ -0,0 +1,53 @@
+"""Tests for the rule-based fast-path router."""
+import pytest
+
+from app.router import route_message, score_message
+
+AGENTS = ["query", "transaction", "analytics", "search", "risk", "export", "crud"]
+
+
+@pytest.mark.parametrize("message, agent", [
+    ("Show all customers", "query"),
+    ("List accounts for customer 3", "query"),
+    ("Search for customers with names starting with J", "search"),
+    ("Find suspicious transactions", "risk"),
+    ("Export transactions to CSV", "export"),
+    ("What is the average balance per branch?", "analytics"),
+    ("Deposit $500 into CHK-001234", "transaction"),
+    ("Transfer 200 from CHK-001234 to SAV-001234", "transaction"),
+    ("Please withdraw 50 from SAV-002345", "transaction"),
+    ("Update customer 14, change email to test@updated.com", "crud"),
+    ("Delete customer id 7", "crud"),
+])
+def test_routes_unambiguous_messages(message, agent):
+    assert score_message(message, AGENTS)[0] == agent
+    assert route_message(message, AGENTS).path == "rules"
+
+
+@pytest.mark.parametrize("message", [
+    # Questions about how to write must not start one
+    "how do I change my email address?",
+    "How do I transfer money to savings?",
+    "Can I deposit cash at a branch?",
+    # Commands without a record to act on
+    "Transfer money to savings",
+    "Change my email address",
+    # More than one intent
+    "Find suspicious transactions and export them to CSV",
+    # Nothing recognizable
+    "Hello there",
+])
+def test_falls_back_to_llm(message):
+    decision = route_message(message, AGENTS)
+    assert decision.path == "llm"
+    assert decision.plan == []
+
+
+def test_write_agents_never_get_high_confidence_without_a_command():
+    agent, confidence = score_message("how do I change my email address?", AGENTS)
+    assert agent is None
+    assert confidence < 0.5
+
+
+def test_unavailable_agents_are_not_routed():
+    assert score_message("Export transactions to CSV", ["query"]) == (None, 0.0)
@@ -0,0 +1,38 @@
+"""Tests for schema pruning in SQL-generation prompts."""
+import pytest
+
+from app.schema import render_schema, select_tables
+
+
+@pytest.mark.parametrize("task, tables", [
+    ("List all branches", ["branches"]),
+    ("Show VIP tier benefits", ["customer_tiers"]),
+    ("Show all loans", ["loans"]),
+    ("Transactions over $1000 last month", ["transactions"]),
+    # Joins pull in the tables on the path between them
+    ("Customers with a credit card", ["customers", "accounts", "cards"]),
+    ("Total deposits per branch", ["branches", "customers", "accounts", "transactions"]),
+    ("Balance of CHK-001234", ["accounts"]),
+    # Names and possessives point at customers
+    ("Show accounts for John Smith", ["customers", "accounts"]),
+    ("What is Smith's balance?", ["customers", "accounts"]),
+    # Contractions are not possessives
+    ("What's the total balance?", ["accounts"]),
+    ("Let's see the loans", ["loans"]),
+    ("what's the current interest on it's balance", ["account_types", "accounts"]),
+    ("Hello", []),
+])
+def test_select_tables(task, tables):
+    assert select_tables(task) == tables
+
+
+def test_required_tables_are_added():
+    assert select_tables("Show all loans", required=["customers"]) == ["customers", "loans"]
+
+
+def test_render_schema_lists_columns_and_relationships():
+    text = render_schema(["customers", "accounts"])
+    assert "- customers (" in text
+    assert "- accounts (" in text
+    assert "- accounts.customer_id -> customers.id" in text
+    assert "transactions" not in text
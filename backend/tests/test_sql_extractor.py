@@ -0,0 +1,73 @@
+"""Tests for SQL extraction from LLM output."""
+import pytest
+
+from app.llm.sql_extractor import SqlStreamExtractor, extract_sql
+
+
+@pytest.mark.parametrize("text, sql", [
+    ("SELECT * FROM customers", "SELECT * FROM customers"),
+    ("SELECT * FROM customers;", "SELECT * FROM customers"),
+    ("```sql\nSELECT * FROM customers\n```\nThis lists every customer.", "SELECT * FROM customers"),
+    ("```SELECT id FROM loans```", "SELECT id FROM loans"),
+    ("Here is the query:\n\nSELECT * FROM accounts WHERE balance > 100;\n\nIt returns rich accounts.",
+     "SELECT * FROM accounts WHERE balance > 100"),
+    # Multi-line statements keep their clauses
+    ("SELECT *\nFROM accounts\n\nWHERE balance > 100\n\nThis filters.", "SELECT *\nFROM accounts\n\nWHERE balance > 100"),
+    # Semicolons and fences inside strings or parentheses don't end the statement
+    ("SELECT * FROM customers WHERE name = 'x;y'; -- done", "SELECT * FROM customers WHERE name = 'x;y'"),
+    ("SELECT * FROM customers WHERE note = '```'", "SELECT * FROM customers WHERE note = '```'"),
+    ("SELECT * FROM customers WHERE name = 'O''Brien';", "SELECT * FROM customers WHERE name = 'O''Brien'"),
+    # CTEs
+    ("WITH big AS (SELECT * FROM accounts) SELECT * FROM big;", "WITH big AS (SELECT * FROM accounts) SELECT * FROM big"),
+    ("with recursive t(n) as (select 1) select * from t", "with recursive t(n) as (select 1) select * from t"),
+    # Prose starting with a SQL keyword is not a statement
+    ("With the following query you can see customers:\nSELECT * FROM customers", "SELECT * FROM customers"),
+    # No statement: the text comes back as is
+    ("I cannot answer that.", "I cannot answer that."),
+])
+def test_extract_sql(text, sql):
+    assert extract_sql(text) == sql
+
+
+def _chunks(text: str, size: int) -> list[str]:
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 100])
+def test_stream_completes_at_closing_fence_split_across_chunks(size):
+    text = "```sql\nSELECT * FROM loans WHERE amount > 5\n```\nThis shows big loans and more text after."
+    extractor = SqlStreamExtractor()
+    fed = 0
+    for chunk in _chunks(text, size):
+        fed += len(chunk)
+        if extractor.feed(chunk):
+            break
+    assert extractor.complete
+    assert extractor.sql() == "SELECT * FROM loans WHERE amount > 5"
+    # Stopped before the explanation was streamed
+    assert size >= len(text) or fed < len(text) - 10
+
+
+@pytest.mark.parametrize("size", [1, 4, 100])
+def test_stream_does_not_stop_inside_a_string(size):
+    text = "SELECT * FROM customers WHERE name = 'a;b' AND city = 'c'; trailing"
+    extractor = SqlStreamExtractor()
+    for chunk in _chunks(text, size):
+        if extractor.feed(chunk):
+            break
+    assert extractor.sql() == "SELECT * FROM customers WHERE name = 'a;b' AND city = 'c'"
+
+
+def test_stream_waits_for_the_word_after_a_blank_line():
+    extractor = SqlStreamExtractor()
+    assert not extractor.feed("SELECT *\n\nFR")
+    assert not extractor.feed("OM accounts")
+    assert extractor.feed("\n\nThis lists accounts")
+    assert extractor.sql() == "SELECT *\n\nFROM accounts"
+
+
+def test_close_settles_unfinished_statement():
+    extractor = SqlStreamExtractor()
+    assert not extractor.feed("SELECT 1")
+    extractor.close()
+    assert extractor.sql() == "SELECT 1"
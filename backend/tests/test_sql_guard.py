@@ -0,0 +1,73 @@
+"""Tests for the generated-SQL guard."""
+import pytest
+
+from app.sql_guard import UnsafeSqlError, guard_sql
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM customers LIMIT 10",
+    "SELECT * FROM customers WHERE name = 'DROP TABLE x' LIMIT 5;",
+    "SELECT c.* FROM customers c JOIN accounts a ON a.customer_id = c.id LIMIT 10",
+    "SELECT * FROM customers c, accounts a WHERE a.customer_id = c.id LIMIT 10",
+    "WITH big AS (SELECT * FROM accounts WHERE balance > 100) SELECT * FROM big LIMIT 10",
+    "SELECT * FROM customers LIMIT 10 -- trailing comment",
+])
+def test_accepted_unchanged(sql):
+    guarded = guard_sql(sql, 1000)
+    assert guarded.sql == sql.split(";")[0].split(" --")[0]
+    assert guarded.rewrites == []
+
+
+@pytest.mark.parametrize("sql, error", [
+    ("", "empty statement"),
+    ("SELECT 1; SELECT 2", "multiple statements"),
+    ("DELETE FROM customers", "only SELECT"),
+    ("SELECT * INTO backup FROM customers", "INTO"),
+    ("WITH x AS (SELECT 1) DELETE FROM customers", "DELETE"),
+    ("SELECT * FROM customers CROSS JOIN accounts", "CROSS JOIN"),
+    ("SELECT * FROM customers JOIN accounts", "without an ON"),
+    ("SELECT * FROM customers, accounts", "cross join"),
+    ("SELECT * FROM customers WHERE name = 'x", "unterminated"),
+    ("SELECT (1 FROM customers", "unbalanced"),
+])
+def test_rejected(sql, error):
+    with pytest.raises(UnsafeSqlError, match=error):
+        guard_sql(sql, 1000)
+
+
+@pytest.mark.parametrize("sql, dialect, rewritten", [
+    # SQLite and other LIMIT dialects
+    ("SELECT * FROM customers", "sqlite", "SELECT * FROM customers LIMIT 100"),
+    ("SELECT * FROM customers;", "sqlite", "SELECT * FROM customers LIMIT 100"),
+    ("SELECT * FROM customers LIMIT 5000", "sqlite", "SELECT * FROM customers LIMIT 100"),
+    ("SELECT * FROM customers LIMIT 5000 OFFSET 10", "sqlite", "SELECT * FROM customers LIMIT 100 OFFSET 10"),
+    ("SELECT * FROM customers LIMIT 10, 5000", "sqlite", "SELECT * FROM customers LIMIT 10, 100"),
+    ("SELECT * FROM customers LIMIT :n", "sqlite", "SELECT * FROM (SELECT * FROM customers LIMIT :n) AS limited LIMIT 100"),
+    # SQL Server
+    ("SELECT * FROM customers", "mssql", "SELECT TOP 100 * FROM customers"),
+    ("SELECT DISTINCT city FROM customers", "mssql", "SELECT DISTINCT TOP 100 city FROM customers"),
+    ("SELECT TOP 5000 * FROM customers", "mssql", "SELECT TOP 100 * FROM customers"),
+    ("SELECT TOP (5000) * FROM customers", "mssql", "SELECT TOP (100) * FROM customers"),
+    ("SELECT * FROM customers ORDER BY id OFFSET 0 ROWS FETCH NEXT 5000 ROWS ONLY", "mssql",
+     "SELECT * FROM customers ORDER BY id OFFSET 0 ROWS FETCH NEXT 100 ROWS ONLY"),
+    # TOP cannot be combined with OFFSET
+    ("SELECT * FROM customers ORDER BY id OFFSET 20 ROWS", "mssql",
+     "SELECT * FROM customers ORDER BY id OFFSET 20 ROWS FETCH NEXT 100 ROWS ONLY"),
+    ("SELECT TOP 50 PERCENT * FROM customers ORDER BY id", "mssql",
+     "SELECT TOP 100 * FROM (SELECT TOP 50 PERCENT * FROM customers ORDER BY id) AS limited"),
+    ("WITH c AS (SELECT * FROM customers) SELECT TOP (@n) * FROM c", "mssql",
+     "WITH c AS (SELECT * FROM customers) SELECT TOP 100 * FROM (SELECT TOP (@n) * FROM c) AS limited"),
+])
+def test_rewritten(sql, dialect, rewritten):
+    guarded = guard_sql(sql, 100, dialect)
+    assert guarded.sql == rewritten
+    assert len(guarded.rewrites) == 1
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT TOP 10 * FROM customers",
+    "SELECT * FROM customers ORDER BY id OFFSET 0 ROWS FETCH NEXT 10 ROWS ONLY",
+    "SELECT id FROM customers UNION SELECT id FROM accounts",
+])
+def test_mssql_unchanged(sql):
+    assert guard_sql(sql, 100, "mssql").rewrites == []
@@ -0,0 +1,69 @@
+"""Tests for the parameterized SQL template cache."""
+import pytest
+
+from app.sql_templates import SqlTemplateCache, extract_literals, parameterize
+
+
+@pytest.mark.parametrize("task, shape, literals", [
+    ("Transactions for CHK-001234", "transactions for <account>", [("account", "CHK-001234")]),
+    ("Customer with email jane@example.com", "customer with email <email>", [("email", "jane@example.com")]),
+    ("Loans since 2024-01-31 over $5,000", "loans since <date> over <number>",
+     [("date", "2024-01-31"), ("number", "$5,000")]),
+    # Names stay part of the shape
+    ("Customers in Seattle", "customers in seattle", []),
+])
+def test_extract_literals(task, shape, literals):
+    assert extract_literals(task) == (shape, literals)
+
+
+@pytest.mark.parametrize("sql, literals, template, fixed", [
+    ("SELECT * FROM accounts WHERE account_number = 'CHK-001234'", [("account", "CHK-001234")],
+     "SELECT * FROM accounts WHERE account_number = :p0", []),
+    ("SELECT * FROM customers WHERE email = N'jane@example.com'", [("email", "jane@example.com")],
+     "SELECT * FROM customers WHERE email = :p0", []),
+    ("SELECT * FROM accounts WHERE balance > 5000", [("number", "$5,000")],
+     "SELECT * FROM accounts WHERE balance > :p0", []),
+    ("SELECT * FROM loans WHERE amount BETWEEN 100 AND 200", [("number", "100"), ("number", "200")],
+     "SELECT * FROM loans WHERE amount BETWEEN :p0 AND :p1", []),
+    # Row counts and flags are not comparisons with the task's number
+    ("SELECT * FROM customers WHERE is_active = 1 LIMIT 1", [("number", "1")],
+     "SELECT * FROM customers WHERE is_active = 1 LIMIT 1", [0]),
+    ("SELECT TOP 10 * FROM customers", [("number", "10")], "SELECT TOP 10 * FROM customers", [0]),
+])
+def test_parameterize(sql, literals, template, fixed):
+    result = parameterize(sql, literals)
+    assert result is not None
+    assert result[0] == template
+    assert result[2] == fixed
+
+
+def test_parameterize_rejects_sql_missing_a_task_string():
+    assert parameterize("SELECT * FROM accounts", [("account", "CHK-001234")]) is None
+
+
+def test_lookup_binds_new_values():
+    cache = SqlTemplateCache()
+    assert cache.store("query", "Transactions for CHK-001234", "SELECT * FROM t WHERE account = 'CHK-001234'")
+    sql, params = cache.lookup("query", "transactions for SAV-004411")
+    assert sql == "SELECT * FROM t WHERE account = :p0"
+    assert params == {"p0": "SAV-004411"}
+
+
+def test_lookup_keeps_fixed_numbers():
+    cache = SqlTemplateCache()
+    cache.store("query", "Show 1 customer", "SELECT * FROM customers WHERE is_active = 1 LIMIT 1")
+    assert cache.lookup("query", "Show 1 customer") is not None
+    assert cache.lookup("query", "Show 5 customers") is None
+
+
+def test_names_do_not_share_a_template():
+    cache = SqlTemplateCache()
+    cache.store("query", "Customers in Seattle", "SELECT * FROM customers WHERE city = 'Seattle'")
+    assert cache.lookup("query", "Customers in Downtown") is None
+
+
+def test_discard():
+    cache = SqlTemplateCache()
+    cache.store("query", "Transactions for CHK-001234", "SELECT * FROM t WHERE account = 'CHK-001234'")
+    cache.discard("query", "Transactions for SAV-004411")
+    assert cache.lookup("query", "Transactions for CHK-001234") is None
@@ -0,0 +1,39 @@
+"""Tests for Ollama model warm-up."""
+import asyncio
+
+from app.llm import warmup
+from app.llm.warmup import ModelWarmer
+
+
+class FakeModel:
+    async def warm_up(self):
+        await asyncio.sleep(0)
+        return 0.5
+
+
+def test_switching_models_while_running_loads_the_new_model(monkeypatch):
+    monkeypatch.setattr(warmup.provider_registry, "get", lambda provider, model: FakeModel())
+    warmer = ModelWarmer()
+    configured = ["llama3.2"]
+    monkeypatch.setattr(warmer, "configured_models", lambda: configured)
+
+    async def scenario():
+        warmer.start()
+        for _ in range(5):
+            await asyncio.sleep(0)
+        assert warmer.ready
+
+        # The refresh loop is now sleeping until the next interval
+        configured[:] = ["mistral"]
+        warmer.start()
+        for _ in range(5):
+            await asyncio.sleep(0)
+        status = warmer.status()
+        await warmer.stop()
+        return status
+
+    status = asyncio.run(scenario())
+    assert status["ready"]
+    assert list(status["models"]) == ["mistral"]
+    assert status["models"]["mistral"]["status"] == "ready"
+    assert status["models"]["mistral"]["load_ms"] == 500.0
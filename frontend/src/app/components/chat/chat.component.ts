@@ -90,6 +90,9 @@ import { ChatMessage, AgentStatus, WsResponse } from '../../models/types';
               <span class="role">FinBank AI</span>
             </div>
             <div class="processing-status">{{ processingStatus }}</div>
+            @if (currentResponse) {
+              <div class="message-content" [innerHTML]="formatContent(currentResponse)"></div>
+            }
             @if (currentAgents.length > 0) {
               <div class="agent-statuses">
                 @for (agent of currentAgents; track agent.name) {
@@ -276,10 +279,10 @@ export class ChatComponent implements OnInit, OnDestroy {
   isProcessing = false;
   processingStatus = '';
   currentAgents: AgentStatus[] = [];
+  currentResponse = '';
 
   private subscription?: Subscription;
   private chatSubscription?: Subscription;
-  private currentResponse = '';
   private currentAgentsUsed: string[] = [];
 
   constructor(
@@ -354,8 +357,12 @@ What would you like to know?`,
         this.updateAgentStatus(response);
         break;
 
+      case 'response_delta':
+        this.currentResponse += response.content || '';
+        break;
+
       case 'response':
-        this.completeMessage(response.content || '');
+        this.completeMessage(response.content || this.currentResponse);
         break;
 
       case 'error':
@@ -404,6 +411,7 @@ What would you like to know?`,
     this.processingStatus = '';
     this.currentAgents = [];
     this.currentAgentsUsed = [];
+    this.currentResponse = '';
   }
 
   getAgentIcon(agentName: string): string {
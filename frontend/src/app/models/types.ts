@@ -3,13 +3,17 @@ export interface WsMessage {
   type: 'message' | 'ping';
   content?: string;
   provider?: string;
+  stream?: boolean;
 }
 
 export interface WsResponse {
-  type: 'status' | 'agent' | 'response' | 'error' | 'pong';
+  type: 'status' | 'agent' | 'response_delta' | 'response' | 'error' | 'pong';
   content?: string;
   agent?: string;
   status?: 'running' | 'done' | 'error';
+  task_index?: number;
+  data?: any;
+  complete?: boolean;
 }
 
 // Chat types
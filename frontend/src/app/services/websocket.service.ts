@@ -71,7 +71,8 @@ export class WebSocketService {
     this.send({
       type: 'message',
       content,
-      provider
+      provider,
+      stream: true
     });
   }
 